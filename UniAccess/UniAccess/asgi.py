@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UniAccess.settings')
+# Lets settings tell the ASGI deployment apart (live event streams, DB connection mode).
+os.environ.setdefault('UNIACCESS_ASGI', '1')
 
 application = get_asgi_application()
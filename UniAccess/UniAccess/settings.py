@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 AUTH_USER_MODEL = 'main_app.CustomUser'
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -53,10 +54,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'main_app.middleware.PrecompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main_app.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -67,36 +70,178 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'main_app.context_processors.live_events',
             ],
+            # Compiled templates are kept in memory outside DEBUG; in DEBUG they are
+            # re-read so edits show up without a restart.
+            'loaders': (
+                ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader']
+                if DEBUG else
+                [('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ])]
+            ),
         },
     },
 ]
 
 WSGI_APPLICATION = 'UniAccess.wsgi.application'
 
+# Set by UniAccess/asgi.py; false under runserver / gunicorn (WSGI).
+RUNNING_ASGI = os.environ.get("UNIACCESS_ASGI") == "1"
+
+# Server-sent live events (live_events) hold the connection open for as long as the
+# page is; under WSGI that pins a worker thread per open page, so they are off there.
+LIVE_EVENTS_ENABLED = os.environ.get("LIVE_EVENTS_ENABLED", "1" if RUNNING_ASGI else "0") == "1"
+
 RFID_API_TOKEN = os.environ.get("RFID_API_TOKEN", "dev-123") 
 
+# Token buckets for the scan API (main_app.services.throttle): (tokens per second,
+# burst) per reader device_id and per source IP; a rate of 0 disables that limit.
+# A tap takes a token and so does a batch upload; over-limit requests get a 429.
+RFID_THROTTLE = {
+    "device": (float(os.environ.get("RFID_DEVICE_RATE", "2")), int(os.environ.get("RFID_DEVICE_BURST", "10"))),
+    "ip": (float(os.environ.get("RFID_IP_RATE", "20")), int(os.environ.get("RFID_IP_BURST", "60"))),
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection reuse — RFID readers post continuously, so avoid a fresh
+# connect/auth handshake per request. Choose one mode:
+#   DB_POOL=1            psycopg 3 pool per worker process (needs `psycopg[pool]`).
+#                        The way to reuse connections under ASGI.
+#   DB_CONN_MAX_AGE=600  one persistent, health-checked connection per worker thread
+#                        (WSGI only). Defaults to 60 under WSGI and 0 under ASGI:
+#                        there every request runs its ORM calls in a fresh
+#                        sync_to_async thread, so kept-alive connections pile up
+#                        instead of being reused.
+# Sizing: server connections ≈ worker processes × (DB_POOL_MAX_SIZE, or threads per
+# worker without a pool). Keep that under PostgreSQL's max_connections minus ~10 for
+# admin shells, cron (close_sessions) and migrations. E.g. gunicorn -w 4 --threads 2
+# → DB_POOL_MAX_SIZE=2..4 (8–16 connections); uvicorn --workers 4 serving async
+# views → DB_POOL_MAX_SIZE=4..8, since sync_to_async hops share one pool per process.
+DB_POOL = os.environ.get("DB_POOL", "0") == "1"
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "0" if RUNNING_ASGI else "60"))
+
 DATABASES = {
   'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME' : 'UNIAccess',
-        'USER' : 'postgres',
-        'PASSWORD' : '121212',
-        "HOST": "127.0.0.1",
-        'PORT': '5432'
+        'NAME' : os.environ.get("DB_NAME", 'UNIAccess'),
+        'USER' : os.environ.get("DB_USER", 'postgres'),
+        'PASSWORD' : os.environ.get("DB_PASSWORD", '121212'),
+        "HOST": os.environ.get("DB_HOST", "127.0.0.1"),
+        'PORT': os.environ.get("DB_PORT", '5432'),
+        # Pooling and persistent connections are mutually exclusive in Django.
+        'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get("DB_CONNECT_TIMEOUT", "5")),
+            **({
+                'pool': {
+                    'min_size': int(os.environ.get("DB_POOL_MIN_SIZE", "1")),
+                    'max_size': int(os.environ.get("DB_POOL_MAX_SIZE", "4")),
+                    'timeout': float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+                    'max_idle': float(os.environ.get("DB_POOL_MAX_IDLE", "300")),
+                },
+            } if DB_POOL else {}),
+        },
 }
 }
 
+# Optional read replica for dashboards/reports (see main_app.db_routers).
+# Set DB_REPLICA_HOST / DB_REPLICA_NAME to enable. The routing tests run on two
+# SQLite databases: python manage.py test --settings=UniAccess.test_settings
+if os.environ.get("DB_REPLICA_HOST") or os.environ.get("DB_REPLICA_NAME"):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get("DB_REPLICA_NAME", DATABASES['default']['NAME']),
+        'USER': os.environ.get("DB_REPLICA_USER", DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get("DB_REPLICA_PASSWORD", DATABASES['default']['PASSWORD']),
+        'HOST': os.environ.get("DB_REPLICA_HOST", DATABASES['default']['HOST']),
+        'PORT': os.environ.get("DB_REPLICA_PORT", DATABASES['default']['PORT']),
+        'TEST': (
+            {'MIRROR': 'default'} if os.environ.get("DB_REPLICA_TEST_MIRROR", "1") == "1" else {}
+        ),
+    }
+
+DATABASE_ROUTERS = ['main_app.db_routers.ReplicaRouter']
+# After a write, keep that browser on the primary this long so it sees its own changes.
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", "10"))
+
+
+# Three caches shared by every worker (see main_app.services.cache):
+#   "default"     expiring data: page/fragment/dashboard caches, cached sessions and
+#                 users, recompute locks;
+#   "persistent"  state that must never be evicted: namespace version counters (a lost
+#                 counter restarts at 1 and can match stale entries), the Add/Drop
+#                 override and the metrics counters;
+#   "scan_guard"  the scan API's rate-limit buckets, debounced replies and their
+#                 counters. These run on every reader request, 429s included, so they
+#                 never go to the database: Redis with CACHE_URL, otherwise files in
+#                 SCAN_GUARD_DIR (shared by the workers of one host; several hosts
+#                 need Redis). A DatabaseCache here is refused when the scan API loads.
+# get_or_compute's recompute lock needs an atomic add(). CACHE_URL selects:
+#   redis://host:6379/0   production. Both aliases live on that server under separate
+#                         key prefixes; use maxmemory-policy volatile-lru (or
+#                         volatile-ttl) so keys without a TTL are never evicted.
+#   (unset)               database cache tables — run `manage.py createcachetable`.
+#                         add() is atomic (primary key); incr() is read-then-write, so
+#                         racing bumps may merge (still an invalidation). Every cache
+#                         access is a query: a single-box stand-in for Redis.
+#   locmem://             per-process memory; tests only, workers will disagree.
+#   file:///path/to/dir   development only: FileBasedCache add() is not atomic (no
+#                         stampede protection), culling deletes random entries and
+#                         every set lists the directory. Persistent state still goes
+#                         to the database table.
+CACHE_URL = os.environ.get("CACHE_URL", "")
+CACHE_KEY_PREFIX = os.environ.get("CACHE_KEY_PREFIX", "uniaccess")
+# Culling only happens above MAX_ENTRIES; the persistent store must never reach it.
+_NEVER_CULL = {'MAX_ENTRIES': 10 ** 12}
+_db_persistent = {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'uniaccess_cache_persistent', 'OPTIONS': _NEVER_CULL,
+}
+_file_scan_guard = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.environ.get("SCAN_GUARD_DIR") or os.path.join(tempfile.gettempdir(), 'uniaccess-scan-guard'),
+    # One bucket per reader and source IP and one reply per (card, reader) for a few
+    # seconds: small, so the per-set directory scan stays cheap.
+    'OPTIONS': {'MAX_ENTRIES': 20000},
+}
+if CACHE_URL.startswith(("redis://", "rediss://", "unix://")):
+    _cache = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}
+    _persistent = _cache
+    _scan_guard = _cache
+elif CACHE_URL.startswith("locmem://"):
+    _cache = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': CACHE_URL[9:] or 'uniaccess'}
+    _persistent = {**_cache, 'LOCATION': _cache['LOCATION'] + '-persistent', 'OPTIONS': _NEVER_CULL}
+    _scan_guard = {**_cache, 'LOCATION': _cache['LOCATION'] + '-scan-guard'}
+elif CACHE_URL.startswith("file://"):
+    _cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_URL[7:] or os.path.join(tempfile.gettempdir(), 'uniaccess-cache')}
+    _persistent = _db_persistent
+    _scan_guard = _file_scan_guard
+else:
+    _cache = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'uniaccess_cache',
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get("CACHE_MAX_ENTRIES", "50000"))},
+    }
+    _persistent = _db_persistent
+    _scan_guard = _file_scan_guard
+CACHES = {
+    'default': {**_cache, 'KEY_PREFIX': CACHE_KEY_PREFIX, 'TIMEOUT': 300},
+    'persistent': {**_persistent, 'KEY_PREFIX': CACHE_KEY_PREFIX + ':p', 'TIMEOUT': None},
+    'scan_guard': {**_scan_guard, 'KEY_PREFIX': CACHE_KEY_PREFIX + ':g', 'TIMEOUT': 300},
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -138,14 +283,51 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'main_app' / 'static',
 ]
+STATIC_ROOT = Path(os.environ.get("STATIC_ROOT", BASE_DIR / 'staticfiles'))
+
+# Outside DEBUG, `manage.py collectstatic` writes content-hashed copies plus .gz/.br
+# variants (main_app.storage); `manage.py static_report` prints their sizes.
+# PrecompressedStaticMiddleware serves them (SERVE_STATIC=0 when nginx/a CDN does),
+# hashed names with a one-year immutable Cache-Control, others for STATIC_MAX_AGE.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+            else "main_app.storage.CompressedManifestStaticFilesStorage"
+        ),
+    },
+}
+SERVE_STATIC = os.environ.get("SERVE_STATIC", "0" if DEBUG else "1") == "1"
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", "3600"))
 
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
+# Sessions are read from the cache and written through to the DB, and the user
+# (with profile and RFID tag) is cached by CachedModelBackend, so an authenticated
+# page starts with no session/user queries on a warm cache. Set
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies to drop the
+# session table entirely (sessions are then readable, not secret, client-side).
+SESSION_ENGINE = os.environ.get("SESSION_ENGINE", "django.contrib.sessions.backends.cached_db")
+AUTHENTICATION_BACKENDS = ['main_app.auth_backends.CachedModelBackend']
+
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Job results (exports, reports) and pending import uploads. Deliberately outside
+# MEDIA_ROOT, which is served without auth in DEBUG: files go out only via job_download.
+JOBS_ROOT = Path(os.environ.get("JOBS_ROOT", BASE_DIR / 'private' / 'jobs'))
+
+# Background jobs (manage.py run_jobs): max concurrently running jobs per kind
+# across all workers; "*" covers kinds not listed. Results land in JOBS_ROOT/<id>/.
+JOB_CONCURRENCY = {
+    "*": 1,
+    "export_attendance": 3,
+    "avatar_variants": 2,
+}
+
 
 
 
@@ -0,0 +1,29 @@
+"""Settings for the test suite: python manage.py test --settings=UniAccess.test_settings
+
+Both aliases are SQLite. "replica" is its own database rather than a TEST MIRROR
+of "default", so a test can tell which one a query was routed to.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_default.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_replica.sqlite3',
+    },
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Keep throttle buckets and debounced replies out of the shared SCAN_GUARD_DIR.
+CACHES = {
+    **CACHES,
+    'scan_guard': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'uniaccess-test-scan-guard',
+        'KEY_PREFIX': CACHE_KEY_PREFIX + ':g',
+    },
+}
@@ -1,6 +1,23 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import CustomUser, Course, CourseInfo, Enrollment, Attendance, RFIDTag, RfidScan, Profile
+from .models import CustomUser, Course, CourseInfo, Enrollment, Attendance, RFIDTag, RfidScan, Profile, UnassignedUid, AttendancePolicy, CalendarDay, Job
 
 
-admin.site.register([Course, CourseInfo, Enrollment, Attendance, RFIDTag, RfidScan, Profile])
\ No newline at end of file
+admin.site.register([Course, CourseInfo, Enrollment, Attendance, RFIDTag, RfidScan, Profile, UnassignedUid])
+
+
+class CalendarDayInline(admin.TabularInline):
+    model = CalendarDay
+    extra = 1
+
+
+@admin.register(AttendancePolicy)
+class AttendancePolicyAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "start_date", "end_date", "late_per_absence", "warning_1", "warning_2", "warning_3")
+    inlines = [CalendarDayInline]
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "progress_done", "progress_total", "created_by", "created_at", "finished_at")
+    list_filter = ("status", "kind")
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .services.cache import CacheNamespace
+
+# Upper bound on staleness for writes that bypass signals (queryset.update, bulk_update).
+USER_CACHE_TTL = 300
+user_cache = CacheNamespace("auth_user", ttl=USER_CACHE_TTL)
+
+
+def forget_cached_users(*user_ids):
+    user_cache.delete(*[pk for pk in user_ids if pk is not None])
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request get_user() is served from the cache.
+
+    The user is loaded once with its Profile and RFIDTag joined in, so pages
+    reading `request.user.profile` / `request.user.rfid_tag` add no queries.
+    Saving the user, its profile or its tag drops the entry (see signals).
+    """
+
+    def _queryset(self):
+        return get_user_model()._default_manager.select_related("profile", "rfid_tag")
+
+    def get_user(self, user_id):
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self._queryset().get(pk=user_id)
+            except get_user_model().DoesNotExist:
+                return None
+            user_cache.set(user_id, user)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await user_cache.aget(user_id)
+        if user is None:
+            try:
+                user = await self._queryset().aget(pk=user_id)
+            except get_user_model().DoesNotExist:
+                return None
+            await user_cache.aset(user_id, user)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,62 @@
+"""Conditional GET (ETag / Last-Modified) for views whose output is a function of
+signal-bumped version counters, so a poll with nothing new is answered 304 from
+one or two cache reads, without touching the database or rendering."""
+import hashlib
+import os
+from functools import lru_cache, wraps
+
+from django.contrib.messages import get_messages
+from django.template.loader import get_template
+from django.views.decorators.http import condition
+
+
+@lru_cache(maxsize=None)
+def _template_stamp(*names):
+    # Deploys that change the markup must not be answered with a browser's old copy.
+    mtimes = []
+    for name in names:
+        origin = get_template(name).origin.name
+        mtimes.append(int(os.path.getmtime(origin)))
+    return max(mtimes, default=0)
+
+
+def versioned(*versions, per_user=False, templates=()):
+    """Answer GETs with 304 while every `(namespace, key)` in `versions` is unchanged.
+
+    per_user: the body depends on request.user and the query string (an HTML
+    page). The ETag then also covers the user and their role (which picks the
+    action buttons and can change without a bump), the full path, the CSRF secret
+    behind the page's token and the template mtimes; Last-Modified is not sent
+    (it cannot tell users apart) and pages with pending flash messages are
+    always rendered.
+    """
+    def etag(request, *args, **kwargs):
+        bits = [f"{ns.name}:{ns.version(key)}" for ns, key in versions]
+        if per_user:
+            if len(get_messages(request)):
+                return None
+            bits += [
+                str(request.user.pk), getattr(request.user, "role", ""), str(request.user.is_superuser),
+                request.get_full_path(),
+                request.META.get("CSRF_COOKIE", ""), str(_template_stamp(*templates, "base.html")),
+            ]
+        return hashlib.blake2b("|".join(bits).encode(), digest_size=12).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        if per_user:
+            return None
+        stamps = [ns.changed_at(key) for ns, key in versions]
+        return None if None in stamps else max(stamps)
+
+    def decorator(view):
+        conditional = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            response = conditional(request, *args, **kwargs)
+            response.headers.setdefault("Cache-Control", "private, no-cache")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def live_events(request):
+    """Templates open an EventSource on live_events only when the feed is served."""
+    return {"live_events_enabled": settings.LIVE_EVENTS_ENABLED}
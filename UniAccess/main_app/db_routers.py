@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_ALIAS = "replica"
+# Session rows must never be read from a lagging copy, or a fresh login looks logged out.
+# "django_cache" is DatabaseCache's table: cache state is only meaningful on the primary.
+PRIMARY_ONLY_APPS = {"sessions", "django_cache"}
+
+# Per request/command routing state; a dict so the router can flag writes in place.
+_state = ContextVar("db_routing_state", default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def new_state(use_replica=False, pinned=False):
+    return {"use_replica": use_replica, "pinned": pinned, "wrote": False}
+
+
+@contextmanager
+def routing_state(**kwargs):
+    token = _state.set(new_state(**kwargs))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def bound_routing_state(state):
+    """Re-enter a request's routing state, e.g. while a streamed response body is produced."""
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Route reads inside the block to the replica (report commands, exports)."""
+    with routing_state(use_replica=True) as state:
+        yield state
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, whatever the request opted into. For
+    filling version-keyed cache entries: a fill read from a lagging replica right
+    after a bump would store stale data under the new version."""
+    with routing_state() as state:
+        yield state
+
+
+def replica_ok(view_func):
+    """Mark a read-only view as safe to serve from the replica (see ReplicaRoutingMiddleware)."""
+    view_func.replica_ok = True
+    return view_func
+
+
+class ReplicaRouter:
+    """Send reads to REPLICA_ALIAS only when the current request/command opted in."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if not state or not state["use_replica"] or state["pinned"] or state["wrote"]:
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS or not replica_configured():
+            return None
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        # A cache fill is not a data write; it must not pin the browser to the primary.
+        if state is not None and model._meta.app_label != "django_cache":
+            state["wrote"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either may relate.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
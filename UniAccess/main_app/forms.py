@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import CustomUser , Profile , Course , CourseInfo , RFIDTag , RfidScan
+from .models import CustomUser , Profile , Course , CourseInfo , RFIDTag
+from .services.rfid_index import latest_unassigned
 from django.contrib.auth import get_user_model
 from django.db import transaction
 
@@ -51,6 +52,13 @@ class CustomUserCreationForm(UserCreationForm):
 
 
 
+class StudentImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label="Students CSV",
+        help_text="Columns: username, first_name, last_name, email, password, college, phone, uid",
+    )
+
+
 class ProfileForm(forms.ModelForm):
     class Meta:
         model = Profile
@@ -83,32 +91,7 @@ class CourseInfoForm(forms.ModelForm):
 
 
 def recent_unassigned_uids(limit=25):
-    assigned_uids = set(
-        RFIDTag.objects.filter(assigned_to__isnull=False)
-        .values_list("tag_uid", flat=True)
-    )
-
-    seen = set()
-    out = []
-    for rec in RfidScan.objects.select_related("tag", "user").order_by('-created_at')[:1000]:
-        uid = rec.uid
-        if uid in seen:
-            continue
-        seen.add(uid)
-        
-        if uid in assigned_uids:
-            continue
-        
-        try:
-            tag = RFIDTag.objects.select_related('assigned_to').get(tag_uid=uid)
-            if tag.assigned_to:  
-                continue
-        except RFIDTag.DoesNotExist:
-            pass
-        out.append(uid)
-        if len(out) >= limit:
-            break
-    return [(u, u) for u in out]
+    return [(u, u) for u in latest_unassigned(limit)]
 
 class AdminCreateStudentForm(UserCreationForm):
     uid_choice = forms.ChoiceField(
@@ -0,0 +1,92 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+
+DEFAULT_PAGES = {
+    "student": ["student_dashboard", "courseInfo_list"],
+    "teacher": ["teacher_dashboard", "courseInfo_list"],
+    "admin": ["attendance_list", "courseInfo_list"],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time full GET renders of heavy pages as a given user, first with {% cache %} "
+        "fragments disabled (before) and then enabled (after)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username to render the pages as.")
+        parser.add_argument("--url", action="append", dest="urls",
+                            help="URL name or path (repeatable). Default: the user's dashboards and lists.")
+        parser.add_argument("-n", "--requests", type=int, default=30, help="Timed requests per page and mode.")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests before each run.")
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=opts["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user '{opts['user']}'.")
+
+        # Teachers are created with is_staff=True, so the role field decides; the staff
+        # flags only stand in for accounts without one (e.g. createsuperuser).
+        role = getattr(user, "role", "") or ("admin" if user.is_staff or user.is_superuser else "student")
+        paths = [self._path(u) for u in (opts["urls"] or DEFAULT_PAGES.get(role, []))]
+        host = next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if h != "*"), "testserver")
+
+        client = Client(HTTP_HOST=host)
+        client.force_login(user)
+
+        rows = []
+        for path in paths:
+            # The {% cache %} tag prefers a "template_fragments" alias; pointing it at
+            # DummyCache renders every fragment while data caches stay as configured.
+            no_fragments = {**settings.CACHES, "template_fragments": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+            }}
+            with override_settings(CACHES=no_fragments):
+                rows.append((path, "before", *self._run(client, path, opts)))
+            rows.append((path, "after", *self._run(client, path, opts)))
+
+        self.stdout.write(f"{'page':40} {'mode':7} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+        for path, mode, mean, p50, p95, queries in rows:
+            self.stdout.write(f"{path:40} {mode:7} {mean:8.2f} {p50:8.2f} {p95:8.2f} {queries:8.1f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {len(paths)} page(s) × {opts['requests']} requests per mode as {user.username}."
+        ))
+
+    def _path(self, name):
+        if name.startswith("/"):
+            return name
+        try:
+            return reverse(name)
+        except NoReverseMatch:
+            raise CommandError(f"Unknown URL name '{name}'.")
+
+    def _run(self, client, path, opts):
+        for _ in range(opts["warmup"]):
+            self._get(client, path)
+        timings, queries = [], []
+        for _ in range(opts["requests"]):
+            with CaptureQueriesContext(connections["default"]) as ctx:
+                started = time.perf_counter()
+                self._get(client, path)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(ctx.captured_queries))
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return statistics.mean(timings), statistics.median(timings), p95, statistics.mean(queries)
+
+    def _get(self, client, path):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} returned {response.status_code}.")
+        return response
@@ -0,0 +1,152 @@
+import json
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import RequestFactory
+from django.urls import resolve
+from main_app.models import RFIDTag
+
+INPROC_PREFIX = "inproc:"
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, int(round(pct / 100 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent RFID scans at one or more running servers and report throughput/latency.\n"
+        "Example (compare WSGI vs ASGI):\n"
+        "  gunicorn UniAccess.wsgi -w 4 -b :8000\n"
+        "  uvicorn UniAccess.asgi:application --workers 4 --port 8001\n"
+        "  manage.py bench_scan --target wsgi=http://127.0.0.1:8000/api/rfid/scan/ "
+        "--target asgi=http://127.0.0.1:8001/api/rfid/async/scan/\n"
+        "Targets of the form label=inproc:/api/rfid/scan/ call the view in this process and\n"
+        "open/close DB connections the way the request handler does, so running the same\n"
+        "target with DB_POOL=1 vs DB_POOL=0 DB_CONN_MAX_AGE=0 isolates connection overhead.\n"
+        "Every request writes a real RfidScan row: run it against a staging database.\n"
+        "Each request uses its own device_id (and, in-process, its own source IP) so the\n"
+        "scan throttle and tap debounce don't answer in place of the view; an HTTP target\n"
+        "sees one client IP, so start that server with RFID_IP_RATE=0. 429s and debounced\n"
+        "replies are counted in their own columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", required=True,
+                            help="label=url of a scan endpoint; repeat to compare.")
+        parser.add_argument("--readers", type=int, default=50,
+                            help="Concurrent readers (client threads). Default 50.")
+        parser.add_argument("--requests", type=int, default=1000,
+                            help="Scans per target. Default 1000.")
+        parser.add_argument("--uids", default="",
+                            help="Comma-separated UIDs; default: assigned tags from the database.")
+        parser.add_argument("--timeout", type=float, default=10.0)
+
+    def handle(self, *args, **opts):
+        targets = []
+        for spec in opts["target"]:
+            label, sep, url = spec.partition("=")
+            if not sep or not url:
+                raise CommandError(f"--target must be label=url, got '{spec}'")
+            targets.append((label, url))
+
+        uids = [u.strip() for u in opts["uids"].split(",") if u.strip()]
+        if not uids:
+            uids = list(
+                RFIDTag.objects.filter(assigned_to__isnull=False)
+                .values_list("tag_uid", flat=True)[: max(opts["readers"], 1)]
+            )
+        if not uids:
+            raise CommandError("No UIDs to scan; pass --uids or assign some tags first.")
+
+        db = connection.settings_dict
+        self.stdout.write(
+            f"DB: CONN_MAX_AGE={db.get('CONN_MAX_AGE')} "
+            f"pool={db.get('OPTIONS', {}).get('pool') or 'off'}"
+        )
+        self.stdout.write(f"{'target':<10} {'reqs':>6} {'errors':>6} {'429':>6} {'dbnc':>6} {'req/s':>8} "
+                          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+        for label, url in targets:
+            stats = self._run(url, uids, opts)
+            lat = sorted(stats["latencies"])
+            self.stdout.write(
+                f"{label:<10} {opts['requests']:>6} {stats['errors']:>6} "
+                f"{stats['codes'].get(429, 0):>6} {stats['debounced']:>6} "
+                f"{opts['requests'] / stats['elapsed']:>8.1f} "
+                f"{_percentile(lat, 50) * 1000:>8.1f} {_percentile(lat, 95) * 1000:>8.1f} "
+                f"{_percentile(lat, 99) * 1000:>8.1f}  {dict(stats['codes'])}"
+            )
+
+    def _run(self, url, uids, opts):
+        run = uuid.uuid4().hex[:8]
+
+        def body_for(i):
+            # A fresh device per request: no shared device bucket, no debounce key reuse.
+            return json.dumps({"uid": uids[i % len(uids)], "device_id": f"BENCH-{run}-{i}"}).encode()
+
+        def one_http(i):
+            req = urllib.request.Request(url, data=body_for(i), headers={"Content-Type": "application/json"})
+            started = time.perf_counter()
+            debounced = False
+            try:
+                with urllib.request.urlopen(req, timeout=opts["timeout"]) as resp:
+                    resp.read()
+                    code = resp.status
+                    debounced = resp.headers.get("X-Debounced") == "1"
+            except urllib.error.HTTPError as e:
+                code = e.code
+            except Exception:
+                code = "error"
+            return code, time.perf_counter() - started, debounced
+
+        if url.startswith(INPROC_PREFIX):
+            path = url[len(INPROC_PREFIX):]
+            view = resolve(path).func
+            if iscoroutinefunction(view):
+                view = async_to_sync(view)
+            factory = RequestFactory()
+
+            def one(i):
+                request = factory.post(
+                    path, data=body_for(i), content_type="application/json",
+                    REMOTE_ADDR=f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                )
+                started = time.perf_counter()
+                debounced = False
+                close_old_connections()  # request_started
+                try:
+                    response = view(request)
+                    code = response.status_code
+                    debounced = response.get("X-Debounced") == "1"
+                except Exception:
+                    code = "error"
+                finally:
+                    close_old_connections()  # request_finished
+                return code, time.perf_counter() - started, debounced
+        else:
+            one = one_http
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts["readers"]) as pool:
+            results = list(pool.map(one, range(opts["requests"])))
+        elapsed = time.perf_counter() - started
+
+        codes = Counter(code for code, _, _ in results)
+        return {
+            "elapsed": elapsed,
+            "latencies": [t for _, t, _ in results],
+            "codes": codes,
+            "debounced": sum(1 for _, _, debounced in results if debounced),
+            # 404 is the normal "unknown tag" answer, not a failure; 429 has its own column
+            "errors": sum(n for code, n in codes.items() if code == "error" or code >= 500),
+        }
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from main_app.services.provisioning import (
+    BATCH_SIZE, read_student_rows, validate_student_rows, provision_students,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create student accounts from a CSV "
+        "(username,first_name,last_name,email,password,college,phone,uid)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Path to the CSV file.")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Password hashing processes (default: CPU count).")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                            help=f"Rows per INSERT statement (default {BATCH_SIZE}).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Validate only; write nothing.")
+
+    def handle(self, *args, **opts):
+        try:
+            with open(opts["csv_path"], "rb") as fh:
+                rows, errors = read_student_rows(fh)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        errors += validate_student_rows(rows)
+        if errors:
+            for err in errors:
+                self.stderr.write(err)
+            raise CommandError(f"{len(errors)} problem(s) found; nothing imported.")
+
+        if opts["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"{len(rows)} rows valid (dry run)."))
+            return
+
+        started = time.monotonic()
+        result = provision_students(rows, workers=opts["workers"], batch_size=opts["batch_size"])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created} students "
+            f"({result.tags_created} new tags, {result.tags_assigned} existing tags assigned) "
+            f"in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from main_app.models import Enrollment
+from main_app.services.warnings import recompute_warnings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute attendance warning levels for all (or filtered) enrollments, "
+        "e.g. after changing the attendance policy or bulk corrections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--college", help="Only sections of courses in this college.")
+        parser.add_argument("--year", type=int, help="Only sections of this year.")
+        parser.add_argument("--semester", choices=["first", "second", "summer"])
+        parser.add_argument("--course-info", type=int, action="append", dest="course_info",
+                            help="Only this section id (repeatable).")
+        parser.add_argument("--dry-run", action="store_true", help="Report changes without writing.")
+        parser.add_argument("--no-notify", action="store_true", help="Do not email students whose level went up.")
+
+    def handle(self, *args, **opts):
+        qs = Enrollment.objects.all()
+        if opts["college"]:
+            qs = qs.filter(course_info__course__college=opts["college"])
+        if opts["year"]:
+            qs = qs.filter(course_info__year=opts["year"])
+        if opts["semester"]:
+            qs = qs.filter(course_info__semester=opts["semester"])
+        if opts["course_info"]:
+            qs = qs.filter(course_info_id__in=opts["course_info"])
+
+        started = time.monotonic()
+        result = recompute_warnings(qs, notify=not opts["no_notify"], dry_run=opts["dry_run"])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry run] ' if opts['dry_run'] else ''}"
+            f"{result.total} enrollments checked, {result.changed} changed "
+            f"({result.raised} up, {result.lowered} down), {result.notified} notices queued "
+            f"in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,71 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from main_app.services.jobs import (
+    JOB_HANDLERS, default_worker_name, fail_stale, heartbeat, work_once,
+)
+
+HEARTBEAT_SEC = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (exports, recomputations, imports, reports).\n"
+        "Start one or more of these next to the web server; per-kind limits come from\n"
+        "settings.JOB_CONCURRENCY and hold across every running worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2,
+                            help="Jobs this worker runs at once (threads). Default 2.")
+        parser.add_argument("--kind", action="append", dest="kinds", choices=sorted(JOB_HANDLERS),
+                            help="Only run this job kind (repeatable).")
+        parser.add_argument("--poll", type=float, default=2.0,
+                            help="Seconds to wait when the queue is empty. Default 2.")
+        parser.add_argument("--stale-after", type=int, default=300,
+                            help="Fail running jobs with no heartbeat for this many seconds. Default 300.")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit once the queue is empty instead of polling.")
+
+    def handle(self, *args, **opts):
+        worker = default_worker_name()
+        stop = threading.Event()
+
+        def _stop(signum, frame):
+            self.stdout.write("Stopping after current jobs…")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        counts = {"done": 0}
+        lock = threading.Lock()
+
+        def loop():
+            while not stop.is_set():
+                job = work_once(worker, opts["kinds"])
+                if job is None:
+                    if opts["once"]:
+                        return
+                    stop.wait(opts["poll"])
+                    continue
+                with lock:
+                    counts["done"] += 1
+                self.stdout.write(f"{job} finished")
+
+        stale = fail_stale(opts["stale_after"])
+        if stale:
+            self.stdout.write(self.style.WARNING(f"Marked {stale} stale job(s) as failed."))
+        self.stdout.write(f"Worker {worker}: {opts['concurrency']} slot(s), kinds={opts['kinds'] or 'all'}")
+
+        threads = [threading.Thread(target=loop, daemon=True) for _ in range(max(1, opts["concurrency"]))]
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=HEARTBEAT_SEC / len(threads))
+            heartbeat(worker)
+            fail_stale(opts["stale_after"])
+
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} ran {counts['done']} job(s)."))
@@ -0,0 +1,56 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the weight of collected static assets: raw, gzip and brotli sizes of "
+        "every hashed file in STATIC_ROOT (run after collectstatic)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=0, help="Only list the N largest assets.")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON (for CI tracking).")
+
+    def handle(self, *args, **opts):
+        root = str(settings.STATIC_ROOT)
+        manifest = os.path.join(root, "staticfiles.json")
+        try:
+            with open(manifest) as fh:
+                paths = json.load(fh)["paths"]
+        except (OSError, ValueError, KeyError):
+            raise CommandError(f"No manifest at {manifest}; run collectstatic with the manifest storage first.")
+
+        rows = []
+        for name, hashed in paths.items():
+            path = os.path.join(root, hashed)
+            if not os.path.isfile(path):
+                continue
+            rows.append({
+                "name": name, "hashed": hashed, "raw": os.path.getsize(path),
+                "gz": self._size(path + ".gz"), "br": self._size(path + ".br"),
+            })
+        rows.sort(key=lambda r: r["raw"], reverse=True)
+        totals = {
+            "raw": sum(r["raw"] for r in rows),
+            # What a gzip/brotli client actually downloads: the variant if there is one.
+            "gz": sum(r["gz"] or r["raw"] for r in rows),
+            "br": sum(r["br"] or r["gz"] or r["raw"] for r in rows),
+        }
+        shown = rows[:opts["top"]] if opts["top"] else rows
+
+        if opts["json"]:
+            self.stdout.write(json.dumps({"assets": shown, "totals": totals, "count": len(rows)}, indent=2))
+            return
+
+        self.stdout.write(f"{'asset':50} {'raw':>10} {'gzip':>10} {'brotli':>10}")
+        for r in shown:
+            self.stdout.write(f"{r['name'][:50]:50} {r['raw']:>10} {r['gz'] or '-':>10} {r['br'] or '-':>10}")
+        self.stdout.write(f"{'total (as served)':50} {totals['raw']:>10} {totals['gz']:>10} {totals['br']:>10}")
+        self.stdout.write(self.style.SUCCESS(f"{len(rows)} asset(s) in {root}."))
+
+    def _size(self, path):
+        return os.path.getsize(path) if os.path.isfile(path) else None
@@ -0,0 +1,118 @@
+import mimetypes
+import os
+import posixpath
+import time
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .db_routers import routing_state
+
+PIN_COOKIE = "db_pin"
+
+
+class ReplicaRoutingMiddleware:
+    """Serve @replica_ok GET views from the replica, except for a browser that wrote
+    something in the last REPLICA_STICKY_SECONDS (read-your-writes)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.window = int(getattr(settings, "REPLICA_STICKY_SECONDS", 10))
+
+    def _pinned(self, request):
+        try:
+            return time.time() - int(request.COOKIES.get(PIN_COOKIE, "0")) < self.window
+        except ValueError:
+            return False
+
+    def __call__(self, request):
+        with routing_state(pinned=self._pinned(request)) as state:
+            request.db_routing = state
+            response = self.get_response(request)
+        if state["wrote"]:
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time())),
+                max_age=self.window, httponly=True, samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in ("GET", "HEAD") and getattr(view_func, "replica_ok", False):
+            request.db_routing["use_replica"] = True
+
+
+def _accepts(header, coding):
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() in (coding, "*"):
+            q = params.strip()
+            return not (q.startswith("q=") and float(q[2:] or 0) == 0)
+    return False
+
+
+class PrecompressedStaticMiddleware:
+    """Serve collectstatic output from STATIC_ROOT, picking the .br/.gz variant the
+    client accepts; content-hashed names are cached for a year as immutable.
+
+    Enabled by settings.SERVE_STATIC; sits right after SecurityMiddleware so asset
+    requests skip sessions, auth and routing. Unknown paths fall through (404).
+    """
+
+    ENCODINGS = ((".br", "br"), (".gz", "gzip"))
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SERVE_STATIC", False) or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = "/" + settings.STATIC_URL.lstrip("/")
+        self.root = str(settings.STATIC_ROOT)
+        self.max_age = int(getattr(settings, "STATIC_MAX_AGE", 3600))
+        self._hashed = None
+
+    def __call__(self, request):
+        if request.method in ("GET", "HEAD") and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def is_hashed(self, name):
+        if self._hashed is None:
+            self._hashed = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+        return name in self._hashed
+
+    def serve(self, request, name):
+        name = posixpath.normpath(unquote(name)).lstrip("/")
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path) or path.endswith((".gz", ".br")):
+            return None
+
+        chosen, coding = path, None
+        accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        for suffix, enc in self.ENCODINGS:
+            if _accepts(accept, enc) and os.path.isfile(path + suffix):
+                chosen, coding = path + suffix, enc
+                break
+
+        mtime = os.stat(path).st_mtime
+        if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), mtime):
+            return HttpResponseNotModified()
+        content_type, _ = mimetypes.guess_type(path)
+        response = FileResponse(open(chosen, "rb"), content_type=content_type or "application/octet-stream")
+        response["Last-Modified"] = http_date(mtime)
+        response["Vary"] = "Accept-Encoding"
+        if coding:
+            response["Content-Encoding"] = coding
+        response["Cache-Control"] = (
+            "public, max-age=31536000, immutable" if self.is_hashed(name) else f"public, max-age={self.max_age}"
+        )
+        return response
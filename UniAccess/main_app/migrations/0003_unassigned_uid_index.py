@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:39
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_unassigned(apps, schema_editor):
+    RfidScan = apps.get_model('main_app', 'RfidScan')
+    RFIDTag = apps.get_model('main_app', 'RFIDTag')
+    UnassignedUid = apps.get_model('main_app', 'UnassignedUid')
+    db = schema_editor.connection.alias
+    assigned = RFIDTag.objects.using(db).filter(assigned_to__isnull=False).values('tag_uid')
+    rows = (
+        RfidScan.objects.using(db).filter(user__isnull=True)
+        .exclude(uid__in=assigned)
+        .values('uid')
+        .annotate(last=Max('created_at'))
+    )
+    UnassignedUid.objects.using(db).bulk_create(
+        [UnassignedUid(uid=r['uid'], last_seen=r['last']) for r in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0002_enrollment_attendance_warning_level_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnassignedUid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.CharField(max_length=100, unique=True)),
+                ('last_seen', models.DateTimeField(db_index=True)),
+                ('device_id', models.CharField(blank=True, max_length=64, null=True)),
+            ],
+            options={
+                'ordering': ['-last_seen'],
+            },
+        ),
+        migrations.RunPython(backfill_unassigned, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:48
+
+import django.core.validators
+import django.db.models.deletion
+import main_app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0003_unassigned_uid_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendancePolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(default=main_app.models.current_year)),
+                ('semester', models.CharField(choices=[('first', 'First'), ('second', 'Second'), ('summer', 'Summer')], max_length=10)),
+                ('college', models.CharField(blank=True, choices=[('arts_science', 'College of Arts & Science'), ('business_finance', 'College of Business & Finance'), ('engineering', 'College of Engineering'), ('it', 'College of Information Technology'), ('medical_health', 'College of Medical & Health Sciences'), ('general', 'General')], help_text='Leave blank to apply to every college in the term.', max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('late_per_absence', models.PositiveSmallIntegerField(default=4, validators=[django.core.validators.MinValueValidator(1)])),
+                ('warning_1', models.FloatField(default=0.25)),
+                ('warning_2', models.FloatField(default=0.5)),
+                ('warning_3', models.FloatField(default=0.75)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year', 'semester', 'college'), name='unique_policy_per_term_college'), models.CheckConstraint(condition=models.Q(('end_date__gte', models.F('start_date'))), name='policy_end_after_start')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendarDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('kind', models.CharField(choices=[('holiday', 'Holiday (no classes)'), ('cancelled', 'Cancelled session'), ('makeup', 'Make-up session')], max_length=10)),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('course_info', models.ForeignKey(blank=True, help_text='Required for cancelled/make-up sessions; leave blank for holidays.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_days', to='main_app.courseinfo')),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_days', to='main_app.attendancepolicy')),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0006_profile_avatar_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rfidscan',
+            name='device_ts',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rfidscan',
+            name='event_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='rfidscan',
+            constraint=models.UniqueConstraint(condition=models.Q(('event_id__isnull', False)), fields=('device_id', 'event_id'), name='rfidscan_device_event_uniq'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:19
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models, transaction
+
+# Keys build_scan_row used to write into `extra`; all of them now have a column
+# (ts is created_at / device_ts).
+MOVED_KEYS = {'ts', 'status', 'source_ip', 'known', 'note'}
+BATCH = 2000
+
+
+def move_extra_to_columns(apps, schema_editor):
+    RfidScan = apps.get_model('main_app', 'RfidScan')
+    db = schema_editor.connection.alias
+    rows = RfidScan.objects.using(db).filter(extra__isnull=False).only(
+        'id', 'user_id', 'status', 'source_ip', 'success', 'note', 'extra',
+    )
+    last_id = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id).order_by('id')[:BATCH])
+        if not batch:
+            break
+        for scan in batch:
+            extra = scan.extra if isinstance(scan.extra, dict) else {}
+            scan.status = (extra.get('status') or scan.status or 'SCAN')[:10]
+            scan.source_ip = extra.get('source_ip') or scan.source_ip
+            scan.success = bool(extra.get('known', scan.user_id is not None))
+            scan.note = extra.get('note') or scan.note
+            rest = {k: v for k, v in extra.items() if k not in MOVED_KEYS}
+            scan.extra = rest or None
+        # One transaction per batch: the table is hot, so never lock it all at once.
+        with transaction.atomic(using=db):
+            RfidScan.objects.using(db).bulk_update(batch, ['status', 'source_ip', 'success', 'note', 'extra'])
+        last_id = batch[-1].id
+    # Rows written before scans carried `extra` at all.
+    RfidScan.objects.using(db).filter(extra__isnull=True, success=False, user__isnull=False).update(success=True)
+
+
+def restore_extra(apps, schema_editor):
+    RfidScan = apps.get_model('main_app', 'RfidScan')
+    db = schema_editor.connection.alias
+    rows = RfidScan.objects.using(db).only('id', 'created_at', 'status', 'source_ip', 'success', 'note', 'extra')
+    last_id = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id).order_by('id')[:BATCH])
+        if not batch:
+            break
+        for scan in batch:
+            scan.extra = {
+                **(scan.extra or {}),
+                'ts': scan.created_at.isoformat(), 'status': scan.status, 'source_ip': scan.source_ip,
+                'known': scan.success, 'note': scan.note,
+            }
+        with transaction.atomic(using=db):
+            RfidScan.objects.using(db).bulk_update(batch, ['extra'])
+        last_id = batch[-1].id
+
+
+class AddIndexOnline(AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY on PostgreSQL, so rfid_scan keeps taking writes
+    while the index builds; a plain AddIndex on other backends (dev/test SQLite)."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('main_app', '0007_rfidscan_event_id'),
+    ]
+
+    operations = [
+        # Backfill first so the partial index is built over the final `success` values.
+        migrations.RunPython(move_extra_to_columns, restore_extra),
+        AddIndexOnline(
+            model_name='rfidscan',
+            index=models.Index(fields=['created_at'], name='rfidscan_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='rfidscan',
+            index=models.Index(fields=['user', '-created_at'], name='rfidscan_user_recent_idx'),
+        ),
+        AddIndexOnline(
+            model_name='rfidscan',
+            index=models.Index(condition=models.Q(('success', False)), fields=['-created_at'], name='rfidscan_failed_idx'),
+        ),
+    ]
@@ -35,14 +35,22 @@ class CustomUser(AbstractUser):
     college = models.CharField(max_length=100, choices=COLLEGE_CHOICES)
     custom_id = models.CharField(max_length=50, unique=True, db_index=True)
 
+    ID_PREFIXES = {'student': 'S', 'teacher': 'T', 'admin': 'A'}
+
+    @classmethod
+    def build_custom_id(cls, role, pk, year=None):
+        year = year or timezone.now().year
+        prefix = cls.ID_PREFIXES.get(role, 'X')
+        return f"{prefix}{year}{pk:04d}"
+
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        if not is_new and not self.custom_id:
+            # pk preallocated by the caller (bulk provisioning): one INSERT is enough
+            self.custom_id = self.build_custom_id(self.role, self.pk)
         super().save(*args, **kwargs)
         if is_new and not self.custom_id:
-            year = timezone.now().year
-            prefix = {'student': 'S', 'teacher': 'T', 'admin': 'A'}.get(self.role, 'X')
-            number_part = f"{self.id:04d}"
-            self.custom_id = f"{prefix}{year}{number_part}"
+            self.custom_id = self.build_custom_id(self.role, self.id)
             super().save(update_fields=['custom_id'])
 
     def __str__(self):
@@ -191,13 +199,34 @@ class RfidScan(models.Model):
     device_id = models.CharField(max_length=64, blank=True, null=True)
     source_ip = models.GenericIPAddressField(blank=True, null=True)
     status = models.CharField(max_length=10, default="SCAN")  # IN / OUT / SCAN
-    success = models.BooleanField(default=False)
+    success = models.BooleanField(default=False)  # the tag belonged to a user at scan time
     note = models.TextField(blank=True, null=True)
+    # Optional diagnostics only; everything a scan always has lives in the columns above.
     extra = models.JSONField(blank=True, null=True)
+    # Reader-generated id of the tap, unique per device: a retried or replayed POST
+    # carries the same id and is recognised instead of stored twice.
+    event_id = models.CharField(max_length=64, blank=True, null=True)
+    # When the card was tapped by the reader's clock (created_at is when we got it).
+    device_ts = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device_id", "event_id"],
+                condition=models.Q(event_id__isnull=False),
+                name="rfidscan_device_event_uniq",
+            ),
+        ]
+        indexes = [
+            # Today's scan counts / per-hour chart, and the default ordering.
+            models.Index(fields=["created_at"], name="rfidscan_created_idx"),
+            # A student's (or a section's students') recent scans.
+            models.Index(fields=["user", "-created_at"], name="rfidscan_user_recent_idx"),
+            # Unknown-tag scans are a small fraction; a partial index keeps it tiny.
+            models.Index(fields=["-created_at"], condition=models.Q(success=False), name="rfidscan_failed_idx"),
+        ]
 
     def __str__(self):
         local_ts = timezone.localtime(self.created_at)
@@ -206,6 +235,19 @@ class RfidScan(models.Model):
     
 
 
+class UnassignedUid(models.Model):
+    """Recently scanned UIDs with no assigned user; feeds the admin tag picker."""
+    uid = models.CharField(max_length=100, unique=True)
+    last_seen = models.DateTimeField(db_index=True)
+    device_id = models.CharField(max_length=64, blank=True, null=True)
+
+    class Meta:
+        ordering = ["-last_seen"]
+
+    def __str__(self):
+        return f"{self.uid} @ {timezone.localtime(self.last_seen).strftime('%Y-%m-%d %H:%M:%S')}"
+
+
 class Attendance(models.Model):
     STATUS_CHOICES = [
         ("PRESENT", "Present"),
@@ -239,12 +281,118 @@ class Attendance(models.Model):
         return f"{self.student} / {self.course_info} / {self.session_date} → {self.status}"
 
 
+class AttendancePolicy(models.Model):
+    """Attendance rules and teaching window for one term, optionally per college."""
+    year = models.PositiveIntegerField(default=current_year)
+    semester = models.CharField(max_length=10, choices=CourseInfo.SEMESTER_CHOICES)
+    college = models.CharField(
+        max_length=100, choices=Course.COLLEGE_CHOICES, blank=True,
+        help_text="Leave blank to apply to every college in the term.",
+    )
+    start_date = models.DateField()
+    end_date = models.DateField()
+    late_per_absence = models.PositiveSmallIntegerField(default=4, validators=[MinValueValidator(1)])
+    warning_1 = models.FloatField(default=0.25)
+    warning_2 = models.FloatField(default=0.50)
+    warning_3 = models.FloatField(default=0.75)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'semester', 'college'], name='unique_policy_per_term_college'),
+            models.CheckConstraint(check=models.Q(end_date__gte=models.F('start_date')), name='policy_end_after_start'),
+        ]
+
+    @property
+    def thresholds(self):
+        return (self.warning_1, self.warning_2, self.warning_3)
+
+    def __str__(self):
+        return f"{self.year} / {self.get_semester_display()} – {self.get_college_display() or 'All colleges'}"
+
+
+class CalendarDay(models.Model):
+    """Exceptions to the weekly pattern inside a policy's teaching window."""
+    KIND_CHOICES = [
+        ('holiday', 'Holiday (no classes)'),
+        ('cancelled', 'Cancelled session'),
+        ('makeup', 'Make-up session'),
+    ]
+
+    policy = models.ForeignKey(AttendancePolicy, on_delete=models.CASCADE, related_name='calendar_days')
+    date = models.DateField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    course_info = models.ForeignKey(
+        CourseInfo, on_delete=models.CASCADE, null=True, blank=True, related_name='calendar_days',
+        help_text="Required for cancelled/make-up sessions; leave blank for holidays.",
+    )
+    note = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        target = self.course_info.course.code if self.course_info else "all"
+        return f"{self.date} {self.get_kind_display()} ({target})"
+
+
 class Profile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='profile')
     avatar = models.ImageField(upload_to='avatars/', default='avatars/default.jpg')
+    # {"source": <avatar name>, "sizes": {"64": {"webp": name, "jpg": name}, ...}}; filled by the avatar_variants job.
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.TextField(blank=True)
     location = models.CharField(max_length=100, blank=True)
     phone = models.CharField(max_length=20, blank=True)
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
+
+
+class Job(models.Model):
+    """A unit of heavy admin work executed by the run_jobs worker, not the request thread."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    FINISHED = ('succeeded', 'failed', 'cancelled')
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs',
+    )
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    result_file = models.CharField(max_length=255, blank=True, help_text="Path relative to JOBS_ROOT.")
+    cancel_requested = models.BooleanField(default=False)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'], name='job_status_created_idx')]
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED
+
+    @property
+    def percent(self):
+        if self.status == 'succeeded':
+            return 100
+        if not self.progress_total:
+            return 0
+        return min(100, round(100 * self.progress_done / self.progress_total))
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} ({self.status})"
@@ -0,0 +1,11 @@
+from .cache import CacheNamespace , cache_metrics , bump_fragments
+from .provisioning import read_student_rows , validate_student_rows , provision_students , hash_passwords , preallocate_user_ids
+from .rfid_index import note_unassigned_scan , anote_unassigned_scan , discard_unassigned , latest_unassigned
+from .policy import PolicyCalc , calculate_policy , planned_sessions , policy_for , CompiledPolicy
+from .warnings import recompute_warnings , policy_arrays
+from .attendance_query import AttendanceFilters , attendance_queryset , section_options
+from .reports import build_section_matrix , write_department_reports
+from .jobs import enqueue , request_cancel , job_handler
+from .timetable import student_timetable , bump_enrollment_version
+from .teacher_stats import teacher_stats , bump_teacher_stats
+from .throttle import throttle_scans , throttle_metrics
@@ -0,0 +1,218 @@
+from dataclasses import dataclass, asdict
+from datetime import datetime
+
+from django.db.models import Q, Subquery, OuterRef, IntegerField, Value
+from django.db.models.functions import Coalesce
+
+from ..models import Attendance, CourseInfo, Enrollment
+from .cache import CacheNamespace
+
+ADMIN, TEACHER, STUDENT = "admin", "teacher", "student"
+
+ALLOWED_ORDER = {
+    "session_date", "-session_date",
+    "first_seen", "-first_seen",
+    "status", "-status",
+    "student__username", "-student__username",
+    "course_info__course__code", "-course_info__course__code",
+    "course_info__class_name", "-course_info__class_name",
+}
+DEFAULT_ORDER = "-session_date"
+MAX_ROWS = 1000
+
+# Free-text search columns per audience (students search their courses, not classmates).
+SEARCH_FIELDS = {
+    ADMIN: (
+        "student__username", "student__first_name", "student__last_name",
+        "student__custom_id", "student__email",
+    ),
+    TEACHER: (
+        "student__username", "student__first_name", "student__last_name",
+        "student__custom_id", "student__email",
+        "course_info__course__code", "course_info__course__name",
+    ),
+    STUDENT: (
+        "course_info__course__code", "course_info__course__name", "course_info__class_name",
+        "course_info__teacher__username", "course_info__teacher__first_name",
+        "course_info__teacher__last_name",
+    ),
+}
+
+SECTIONS_TTL = 600
+section_cache = CacheNamespace("attendance_sections", ttl=SECTIONS_TTL)
+
+
+def _parse_date(s):
+    try:
+        return datetime.strptime(s, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+def _int_or_none(s):
+    try:
+        return int(s)
+    except (TypeError, ValueError):
+        return None
+
+
+def scope_for(user):
+    if user.is_staff or user.is_superuser:
+        return ADMIN
+    if getattr(user, "role", None) == "teacher":
+        return TEACHER
+    return STUDENT
+
+
+@dataclass
+class AttendanceFilters:
+    q: str = ""
+    status: str = ""
+    section_id: str = ""
+    college: str = ""
+    teacher_id: str = ""
+    device_id: str = ""
+    start: str = ""
+    end: str = ""
+    order: str = DEFAULT_ORDER
+
+    @classmethod
+    def from_request(cls, request):
+        return cls.from_query(request.GET)
+
+    @classmethod
+    def from_query(cls, get):
+        f = cls(
+            q=(get.get("q") or "").strip(),
+            status=(get.get("status") or "").strip(),
+            section_id=(get.get("course_info") or "").strip(),
+            college=(get.get("college") or "").strip(),
+            teacher_id=(get.get("teacher") or "").strip(),
+            device_id=(get.get("device_id") or "").strip(),
+            start=(get.get("start") or "").strip(),
+            end=(get.get("end") or "").strip(),
+            order=(get.get("order") or DEFAULT_ORDER).strip(),
+        )
+        if f.order not in ALLOWED_ORDER:
+            f.order = DEFAULT_ORDER
+        return f
+
+    def as_context(self):
+        return asdict(self)
+
+
+def attendance_queryset(user, filters, scope=None, with_warn_level=False):
+    """Attendance rows `user` may see under `scope`, narrowed by `filters` and ordered."""
+    scope = scope or scope_for(user)
+    qs = Attendance.objects.select_related("course_info", "course_info__course", "course_info__teacher")
+    if scope == STUDENT:
+        qs = qs.filter(student=user)
+    else:
+        qs = qs.select_related("student")
+        if scope == TEACHER:
+            qs = qs.filter(course_info__teacher=user)
+
+    if filters.q:
+        cond = Q()
+        for name in SEARCH_FIELDS[scope]:
+            cond |= Q(**{f"{name}__icontains": filters.q})
+        qs = qs.filter(cond)
+    if filters.status:
+        qs = qs.filter(status=filters.status)
+    if filters.college:
+        qs = qs.filter(course_info__course__college=filters.college)
+    teacher_id = _int_or_none(filters.teacher_id)
+    if teacher_id is not None:
+        qs = qs.filter(course_info__teacher_id=teacher_id)
+    section_id = _int_or_none(filters.section_id)
+    if section_id is not None:
+        qs = qs.filter(course_info_id=section_id)
+    if filters.device_id:
+        qs = qs.filter(device_id__icontains=filters.device_id)
+
+    start_d = _parse_date(filters.start)
+    end_d = _parse_date(filters.end)
+    if start_d:
+        qs = qs.filter(session_date__gte=start_d)
+    if end_d:
+        qs = qs.filter(session_date__lte=end_d)
+
+    if with_warn_level:
+        subq = Enrollment.objects.filter(
+            student_id=OuterRef("student_id"),
+            course_info_id=OuterRef("course_info_id"),
+        ).values("attendance_warning_level")[:1]
+        qs = qs.annotate(warn_level=Coalesce(Subquery(subq, output_field=IntegerField()), Value(0)))
+
+    return qs.order_by(filters.order)
+
+
+# --- section options -------------------------------------------------------
+
+def bump_sections_version():
+    section_cache.bump()
+
+
+def _load_section_options(user, scope):
+    qs = CourseInfo.objects.all()
+    if scope == TEACHER:
+        qs = qs.filter(teacher=user)
+    elif scope == STUDENT:
+        qs = qs.filter(enrollments__student=user)
+    days_display = dict(CourseInfo._meta.get_field("days").flatchoices)
+    rows = list(
+        qs.order_by("course__code", "section", "class_name").values(
+            "id", "section", "class_name", "days", "start_time", "end_time", "status",
+            "course__code", "course__name",
+            "teacher__username", "teacher__first_name", "teacher__last_name",
+        )
+    )
+    for r in rows:
+        r["days_display"] = days_display.get(r["days"], r["days"])
+        r["label"] = f"{r['course__code']} – {r['class_name']} (Sec {r['section'] if r['section'] is not None else '—'})"
+        full = f"{r['teacher__first_name'] or ''} {r['teacher__last_name'] or ''}".strip()
+        r["teacher"] = full or r["teacher__username"] or ""
+    return rows
+
+
+def section_options(request, scope=None):
+    """Sections selectable by request.user, one query at most per (user, scope, version).
+
+    Memoised on the request and cached across requests; course/section/enrollment
+    changes bump the namespace version (see signals), which orphans every cached copy.
+    """
+    user = request.user
+    scope = scope or scope_for(user)
+    memo = request.__dict__.setdefault("_section_options", {})
+    if scope in memo:
+        return memo[scope]
+    owner = "all" if scope == ADMIN else user.pk
+    rows = section_cache.get_or_compute(
+        (f"v{section_cache.version()}", scope, owner), lambda: _load_section_options(user, scope)
+    )
+    memo[scope] = rows
+    return rows
+
+
+def record_dict(a):
+    row = {
+        "id": a.id,
+        "session_date": a.session_date.isoformat(),
+        "status": a.status,
+        "first_seen": a.first_seen.isoformat() if a.first_seen else None,
+        "last_seen": a.last_seen.isoformat() if a.last_seen else None,
+        "device_id": a.device_id,
+        "course_info_id": a.course_info_id,
+        "course_code": a.course_info.course.code,
+        "class_name": a.course_info.class_name,
+        "student_id": a.student_id,
+    }
+    if "student" in a._state.fields_cache:
+        row["student"] = {
+            "username": a.student.username,
+            "custom_id": a.student.custom_id,
+            "name": a.student.get_full_name(),
+        }
+    if hasattr(a, "warn_level"):
+        row["warn_level"] = a.warn_level
+    return row
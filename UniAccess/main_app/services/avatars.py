@@ -0,0 +1,101 @@
+"""Square avatar thumbnails, built by the `avatar_variants` job next to the original.
+
+For `avatars/alice.jpg` the variants are `avatars/alice.64.webp`, `avatars/alice.64.jpg`,
+… `avatars/alice.256.jpg`; Profile.avatar_variants records them together with the
+original they were cut from, so a replaced avatar is detected and rebuilt.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+SIZES = (256, 128, 64)  # largest first: each is downscaled from the previous one
+FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True})}
+DEFAULT_AVATAR = "avatars/default.jpg"
+
+
+def variant_name(source, size, ext):
+    stem, _ = os.path.splitext(source)
+    return f"{stem}.{size}.{ext}"
+
+
+def variants_current(profile):
+    return bool(profile.avatar) and profile.avatar_variants.get("source") == profile.avatar.name
+
+
+def _decode(source):
+    with default_storage.open(source, "rb") as fh:
+        img = Image.open(fh)
+        # JPEG can decode straight at 1/2..1/8 scale; ask for just enough for the largest variant.
+        img.draft("RGB", (SIZES[0] * 2, SIZES[0] * 2))
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    if img.mode not in ("RGB", "L"):
+        background = Image.new("RGB", img.size, "white")
+        background.paste(img, mask=img.convert("RGBA").getchannel("A"))
+        img = background
+    return img.convert("RGB")
+
+
+def build_variants(source):
+    """Write every size/format for `source` (a default_storage name); returns {size: {ext: name}}."""
+    if Image is None:
+        raise RuntimeError("Avatar variants require Pillow.")
+    sizes = {str(size): {ext: variant_name(source, size, ext) for ext in FORMATS} for size in SIZES}
+    if all(default_storage.exists(n) for by_ext in sizes.values() for n in by_ext.values()):
+        return sizes
+
+    img = _decode(source)
+    img = ImageOps.fit(img, (min(img.size),) * 2, Image.Resampling.LANCZOS)
+    for size in SIZES:
+        img = img.resize((size, size), Image.Resampling.LANCZOS) if img.width > size else img
+        for ext, (fmt, options) in FORMATS.items():
+            buf = BytesIO()
+            img.save(buf, fmt, **options)
+            name = sizes[str(size)][ext]
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            # Storage may still pick another name (a concurrent writer, a truncated path).
+            sizes[str(size)][ext] = default_storage.save(name, ContentFile(buf.getvalue()))
+    return sizes
+
+
+def delete_variants(variants):
+    # The shared default avatar's variants are reused by every profile that has it.
+    if variants.get("source") in (None, DEFAULT_AVATAR):
+        return
+    for by_ext in variants.get("sizes", {}).values():
+        for name in by_ext.values():
+            if default_storage.exists(name):
+                default_storage.delete(name)
+
+
+def refresh_profile_variants(profile):
+    """Build variants for the profile's current avatar and drop those of a replaced one."""
+    if variants_current(profile) or not profile.avatar:
+        return False
+    old = profile.avatar_variants or {}
+    source = profile.avatar.name
+    profile.avatar_variants = {"source": source, "sizes": build_variants(source)}
+    profile.save(update_fields=["avatar_variants"])
+    if old.get("source") != source:
+        delete_variants(old)
+    return True
+
+
+def pick_variant(profile, size, ext="jpg"):
+    """Storage name of the smallest variant at least `size` px, else the largest; None if not built."""
+    if profile is None or not variants_current(profile):
+        return None
+    sizes = profile.avatar_variants.get("sizes", {})
+    available = sorted(int(s) for s in sizes)
+    if not available:
+        return None
+    chosen = next((s for s in available if s >= size), available[-1])
+    return sizes[str(chosen)].get(ext)
@@ -0,0 +1,262 @@
+"""Namespaced access to the shared caches (settings.CACHES).
+
+Every cached thing in the app lives under a CacheNamespace, which gives it a key
+prefix, version counters for invalidation, stampede-safe get_or_compute() and
+hit/miss accounting reported by cache_metrics(). Entries go to the "default"
+cache; version counters, metrics and namespaces created with persistent=True go
+to the "persistent" one, which is never culled. Namespaces created with an
+explicit `alias` (the scan API's "scan_guard" state) keep entries and counters
+in that cache only.
+"""
+import math
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.connection import ConnectionProxy
+
+PERSISTENT_ALIAS = "persistent"
+# Throttle buckets and debounced replies: never on the database (see settings.CACHES).
+SCAN_GUARD_ALIAS = "scan_guard"
+persistent = ConnectionProxy(caches, PERSISTENT_ALIAS)
+
+# Seconds a recomputing process holds the lock; others serve stale data or wait.
+LOCK_TTL = 30
+# How long a caller with nothing to serve waits for another process's recompute.
+LOCK_WAIT = 2.0
+LOCK_POLL = 0.05
+# Per-process counters are folded into the shared ones at most this often.
+METRICS_FLUSH_EVERY = 10.0
+METRIC_KINDS = ("hit", "miss", "early", "wait")
+
+NAMESPACES = {}
+
+_MISSING = object()
+_counts = Counter()
+_counts_lock = threading.Lock()
+_last_flush = {}  # alias -> monotonic time of its last flush
+
+
+def _record(namespace, kind, alias=PERSISTENT_ALIAS):
+    with _counts_lock:
+        _counts[(alias, namespace, kind)] += 1
+        due = time.monotonic() - _last_flush.setdefault(alias, time.monotonic()) >= METRICS_FLUSH_EVERY
+    if due:
+        # Only this alias: a scan request must not pay for the database-backed counters.
+        flush_metrics(alias)
+
+
+def _incr(key, delta=1, alias=PERSISTENT_ALIAS):
+    store = caches[alias]
+    try:
+        store.incr(key, delta)
+    except ValueError:
+        if not store.add(key, delta, timeout=None):
+            store.incr(key, delta)
+
+
+async def _aincr(key, delta=1):
+    try:
+        await persistent.aincr(key, delta)
+    except ValueError:
+        if not await persistent.aadd(key, delta, timeout=None):
+            await persistent.aincr(key, delta)
+
+
+def flush_metrics(alias=None):
+    """Fold this process's counters into the shared ones (all stores, or just `alias`)."""
+    with _counts_lock:
+        pending = {k: n for k, n in _counts.items() if alias is None or k[0] == alias}
+        for k in pending:
+            del _counts[k]
+        for flushed in {k[0] for k in pending} | ({alias} if alias else set()):
+            _last_flush[flushed] = time.monotonic()
+    for (store, namespace, kind), n in pending.items():
+        _incr(f"metrics:{namespace}:{kind}", n, store)
+
+
+def count_metric(name, kind, alias=PERSISTENT_ALIAS):
+    """Bump the shared counter metrics:{name}:{kind} in `alias`; batched like the cache hit counters."""
+    _record(name, kind, alias)
+
+
+def read_metrics(names, kinds, alias=PERSISTENT_ALIAS):
+    """{name: {kind: count}} summed over every process."""
+    flush_metrics(alias)
+    stored = caches[alias].get_many([f"metrics:{n}:{kind}" for n in names for kind in kinds])
+    return {n: {kind: int(stored.get(f"metrics:{n}:{kind}", 0)) for kind in kinds} for n in names}
+
+
+def require_scan_guard():
+    """Fail fast when the scan_guard cache is database-backed: the throttle and the
+    debounce exist to answer without touching the database."""
+    if isinstance(caches[SCAN_GUARD_ALIAS], DatabaseCache):
+        raise ImproperlyConfigured(
+            f"CACHES['{SCAN_GUARD_ALIAS}'] must not be a DatabaseCache; use Redis or a file cache."
+        )
+
+
+def _metrics_alias(name):
+    namespace = NAMESPACES.get(name)
+    return namespace.metrics_alias if namespace else PERSISTENT_ALIAS
+
+
+def cache_metrics():
+    """{namespace: {hit, miss, early, wait, hit_rate}} summed over every process."""
+    out = {}
+    for alias in {_metrics_alias(name) for name in NAMESPACES}:
+        names = [name for name in NAMESPACES if _metrics_alias(name) == alias]
+        out.update(read_metrics(names, METRIC_KINDS, alias))
+    out = {name: out[name] for name in NAMESPACES}
+    for row in out.values():
+        looked_up = row["hit"] + row["miss"] + row["early"]
+        row["hit_rate"] = round(row["hit"] / looked_up, 4) if looked_up else None
+    return out
+
+
+def reset_metrics(names=None, kinds=METRIC_KINDS, alias=None):
+    """Zero the counters of `names` (default: every namespace), each in its own store
+    unless `alias` is given."""
+    names = list(NAMESPACES if names is None else names)
+    with _counts_lock:
+        for pending in [k for k in _counts if k[1] in names]:
+            del _counts[pending]
+    for name in names:
+        caches[alias or _metrics_alias(name)].delete_many([f"metrics:{name}:{kind}" for kind in kinds])
+
+
+class CacheNamespace:
+    """Keys are `name:part:part…`; `key` arguments may be a string or a tuple of parts.
+
+    `beta` tunes early recompute in get_or_compute(): an entry is refreshed a
+    little before it expires, with a probability that grows as expiry nears and
+    with how long it took to compute, so a hot key is rebuilt by one caller
+    instead of by everyone at the moment it expires.
+
+    `persistent=True` keeps the entries themselves in the never-culled store; for
+    state that is not derived data (e.g. an admin override). `alias` names another
+    cache for the entries and the hit/miss counters (version counters stay in the
+    persistent store).
+    """
+
+    def __init__(self, name, ttl=300, beta=1.0, persistent=False, alias=None):
+        self.name = name
+        self.ttl = ttl
+        self.beta = beta
+        self.alias = alias or (PERSISTENT_ALIAS if persistent else "default")
+        self.metrics_alias = alias or PERSISTENT_ALIAS
+        NAMESPACES[name] = self
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def _parts(key):
+        return key if isinstance(key, tuple) else (key,)
+
+    def key(self, key=()):
+        return ":".join([self.name, *(str(p) for p in self._parts(key))])
+
+    # --- plain get/set ------------------------------------------------------
+
+    def get(self, key, default=None):
+        value = self.cache.get(self.key(key), _MISSING)
+        _record(self.name, "miss" if value is _MISSING else "hit", self.metrics_alias)
+        return default if value is _MISSING else value
+
+    async def aget(self, key, default=None):
+        value = await self.cache.aget(self.key(key), _MISSING)
+        _record(self.name, "miss" if value is _MISSING else "hit", self.metrics_alias)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=_MISSING):
+        self.cache.set(self.key(key), value, self.ttl if ttl is _MISSING else ttl)
+
+    async def aset(self, key, value, ttl=_MISSING):
+        await self.cache.aset(self.key(key), value, self.ttl if ttl is _MISSING else ttl)
+
+    def delete(self, *keys):
+        self.cache.delete_many([self.key(k) for k in keys])
+
+    # --- version counters ---------------------------------------------------
+
+    def version(self, key=()):
+        return persistent.get_or_set(self.key(("v", *self._parts(key))), 1, timeout=None)
+
+    def bump(self, key=()):
+        """Invalidate everything keyed on version(key) by moving it on."""
+        _incr(self.key(("v", *self._parts(key))))
+        persistent.set(self.key(("t", *self._parts(key))), time.time(), timeout=None)
+
+    async def abump(self, key=()):
+        await _aincr(self.key(("v", *self._parts(key))))
+        await persistent.aset(self.key(("t", *self._parts(key))), time.time(), timeout=None)
+
+    def changed_at(self, key=()):
+        """UTC datetime of the last bump(key), or None if unknown (e.g. cache flushed)."""
+        ts = persistent.get(self.key(("t", *self._parts(key))))
+        return datetime.fromtimestamp(ts, tz=timezone.utc) if ts is not None else None
+
+    # --- stampede-safe compute ----------------------------------------------
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Cached compute(); at most one process recomputes a given key at a time."""
+        full = self.key(key)
+        ttl = self.ttl if ttl is None else ttl
+        entry = self.cache.get(full)
+        if entry is not None:
+            value, expires_at, delta = entry
+            # XFetch: -log(u) is exponential with mean 1, scaled by the compute time.
+            if time.time() - delta * self.beta * math.log(1.0 - random.random()) < expires_at:
+                _record(self.name, "hit", self.metrics_alias)
+                return value
+            if not self.cache.add(full + ":lock", 1, LOCK_TTL):
+                _record(self.name, "hit", self.metrics_alias)
+                return value
+            _record(self.name, "early", self.metrics_alias)
+            return self._compute(full, compute, ttl, locked=True)
+
+        _record(self.name, "miss", self.metrics_alias)
+        locked = self.cache.add(full + ":lock", 1, LOCK_TTL)
+        if not locked:
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL)
+                entry = self.cache.get(full)
+                if entry is not None:
+                    _record(self.name, "wait", self.metrics_alias)
+                    return entry[0]
+        return self._compute(full, compute, ttl, locked)
+
+    def _compute(self, full, compute, ttl, locked):
+        try:
+            started = time.time()
+            value = compute()
+            delta = time.time() - started
+            self.cache.set(full, (value, time.time() + ttl, delta), ttl)
+            return value
+        finally:
+            if locked:
+                self.cache.delete(full + ":lock")
+
+
+# Data versions that {% data_version %} exposes to {% cache %} fragment keys; the
+# signals bump them when the rows behind a fragment change.
+fragment_versions = CacheNamespace("fragments", ttl=None)
+CATALOG = "catalog"    # Course / CourseInfo: filter options, section listings, week grids
+TEACHERS = "teachers"  # teacher accounts: teacher filter dropdowns
+
+
+def fragment_version(name):
+    return fragment_versions.version(name)
+
+
+def bump_fragments(*names):
+    for name in names:
+        fragment_versions.bump(name)
@@ -0,0 +1,141 @@
+"""Handlers for Job.kind values; imported from MainAppConfig.ready() so they register."""
+import os
+import zipfile
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..db_routers import replica_reads
+from ..models import CourseInfo, Enrollment, Profile
+from .avatars import refresh_profile_variants, variants_current
+from .attendance_query import AttendanceFilters, attendance_queryset
+from .export import _csv_chunks, _xlsx_chunks, export_rows
+from .jobs import enqueue, job_handler
+from .provisioning import read_student_rows, validate_student_rows, provision_students
+from .reports import write_department_reports
+from .warnings import recompute_warnings
+
+
+def _term_sections(params):
+    qs = CourseInfo.objects.all()
+    if params.get("college"):
+        qs = qs.filter(course__college=params["college"])
+    if params.get("year"):
+        qs = qs.filter(year=int(params["year"]))
+    if params.get("semester"):
+        qs = qs.filter(semester=params["semester"])
+    if params.get("course_info"):
+        qs = qs.filter(id__in=params["course_info"])
+    return qs
+
+
+@job_handler("export_attendance")
+def export_attendance(ctx):
+    """params: scope, fmt ('csv'|'xlsx'), filters (AttendanceFilters fields)."""
+    scope, fmt = ctx.params["scope"], ctx.params.get("fmt", "csv")
+    filters = AttendanceFilters(**ctx.params.get("filters", {}))
+    with replica_reads():
+        total = attendance_queryset(ctx.user, filters, scope=scope).order_by().count()
+        ctx.progress(0, total, "Exporting…", force=True)
+
+        def counted(rows):
+            for n, row in enumerate(rows):
+                if n:
+                    ctx.progress(n, message=f"Exported {n} of {total} rows")
+                yield row
+
+        rows = counted(export_rows(ctx.user, filters, scope))
+        path = ctx.result_path(f"attendance-{scope}-{timezone.localdate():%Y%m%d}.{fmt}")
+        if fmt == "csv":
+            with open(path, "w", encoding="utf-8", newline="") as fh:
+                for chunk in _csv_chunks(rows):
+                    fh.write(chunk)
+        else:
+            with open(path, "wb") as fh:
+                for chunk in _xlsx_chunks(rows):
+                    fh.write(chunk)
+    ctx.progress(total, total, force=True)
+    ctx.set_result(path, f"Exported {total} rows.")
+
+
+@job_handler("recompute_warnings")
+def recompute_warnings_job(ctx):
+    """params: college, year, semester, course_info (all optional), notify, dry_run."""
+    qs = Enrollment.objects.filter(course_info__in=_term_sections(ctx.params))
+    ctx.progress(0, 1, "Recomputing…", force=True)
+    result = recompute_warnings(
+        qs, notify=ctx.params.get("notify", True), dry_run=ctx.params.get("dry_run", False)
+    )
+    ctx.progress(1, 1, (
+        f"{result.total} enrollments checked, {result.changed} changed "
+        f"({result.raised} up, {result.lowered} down), {result.notified} notices queued."
+    ), force=True)
+
+
+@job_handler("section_reports")
+def section_reports(ctx):
+    """params: college, year, semester, course_info, formats, workers; result is a zip."""
+    section_ids = list(
+        _term_sections(ctx.params).order_by("course__code", "section").values_list("id", flat=True)
+    )
+    formats = tuple(ctx.params.get("formats") or ("html", "csv"))
+    out_dir = ctx.result_path("sections")
+    ctx.progress(0, len(section_ids), "Rendering sections…", force=True)
+    paths = write_department_reports(
+        section_ids, out_dir, formats=formats, workers=ctx.params.get("workers"),
+        on_section=lambda done, total: ctx.progress(done, total, f"{done} of {total} sections"),
+    )
+    archive = ctx.result_path(f"section-reports-{timezone.localdate():%Y%m%d}.zip")
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for p in paths:
+            zf.write(p, os.path.basename(p))
+    ctx.progress(len(section_ids), len(section_ids), force=True)
+    ctx.set_result(archive, f"{len(section_ids)} sections, {len(paths)} files.")
+
+
+@job_handler("import_students")
+def import_students(ctx):
+    """params: upload (path under JOBS_ROOT). The upload holds passwords and is deleted afterwards."""
+    upload = os.path.join(settings.JOBS_ROOT, ctx.params["upload"])
+    try:
+        with open(upload, "rb") as fh:
+            rows, errors = read_student_rows(fh)
+        errors += validate_student_rows(rows)
+        if errors:
+            report = ctx.result_path("errors.txt")
+            with open(report, "w", encoding="utf-8") as fh:
+                fh.write("\n".join(errors))
+            ctx.set_result(report)
+            raise ValueError(f"{len(errors)} problem(s) found; nothing was imported.")
+
+        # One hashing pool, then one transaction: a failure or a cancel (raised from
+        # progress() while hashing) leaves nothing behind, so a rerun starts clean.
+        ctx.progress(0, len(rows), "Hashing passwords…", force=True)
+        result = provision_students(
+            rows, on_hashed=lambda done: ctx.progress(done, message=f"Hashed {done} of {len(rows)} passwords"),
+        )
+        ctx.progress(len(rows), len(rows), force=True)
+        tags = result.tags_created + result.tags_assigned
+        ctx.job.message = f"Imported {result.created} students ({tags} tags assigned)."
+    finally:
+        if os.path.exists(upload):
+            os.remove(upload)
+
+
+@job_handler("avatar_variants")
+def avatar_variants(ctx):
+    """params: profile_ids (optional; default every profile whose variants are missing or stale)."""
+    qs = Profile.objects.all()
+    if ctx.params.get("profile_ids"):
+        qs = qs.filter(id__in=ctx.params["profile_ids"])
+    profiles = [p for p in qs.order_by("id").iterator() if not variants_current(p)]
+    ctx.progress(0, len(profiles), "Building thumbnails…", force=True)
+    built = 0
+    for n, profile in enumerate(profiles, 1):
+        built += refresh_profile_variants(profile)
+        ctx.progress(n, message=f"{n} of {len(profiles)} avatars")
+    # Avatars replaced while this job ran were not queued again (see signals); pick them up now.
+    stale = [p.id for p in qs.order_by("id").iterator() if p.avatar and not variants_current(p)]
+    if stale:
+        enqueue("avatar_variants", {"profile_ids": stale})
+    ctx.progress(len(profiles), len(profiles), f"Built thumbnails for {built} avatar(s).", force=True)
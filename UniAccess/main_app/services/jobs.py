@@ -0,0 +1,211 @@
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from ..db_routers import routing_state
+from ..models import Job
+
+# Seconds between progress writes; cancellation is noticed at the same cadence.
+PROGRESS_EVERY = 1.0
+
+# kind -> callable(JobContext); filled by @job_handler in job_handlers.py.
+JOB_HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_handler(kind):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def concurrency_limit(kind):
+    """Max running jobs of `kind` across all workers (settings.JOB_CONCURRENCY, default 1)."""
+    limits = getattr(settings, "JOB_CONCURRENCY", {})
+    return limits.get(kind, limits.get("*", 1))
+
+
+def enqueue(kind, params=None, user=None):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'.")
+    return Job.objects.create(kind=kind, params=params or {}, created_by=user)
+
+
+def request_cancel(job):
+    """Queued jobs are cancelled at once; running ones stop at their next progress()."""
+    if Job.objects.filter(id=job.id, status="queued").update(
+        status="cancelled", cancel_requested=True, finished_at=timezone.now(), message="Cancelled before start.",
+    ):
+        return
+    Job.objects.filter(id=job.id, status="running").update(cancel_requested=True)
+
+
+def job_dir(job_id):
+    path = os.path.join(settings.JOBS_ROOT, str(job_id))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def job_file_path(rel):
+    """Absolute path of a JOBS_ROOT-relative name, or None if it would escape JOBS_ROOT."""
+    root = os.path.realpath(settings.JOBS_ROOT)
+    path = os.path.realpath(os.path.join(root, rel))
+    return path if path.startswith(root + os.sep) else None
+
+
+class JobContext:
+    def __init__(self, job):
+        self.job = job
+        self.params = job.params
+        self._last_write = 0.0
+
+    @property
+    def user(self):
+        return self.job.created_by
+
+    def result_path(self, filename):
+        return os.path.join(job_dir(self.job.id), filename)
+
+    def set_result(self, path, message=""):
+        self.job.result_file = os.path.relpath(path, settings.JOBS_ROOT)
+        if message:
+            self.job.message = message[:255]
+
+    def progress(self, done, total=None, message=None, force=False):
+        """Record progress (throttled) and raise JobCancelled if a stop was requested.
+
+        The Job row is read and written on the primary under its own routing state:
+        inside a handler's replica_reads() the write would otherwise send the rest
+        of the export to the primary, and the cancel flag could come from a lagging
+        replica.
+        """
+        self.job.progress_done = done
+        if total is not None:
+            self.job.progress_total = total
+        if message is not None:
+            self.job.message = message[:255]
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_EVERY:
+            return
+        self._last_write = now
+        with routing_state():
+            Job.objects.filter(id=self.job.id).update(
+                progress_done=self.job.progress_done,
+                progress_total=self.job.progress_total,
+                message=self.job.message,
+                heartbeat_at=timezone.now(),
+            )
+            cancelled = Job.objects.filter(id=self.job.id, cancel_requested=True).exists()
+        if cancelled:
+            raise JobCancelled()
+
+
+def _lock_kind(kind):
+    """Serialise claims of `kind` until the surrounding transaction ends.
+
+    PostgreSQL: a transaction-scoped advisory lock on the kind, so a second claimer
+    blocks until the first has committed and then counts its row. SQLite: the
+    claim UPDATE that follows takes the database write lock, which already does.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"job_kind:{kind}"])
+
+
+def claim_next(worker, kinds=None):
+    """Move the oldest runnable queued job to 'running' and return it, or None.
+
+    Each claim holds the kind's lock (_lock_kind) while it marks the row running
+    and counts the running jobs of that kind; if the claim put the kind over its
+    limit it is rolled back. A worker that raced for the same row finds it no
+    longer queued, so JOB_CONCURRENCY holds across every worker.
+    """
+    queued = Job.objects.filter(status="queued")
+    if kinds:
+        queued = queued.filter(kind__in=kinds)
+    oldest_first = queued.values("kind").annotate(first=Min("created_at")).order_by("first")
+    for kind in [row["kind"] for row in oldest_first]:
+        job_id = (
+            Job.objects.filter(status="queued", kind=kind)
+            .order_by("created_at").values_list("id", flat=True).first()
+        )
+        if job_id is None:
+            continue
+        with transaction.atomic():
+            _lock_kind(kind)
+            now = timezone.now()
+            if not Job.objects.filter(id=job_id, status="queued").update(
+                status="running", worker=worker, started_at=now, heartbeat_at=now,
+            ):
+                continue
+            if Job.objects.filter(status="running", kind=kind).count() > concurrency_limit(kind):
+                transaction.set_rollback(True)
+                continue
+        return Job.objects.select_related("created_by").get(id=job_id)
+    return None
+
+
+def run_job(job):
+    ctx = JobContext(job)
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for '{job.kind}'.")
+        handler(ctx)
+        status, error = "succeeded", ""
+    except JobCancelled:
+        status, error = "cancelled", ""
+        job.message = job.message or "Cancelled."
+    except Exception:
+        status, error = "failed", traceback.format_exc()
+    Job.objects.filter(id=job.id).update(
+        status=status,
+        error=error,
+        message=job.message,
+        result_file=job.result_file,
+        progress_done=job.progress_done,
+        progress_total=job.progress_total,
+        finished_at=timezone.now(),
+    )
+    job.status = status
+    return job
+
+
+def heartbeat(worker):
+    """Called by the worker loop so long, progress-less steps are not mistaken for a crash."""
+    Job.objects.filter(status="running", worker=worker).update(heartbeat_at=timezone.now())
+
+
+def fail_stale(stale_after):
+    """Fail running jobs whose worker stopped heart-beating (crash, kill -9)."""
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return Job.objects.filter(status="running", heartbeat_at__lt=cutoff).update(
+        status="failed", finished_at=timezone.now(), error="Worker stopped responding.",
+    )
+
+
+def work_once(worker, kinds=None):
+    """Claim and run one job on this thread; returns the job or None when idle."""
+    close_old_connections()
+    try:
+        job = claim_next(worker, kinds)
+        if job is not None:
+            run_job(job)
+        return job
+    finally:
+        close_old_connections()
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
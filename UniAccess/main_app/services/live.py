@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+SUBSCRIBER_QUEUE_MAX = 200
+
+
+class LocalBroker:
+    """In-process stand-in for cross-process pub/sub (Redis PUBLISH/SUBSCRIBE and the like).
+
+    A real broker would forward publish() to every worker; this one only reaches
+    listeners registered in the current process, which is enough for a single
+    ASGI worker or for development.
+    """
+
+    def __init__(self):
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            listeners = list(self._listeners)
+        for fn in listeners:
+            fn(channel, message)
+
+    def listen(self, fn):
+        with self._lock:
+            self._listeners.append(fn)
+
+
+class Subscription:
+    def __init__(self, hub, channels):
+        self.hub = hub
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_MAX)
+
+    def offer(self, message):
+        # Called from any thread; drop events for consumers that fall too far behind.
+        def _put():
+            if not self.queue.full():
+                self.queue.put_nowait(message)
+        self.loop.call_soon_threadsafe(_put)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class LiveHub:
+    """Fans broker messages out to the asyncio queues of local SSE subscribers."""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self._subs = {}
+        self._lock = threading.Lock()
+        broker.listen(self._deliver)
+
+    def subscribe(self, channels):
+        sub = Subscription(self, channels)
+        with self._lock:
+            for ch in sub.channels:
+                self._subs.setdefault(ch, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for ch in sub.channels:
+                subs = self._subs.get(ch)
+                if subs:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[ch]
+
+    def has_subscribers(self, channel):
+        return channel in self._subs
+
+    def publish(self, channels, event, data):
+        message = {"event": event, "data": data}
+        for ch in channels:
+            if ch:
+                self.broker.publish(ch, message)
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            subs = list(self._subs.get(channel, ()))
+        for sub in subs:
+            sub.offer(message)
+
+
+def section_channel(course_info_id):
+    return f"section:{course_info_id}"
+
+
+def device_channel(device_id):
+    return f"device:{device_id}" if device_id else None
+
+
+UNASSIGNED_CHANNEL = "unassigned"
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                broker_cls = import_string(
+                    getattr(settings, "LIVE_EVENTS_BROKER", "main_app.services.live.LocalBroker")
+                )
+                _hub = LiveHub(broker_cls())
+    return _hub
+
+
+def publish_event(channels, event, data):
+    get_hub().publish(channels, event, data)
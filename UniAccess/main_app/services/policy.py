@@ -0,0 +1,230 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db.models import Count
+
+from ..models import Attendance, CourseInfo, AttendancePolicy, CalendarDay
+from .cache import CacheNamespace
+
+# Fallbacks when no AttendancePolicy row covers a section's term.
+SEMESTER_WEEKS = 16
+LATE_PER_ABSENCE = 4
+WARNING_THRESHOLDS = (0.25, 0.50, 0.75)
+
+# Python weekday() numbers for each CourseInfo.days bucket.
+BUCKET_WEEKDAYS = {"uth": (6, 1, 3), "mw": (0, 2), "fs": (4, 5)}
+
+policy_cache = CacheNamespace("attendance_policy")
+# How often a process re-checks the shared version for edits made elsewhere.
+POLICY_RECHECK_SEC = 30
+
+
+def _weekly_meetings(days_code: str) -> int:
+    d = (days_code or "").lower()
+    if d == "uth":
+        return 3
+    if d in ("mw", "fs"):
+        return 2
+    return 2
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    late_per_absence: int = LATE_PER_ABSENCE
+    thresholds: tuple = WARNING_THRESHOLDS
+    # None means "no calendar": fall back to weekly meetings × SEMESTER_WEEKS.
+    dates_by_bucket: dict = None
+    cancelled: dict = field(default_factory=dict)   # course_info_id -> frozenset(dates)
+    makeups: dict = field(default_factory=dict)     # course_info_id -> frozenset(dates)
+
+    def _base_dates(self, ci):
+        # A days code outside BUCKET_WEEKDAYS has no calendar either; counting it as
+        # zero planned sessions would make a single absence 100%.
+        if self.dates_by_bucket is None:
+            return None
+        return self.dates_by_bucket.get((ci.days or "").lower())
+
+    def session_dates(self, ci):
+        """Actual meeting dates for a section, or None when it has no calendar."""
+        base = self._base_dates(ci)
+        if base is None:
+            return None
+        cancelled = self.cancelled.get(ci.id, frozenset())
+        extra = self.makeups.get(ci.id, frozenset())
+        return sorted({d for d in base if d not in cancelled} | extra)
+
+    def planned_for(self, ci) -> int:
+        base = self._base_dates(ci)
+        if base is None:
+            return _weekly_meetings(ci.days) * SEMESTER_WEEKS
+        cancelled = self.cancelled.get(ci.id)
+        extra = self.makeups.get(ci.id)
+        n = len(base)
+        if cancelled:
+            n -= sum(1 for d in base if d in cancelled)
+        if extra:
+            n += len(extra.difference(base))
+        return n
+
+
+DEFAULT_POLICY = CompiledPolicy()
+
+
+def _compile(policy, days):
+    holidays = {d.date for d in days if d.kind == "holiday"}
+    weekday_dates = {}
+    cur = policy.start_date
+    while cur <= policy.end_date:
+        if cur not in holidays:
+            weekday_dates.setdefault(cur.weekday(), []).append(cur)
+        cur += timedelta(days=1)
+    dates_by_bucket = {
+        bucket: tuple(sorted(d for wd in wds for d in weekday_dates.get(wd, ())))
+        for bucket, wds in BUCKET_WEEKDAYS.items()
+    }
+    cancelled, makeups = {}, {}
+    for d in days:
+        if d.course_info_id and d.kind == "cancelled":
+            cancelled.setdefault(d.course_info_id, set()).add(d.date)
+        elif d.course_info_id and d.kind == "makeup":
+            makeups.setdefault(d.course_info_id, set()).add(d.date)
+    return CompiledPolicy(
+        late_per_absence=policy.late_per_absence,
+        thresholds=tuple(policy.thresholds),
+        dates_by_bucket=dates_by_bucket,
+        cancelled={k: frozenset(v) for k, v in cancelled.items()},
+        makeups={k: frozenset(v) for k, v in makeups.items()},
+    )
+
+
+class PolicyEngine:
+    """Process-local compiled policies, rebuilt (2 queries) only when the shared version changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compiled = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._compiled = None
+        policy_cache.bump()
+
+    def _current(self):
+        now = time.monotonic()
+        if self._compiled is not None and now - self._checked_at < POLICY_RECHECK_SEC:
+            return self._compiled
+        version = policy_cache.version()
+        with self._lock:
+            if self._compiled is None or version != self._version:
+                self._compiled = self._build()
+                self._version = version
+            self._checked_at = now
+            return self._compiled
+
+    def _build(self):
+        days_by_policy = {}
+        for d in CalendarDay.objects.all():
+            days_by_policy.setdefault(d.policy_id, []).append(d)
+        return {
+            (p.year, p.semester, p.college): _compile(p, days_by_policy.get(p.id, []))
+            for p in AttendancePolicy.objects.all()
+        }
+
+    def for_section(self, ci) -> CompiledPolicy:
+        compiled = self._current()
+        if not compiled:
+            return DEFAULT_POLICY
+        college = ci.course.college if ci.course_id else ""
+        return (
+            compiled.get((ci.year, ci.semester, college))
+            or compiled.get((ci.year, ci.semester, ""))
+            or DEFAULT_POLICY
+        )
+
+
+engine = PolicyEngine()
+
+
+def policy_for(ci: CourseInfo) -> CompiledPolicy:
+    return engine.for_section(ci)
+
+
+def planned_sessions(ci: CourseInfo) -> int:
+    return policy_for(ci).planned_for(ci)
+
+
+def warning_level(pct_absence: float, thresholds=WARNING_THRESHOLDS) -> int:
+    return sum(1 for t in thresholds if pct_absence >= t)
+
+
+@dataclass
+class PolicyCalc:
+    present: int
+    late: int
+    absent: int
+    late_as_absence: int
+    absence_equiv: int
+    planned: int
+    pct_absence: float
+    level: int
+
+def calculate_policy(student_id: int, ci: CourseInfo) -> PolicyCalc:
+    qs = (
+        Attendance.objects
+        .filter(student_id=student_id, course_info=ci)
+        .values("status")
+        .annotate(c=Count("id"))
+    )
+    counts = {row["status"]: row["c"] for row in qs}
+    policy = policy_for(ci)
+    present = counts.get("PRESENT", 0)
+    late = counts.get("LATE", 0)
+    absent = counts.get("ABSENT", 0)
+    late_as_absence = late // policy.late_per_absence
+    absence_equiv = absent + late_as_absence
+    planned = policy.planned_for(ci) or 1
+    pct_absence = absence_equiv / planned
+    level = warning_level(pct_absence, policy.thresholds)
+    return PolicyCalc(
+        present=present,
+        late=late,
+        absent=absent,
+        late_as_absence=late_as_absence,
+        absence_equiv=absence_equiv,
+        planned=planned,
+        pct_absence=pct_absence,
+        level=level,
+    )
+
+def _email_subject(ci: CourseInfo, level: int) -> str:
+    tag = {1: "Warning 1/3", 2: "Warning 2/3", 3: "Final Warning (3/3)"}[level]
+    return f"[Attendance] {ci.course.code} – {tag}"
+
+def _email_body(student_name: str, ci: CourseInfo, calc: PolicyCalc) -> str:
+    pct = round(calc.pct_absence * 100, 1)
+    policy = policy_for(ci)
+    marks = ", ".join(f"{round(t * 100)}%" for t in policy.thresholds)
+    lines = [
+        f"Dear {student_name},",
+        "",
+        f"This is an attendance notice for {ci.course.code} – {ci.course.name} (Section {getattr(ci, 'section', '—')}).",
+        f"Semester: {ci.year} / {ci.get_semester_display()}",
+        "",
+        f"• Present: {calc.present}",
+        f"• Late: {calc.late} (every {policy.late_per_absence} late = 1 absence ⇒ +{calc.late_as_absence})",
+        f"• Absent-equivalent total: {calc.absence_equiv} out of ~{calc.planned} planned sessions ({pct}%)",
+        "",
+        "Policy:",
+        f"• Warnings at {marks}. {policy.late_per_absence} late = 1 absence.",
+        f"• At 3 warnings (≥{round(policy.thresholds[2] * 100)}%), you fail the course due to attendance.",
+        "",
+        "Please adjust your attendance accordingly.",
+        "",
+        "Regards,",
+        "Registrar",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,203 @@
+import csv
+import io
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.utils import timezone
+
+from ..models import Profile, RFIDTag
+from .rfid_index import discard_unassigned
+
+User = get_user_model()
+
+IMPORT_COLUMNS = ("username", "first_name", "last_name", "email", "password", "college", "phone", "uid")
+REQUIRED_COLUMNS = ("username", "password", "college")
+HASH_CHUNK = 64
+BATCH_SIZE = 1000
+
+
+@dataclass
+class StudentRow:
+    line: int
+    username: str
+    password: str
+    college: str
+    first_name: str = ""
+    last_name: str = ""
+    email: str = ""
+    phone: str = ""
+    uid: str = ""
+
+
+@dataclass
+class ProvisionResult:
+    created: int = 0
+    tags_created: int = 0
+    tags_assigned: int = 0
+    errors: list = field(default_factory=list)
+
+
+# === Parsing / validation ===
+def read_student_rows(fileobj):
+    """Parse an uploaded CSV (bytes or text) into StudentRow objects plus per-line errors."""
+    raw = fileobj.read()
+    text = raw.decode("utf-8-sig") if isinstance(raw, bytes) else raw
+    reader = csv.DictReader(io.StringIO(text))
+    headers = {(h or "").strip().lower() for h in (reader.fieldnames or [])}
+    missing = [c for c in REQUIRED_COLUMNS if c not in headers]
+    if missing:
+        return [], [f"Missing column(s): {', '.join(missing)}"]
+
+    colleges = {k for k, _ in User.COLLEGE_CHOICES}
+    rows, errors = [], []
+    for line, rec in enumerate(reader, start=2):
+        rec = {(k or "").strip().lower(): (v or "").strip() for k, v in rec.items()}
+        row = StudentRow(line=line, **{c: rec.get(c, "") for c in IMPORT_COLUMNS})
+        if not (row.username and row.password):
+            errors.append(f"Line {line}: username and password are required.")
+            continue
+        if row.college not in colleges:
+            errors.append(f"Line {line}: unknown college '{row.college}'.")
+            continue
+        rows.append(row)
+    return rows, errors
+
+
+def validate_student_rows(rows):
+    """Check the batch against itself and the database with a constant number of queries."""
+    errors = []
+    seen_names, seen_uids = set(), set()
+    for r in rows:
+        if r.username in seen_names:
+            errors.append(f"Line {r.line}: duplicate username '{r.username}' in file.")
+        seen_names.add(r.username)
+        if r.uid:
+            if r.uid in seen_uids:
+                errors.append(f"Line {r.line}: duplicate UID '{r.uid}' in file.")
+            seen_uids.add(r.uid)
+
+    taken = set(User.objects.filter(username__in=seen_names).values_list("username", flat=True))
+    assigned = set(
+        RFIDTag.objects.filter(tag_uid__in=seen_uids, assigned_to__isnull=False)
+        .values_list("tag_uid", flat=True)
+    )
+    for r in rows:
+        if r.username in taken:
+            errors.append(f"Line {r.line}: username '{r.username}' already exists.")
+        if r.uid in assigned:
+            errors.append(f"Line {r.line}: UID '{r.uid}' is already assigned.")
+    return errors
+
+
+# === Password hashing ===
+def _init_hash_worker():
+    import django
+    django.setup()
+
+
+def _hash_chunk(passwords):
+    return [make_password(p) for p in passwords]
+
+
+def hash_passwords(passwords, workers=None, on_hashed=None):
+    """Hash in a process pool; PBKDF2 is CPU-bound so threads would not help.
+
+    on_hashed(done) is called as chunks complete, e.g. to report progress.
+    """
+    if workers == 1 or len(passwords) <= HASH_CHUNK:
+        hashed = _hash_chunk(passwords)
+        if on_hashed:
+            on_hashed(len(hashed))
+        return hashed
+    chunks = [passwords[i:i + HASH_CHUNK] for i in range(0, len(passwords), HASH_CHUNK)]
+    hashed = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker) as pool:
+        for part in pool.map(_hash_chunk, chunks):
+            hashed.extend(part)
+            if on_hashed:
+                on_hashed(len(hashed))
+    return hashed
+
+
+# === Bulk write ===
+def preallocate_user_ids(n, using="default"):
+    """Reserve `n` primary keys so custom_id can be computed before the INSERT.
+
+    Outside PostgreSQL this must run inside the transaction that inserts the rows.
+    """
+    if n <= 0:
+        return []
+    conn = connections[using]
+    table = User._meta.db_table
+    with conn.cursor() as cur:
+        if conn.vendor == "postgresql":
+            cur.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [table, n],
+            )
+            return [r[0] for r in cur.fetchall()]
+        quoted = conn.ops.quote_name(table)
+        # SQLite transactions start deferred, so two importers could both read the
+        # same MAX(id). A no-op write takes the database write lock first; it is
+        # held until commit, which queues the next importer behind this one.
+        # Other backends are treated as single-writer.
+        if conn.vendor == "sqlite":
+            cur.execute(f"UPDATE {quoted} SET id = id WHERE 0 = 1")
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {quoted}")
+        start = cur.fetchone()[0] + 1
+    return list(range(start, start + n))
+
+
+def provision_students(rows, workers=None, batch_size=BATCH_SIZE, on_hashed=None):
+    """Create users, profiles and tag assignments in bulk (no per-row save()).
+
+    Passwords are hashed first, all in one pool; everything is then written in a
+    single transaction, so an import is applied completely or not at all.
+    """
+    result = ProvisionResult()
+    if not rows:
+        return result
+
+    hashes = hash_passwords([r.password for r in rows], workers=workers, on_hashed=on_hashed)
+
+    with transaction.atomic():
+        ids = preallocate_user_ids(len(rows))
+        year = timezone.now().year
+        users = [
+            User(
+                id=pk,
+                username=r.username,
+                first_name=r.first_name,
+                last_name=r.last_name,
+                email=r.email,
+                password=pw_hash,
+                role="student",
+                college=r.college,
+                custom_id=User.build_custom_id("student", pk, year),
+            )
+            for r, pk, pw_hash in zip(rows, ids, hashes)
+        ]
+        User.objects.bulk_create(users, batch_size=batch_size)
+        Profile.objects.bulk_create(
+            [Profile(user=u, phone=r.phone) for u, r in zip(users, rows)],
+            batch_size=batch_size,
+        )
+
+        by_uid = {r.uid: u for u, r in zip(users, rows) if r.uid}
+        discard_unassigned(list(by_uid))
+        existing = list(RFIDTag.objects.filter(tag_uid__in=by_uid.keys(), assigned_to__isnull=True))
+        for tag in existing:
+            tag.assigned_to = by_uid.pop(tag.tag_uid)
+        RFIDTag.objects.bulk_update(existing, ["assigned_to"], batch_size=batch_size)
+        RFIDTag.objects.bulk_create(
+            [RFIDTag(tag_uid=uid, assigned_to=u) for uid, u in by_uid.items()],
+            batch_size=batch_size,
+        )
+
+    result.created = len(users)
+    result.tags_assigned = len(existing)
+    result.tags_created = len(by_uid)
+    return result
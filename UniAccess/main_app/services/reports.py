@@ -0,0 +1,185 @@
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from ..db_routers import replica_reads
+from ..models import Attendance, CourseInfo, Enrollment
+from .policy import policy_for
+from .warnings import np, policy_arrays
+
+# Cell codes in SectionMatrix.grid; 0 means no record for that student/date.
+NO_RECORD, PRESENT, LATE, ABSENT = 0, 1, 2, 3
+STATUS_CODES = {"PRESENT": PRESENT, "LATE": LATE, "ABSENT": ABSENT}
+CELL_LABELS = ("", "P", "L", "A")
+
+TOTAL_HEADERS = ("Present", "Late", "Absent", "Late→abs", "Abs. equiv", "Planned", "% absence", "Warning")
+
+
+@dataclass
+class SectionMatrix:
+    ci: CourseInfo
+    students: list          # [(student_id, custom_id, name)] in row order
+    dates: list             # session dates in column order
+    grid: "np.ndarray"      # (n_students, n_dates) int8 of cell codes
+    counts: "np.ndarray"    # (n_students, 3) present/late/absent
+    late_as_absence: "np.ndarray"
+    absence_equiv: "np.ndarray"
+    planned: "np.ndarray"
+    pct_absence: "np.ndarray"
+    level: "np.ndarray"
+
+    def rows(self):
+        """One dict per student for templates: cells are P/L/A/'' labels."""
+        for i, (student_id, custom_id, name) in enumerate(self.students):
+            yield {
+                "student_id": student_id,
+                "custom_id": custom_id,
+                "name": name,
+                "cells": [CELL_LABELS[c] for c in self.grid[i]],
+                "present": int(self.counts[i, 0]),
+                "late": int(self.counts[i, 1]),
+                "absent": int(self.counts[i, 2]),
+                "late_as_absence": int(self.late_as_absence[i]),
+                "absence_equiv": int(self.absence_equiv[i]),
+                "planned": int(self.planned[i]),
+                "pct_absence": round(float(self.pct_absence[i]) * 100, 1),
+                "level": int(self.level[i]),
+            }
+
+
+def build_section_matrix(ci):
+    """Students × dates grid for one section: one query for the roster, one for attendance."""
+    if np is None:
+        raise ImproperlyConfigured("Section reports require NumPy.")
+
+    roster = list(
+        Enrollment.objects.filter(course_info=ci)
+        .order_by("student__first_name", "student__last_name", "student__username")
+        .values_list("student_id", "student__custom_id", "student__first_name",
+                     "student__last_name", "student__username")
+    )
+    students = [
+        (sid, cid or "", f"{first or ''} {last or ''}".strip() or username)
+        for sid, cid, first, last, username in roster
+    ]
+    records = list(
+        Attendance.objects.filter(course_info=ci).order_by()
+        .values_list("student_id", "session_date", "status")
+    )
+
+    policy = policy_for(ci)
+    scheduled = policy.session_dates(ci) or []
+    today = timezone.localdate()
+    dates = sorted({d for d in scheduled if d <= today} | {d for _, d, _ in records})
+
+    row_of = {sid: i for i, (sid, _, _) in enumerate(students)}
+    ordinals = np.array([d.toordinal() for d in dates], dtype=np.int64)
+    grid = np.zeros((len(students), len(dates)), dtype=np.int8)
+    if records:
+        kept = [(row_of[sid], d.toordinal(), STATUS_CODES.get(st, NO_RECORD))
+                for sid, d, st in records if sid in row_of]
+        if kept:
+            r, o, code = (np.array(col, dtype=np.int64) for col in zip(*kept))
+            grid[r, np.searchsorted(ordinals, o)] = code
+
+    counts = np.stack([(grid == code).sum(axis=1) for code in (PRESENT, LATE, ABSENT)], axis=1)
+    planned = np.full(len(students), policy.planned_for(ci), dtype=np.int64)
+    late_as_absence, absence_equiv, planned, pct, level = policy_arrays(
+        counts, planned, policy.late_per_absence, policy.thresholds
+    )
+    return SectionMatrix(
+        ci=ci, students=students, dates=dates, grid=grid, counts=counts,
+        late_as_absence=late_as_absence, absence_equiv=absence_equiv,
+        planned=planned, pct_absence=pct, level=level,
+    )
+
+
+def matrix_csv_rows(m):
+    yield ["Student ID", "Name", *[d.isoformat() for d in m.dates], *TOTAL_HEADERS]
+    for row in m.rows():
+        yield [
+            row["custom_id"], row["name"], *row["cells"],
+            row["present"], row["late"], row["absent"], row["late_as_absence"],
+            row["absence_equiv"], row["planned"], row["pct_absence"], row["level"],
+        ]
+
+
+def matrix_csv(m):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(matrix_csv_rows(m))
+    return buf.getvalue()
+
+
+def matrix_html(m, standalone=True):
+    return render_to_string("teacher/section_matrix_table.html", {
+        "m": m, "rows": list(m.rows()), "total_headers": TOTAL_HEADERS, "standalone": standalone,
+    })
+
+
+def report_filename(ci, fmt):
+    return f"{ci.course.code}-{ci.class_name}-S{ci.section or 0}-{ci.year}-{ci.semester}.{fmt}".replace("/", "_")
+
+
+# === Department runs ===
+def _init_report_worker():
+    import django
+    django.setup()
+
+
+def write_section_report(ci_id, out_dir, formats=("html", "csv"), use_replica=True):
+    """Build one section's matrix and write it in each format; returns the paths written."""
+    def build():
+        ci = CourseInfo.objects.select_related("course", "teacher").get(id=ci_id)
+        return ci, build_section_matrix(ci)
+
+    if use_replica:
+        with replica_reads():
+            ci, m = build()
+    else:
+        ci, m = build()
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, report_filename(ci, fmt))
+        body = matrix_csv(m) if fmt == "csv" else matrix_html(m)
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            fh.write(body)
+        paths.append(path)
+    return paths
+
+
+def write_department_reports(section_ids, out_dir, formats=("html", "csv"), workers=None, on_section=None):
+    """Render many sections in a process pool (each worker has its own DB connection).
+
+    on_section(done, total) is called in the parent after each section; if it
+    raises, sections not yet started are dropped and the exception propagates.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    section_ids = list(section_ids)
+    total = len(section_ids)
+    paths = []
+    if workers == 1 or total <= 1:
+        for done, ci_id in enumerate(section_ids, 1):
+            paths.extend(write_section_report(ci_id, out_dir, formats))
+            if on_section:
+                on_section(done, total)
+        return paths
+    # Forked workers must open their own connections, not inherit the parent's socket.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_report_worker) as pool:
+        futures = [pool.submit(write_section_report, ci_id, out_dir, formats) for ci_id in section_ids]
+        try:
+            for done, f in enumerate(as_completed(futures), 1):
+                paths.extend(f.result())
+                if on_section:
+                    on_section(done, total)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return paths
@@ -0,0 +1,32 @@
+from ..models import UnassignedUid
+from .cache import CacheNamespace
+
+# Bumped on every change to the index; drives the ETag of the latest-unassigned API.
+unassigned_versions = CacheNamespace("rfid_unassigned", ttl=None)
+
+_UPSERT = {"update_conflicts": True, "unique_fields": ["uid"], "update_fields": ["last_seen", "device_id"]}
+
+
+def note_unassigned_scan(uid, ts, device_id=None):
+    """Upsert the UID into the unassigned index (one statement)."""
+    UnassignedUid.objects.bulk_create(
+        [UnassignedUid(uid=uid, last_seen=ts, device_id=device_id or None)], **_UPSERT
+    )
+    unassigned_versions.bump()
+
+
+async def anote_unassigned_scan(uid, ts, device_id=None):
+    await UnassignedUid.objects.abulk_create(
+        [UnassignedUid(uid=uid, last_seen=ts, device_id=device_id or None)], **_UPSERT
+    )
+    await unassigned_versions.abump()
+
+
+def discard_unassigned(uids):
+    uids = [u for u in uids if u]
+    if uids and UnassignedUid.objects.filter(uid__in=uids).delete()[0]:
+        unassigned_versions.bump()
+
+
+def latest_unassigned(limit=25):
+    return list(UnassignedUid.objects.order_by("-last_seen").values_list("uid", flat=True)[:limit])
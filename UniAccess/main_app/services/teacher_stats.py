@@ -0,0 +1,115 @@
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from ..db_routers import primary_reads
+from ..models import Attendance, CourseInfo, Enrollment, RfidScan
+from .cache import CacheNamespace
+
+# Dashboards poll; a minute of staleness is acceptable for paths that skip signals.
+STATS_TTL = 60
+RECENT_ROWS = 12
+stats_cache = CacheNamespace("teacher_stats", ttl=STATS_TTL)
+
+
+@dataclass
+class TeacherStats:
+    sections: list = field(default_factory=list)
+    total_students: int = 0
+    today_present: int = 0
+    today_late: int = 0
+    today_absent: int = 0
+    present30: int = 0
+    late30: int = 0
+    absent30: int = 0
+    warn_counts: list = field(default_factory=lambda: [0, 0, 0, 0])
+
+    @property
+    def section_ids(self):
+        return [ci.id for ci in self.sections]
+
+
+def bump_teacher_stats(*teacher_ids):
+    for teacher_id in {t for t in teacher_ids if t}:
+        stats_cache.bump(teacher_id)
+
+
+def _load(teacher_id, today):
+    with primary_reads():
+        return _load_stats(teacher_id, today)
+
+
+def _load_stats(teacher_id, today):
+    sections = list(
+        CourseInfo.objects
+        .filter(teacher_id=teacher_id)
+        .select_related("course", "teacher")
+        .annotate(enrolled_count=Count("enrollments", distinct=True))
+        .order_by("course__code", "section", "class_name")
+    )
+    stats = TeacherStats(sections=sections)
+    if not sections:
+        return stats
+    section_ids = stats.section_ids
+
+    since = today - timedelta(days=30)
+    on_today = Q(session_date=today)
+    att = Attendance.objects.filter(course_info_id__in=section_ids, session_date__gte=since).aggregate(
+        today_present=Count("id", filter=on_today & Q(status="PRESENT")),
+        today_late=Count("id", filter=on_today & Q(status="LATE")),
+        today_absent=Count("id", filter=on_today & Q(status="ABSENT")),
+        present30=Count("id", filter=Q(status="PRESENT")),
+        late30=Count("id", filter=Q(status="LATE")),
+        absent30=Count("id", filter=Q(status="ABSENT")),
+    )
+    for name, value in att.items():
+        setattr(stats, name, value)
+
+    level = "attendance_warning_level"
+    enr = Enrollment.objects.filter(course_info_id__in=section_ids).aggregate(
+        total_students=Count("student_id", distinct=True),
+        w0=Count("id", filter=Q(**{f"{level}__lte": 0}) | Q(**{f"{level}__isnull": True})),
+        w1=Count("id", filter=Q(**{level: 1})),
+        w2=Count("id", filter=Q(**{level: 2})),
+        w3=Count("id", filter=Q(**{f"{level}__gte": 3})),
+    )
+    stats.total_students = enr["total_students"]
+    stats.warn_counts = [enr["w0"], enr["w1"], enr["w2"], enr["w3"]]
+    return stats
+
+
+def teacher_stats(teacher_id, today=None):
+    """Sections and attendance/warning counts for a teacher's dashboard (3 queries when cold).
+
+    Cached for STATS_TTL; Attendance/Enrollment/CourseInfo signals bump the
+    teacher's version so scans and marks show up on the next load. Fills read the
+    primary even on @replica_ok pages, so a bump is never answered with lagging counts.
+    """
+    today = today or timezone.localdate()
+    key = (teacher_id, f"v{stats_cache.version(teacher_id)}", today.isoformat())
+    return stats_cache.get_or_compute(key, lambda: _load(teacher_id, today))
+
+
+def recent_section_attendance(section_ids, limit=RECENT_ROWS):
+    return (
+        Attendance.objects
+        .filter(course_info_id__in=section_ids)
+        .select_related("course_info", "course_info__course", "student")
+        .order_by("-session_date", "-first_seen")[:limit]
+    )
+
+
+def recent_section_scans(section_ids, limit=RECENT_ROWS):
+    """Latest scans by students enrolled in `section_ids`.
+
+    Filters on a student-id subquery rather than joining scans through
+    enrollments, so there are no duplicate rows to DISTINCT away.
+    """
+    students = Enrollment.objects.filter(course_info_id__in=section_ids).values("student_id")
+    return (
+        RfidScan.objects.filter(user_id__in=students)
+        .only("created_at", "uid", "note")
+        .order_by("-created_at")[:limit]
+    )
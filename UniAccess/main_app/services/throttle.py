@@ -0,0 +1,133 @@
+"""Token-bucket rate limits for the reader API, per device_id and per source IP.
+
+Bucket state and the allowed/throttled counters live in the "scan_guard" cache,
+which is never the database, so every worker spends from the same budget and a
+rejected request costs no query. A bucket holds up to `burst` tokens and refills at `rate` per second;
+each request takes one. Reads and writes are not atomic, so concurrent requests
+on one key can each see the same balance — over-admission is bounded by that
+key's in-flight requests, which is fine for a flood guard.
+"""
+import json
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+from .cache import SCAN_GUARD_ALIAS, CacheNamespace, count_metric, read_metrics, require_scan_guard, reset_metrics
+
+buckets = CacheNamespace("throttle", ttl=None, alias=SCAN_GUARD_ALIAS)
+SCOPES = ("device", "ip")  # checked in this order; a denial stops the check
+KINDS = ("allowed", "throttled")
+
+
+def _limits(scope):
+    return settings.RFID_THROTTLE.get(scope, (0, 0))
+
+
+def _spend(state, rate, burst, now):
+    """(new_state, 0) if a token was taken, else (None, seconds until one is available)."""
+    tokens, stamp = state if state else (burst, now)
+    tokens = min(burst, tokens + max(0.0, now - stamp) * rate)
+    if tokens < 1:
+        return None, (1 - tokens) / rate
+    return (tokens - 1, now), 0.0
+
+
+def _refill_ttl(rate, burst):
+    # After this long an untouched bucket is full again, same as a missing one.
+    return math.ceil(burst / rate) + 1
+
+
+def take(scope, ident, now=None):
+    """Take a token from `scope`'s bucket for `ident`; returns 0, or the seconds to wait."""
+    rate, burst = _limits(scope)
+    if not ident or rate <= 0:
+        return 0.0
+    key = (scope, ident)
+    state, wait = _spend(buckets.get(key), rate, burst, time.time() if now is None else now)
+    if state:
+        buckets.set(key, state, ttl=_refill_ttl(rate, burst))
+    return wait
+
+
+async def atake(scope, ident, now=None):
+    rate, burst = _limits(scope)
+    if not ident or rate <= 0:
+        return 0.0
+    key = (scope, ident)
+    state, wait = _spend(await buckets.aget(key), rate, burst, time.time() if now is None else now)
+    if state:
+        await buckets.aset(key, state, ttl=_refill_ttl(rate, burst))
+    return wait
+
+
+def _idents(request):
+    # The reader puts device_id in the JSON body; an unreadable body is limited by IP only.
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        device_id = str(data.get("device_id") or "").strip() if isinstance(data, dict) else ""
+    except Exception:
+        device_id = ""
+    return {"device": device_id, "ip": request.META.get("REMOTE_ADDR")}
+
+
+def _count(scope, wait):
+    count_metric(f"throttle:{scope}", "throttled" if wait else "allowed", SCAN_GUARD_ALIAS)
+
+
+def _too_many(scope, wait):
+    retry_after = max(1, math.ceil(wait))
+    response = JsonResponse(
+        {
+            "ok": False,
+            "error": "Rate limit exceeded",
+            "scope": scope,
+            "retry_after": retry_after,
+            "lcd_line1": "Too many scans",
+            "lcd_line2": f"Wait {retry_after}s",
+        },
+        status=429,
+    )
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def throttle_scans(view):
+    """Answer 429 (with Retry-After) before the view runs — no database access — when
+    the request's device or source IP is out of tokens. Place it outside @transaction.atomic."""
+    require_scan_guard()
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            idents = _idents(request)
+            for scope in SCOPES:
+                wait = await atake(scope, idents[scope])
+                _count(scope, wait)
+                if wait:
+                    return _too_many(scope, wait)
+            return await view(request, *args, **kwargs)
+        return markcoroutinefunction(async_wrapper)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        idents = _idents(request)
+        for scope in SCOPES:
+            wait = take(scope, idents[scope])
+            _count(scope, wait)
+            if wait:
+                return _too_many(scope, wait)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def throttle_metrics():
+    """{scope: {allowed, throttled}} summed over every process."""
+    counts = read_metrics([f"throttle:{scope}" for scope in SCOPES], KINDS, SCAN_GUARD_ALIAS)
+    return {scope: counts[f"throttle:{scope}"] for scope in SCOPES}
+
+
+def reset_throttle_metrics():
+    reset_metrics([f"throttle:{scope}" for scope in SCOPES], KINDS, SCAN_GUARD_ALIAS)
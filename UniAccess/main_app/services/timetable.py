@@ -0,0 +1,117 @@
+from datetime import datetime, time, timedelta
+
+from ..db_routers import primary_reads
+from ..models import Enrollment
+from .cache import CATALOG, CacheNamespace, fragment_version
+
+DAY_ORDER_FULL = [
+    ("sun", "Sunday"), ("mon", "Monday"), ("tue", "Tuesday"),
+    ("wed", "Wednesday"), ("thu", "Thursday"), ("fri", "Friday"), ("sat", "Saturday"),
+]
+BUCKET_TO_DAYS = {"uth": ["sun", "tue", "thu"], "mw": ["mon", "wed"], "fs": ["fri", "sat"]}
+
+TIMETABLE_TTL = 24 * 3600
+timetable_cache = CacheNamespace("timetable", ttl=TIMETABLE_TTL)
+
+
+def bump_enrollment_version(student_id):
+    timetable_cache.bump(("student", student_id))
+
+
+def bump_timetable_teachers():
+    """Teacher names are part of every snapshot; renaming one invalidates all timetables."""
+    timetable_cache.bump("teachers")
+
+
+def timetable_version(student_id):
+    """Changes on the student's register/drop, on any Course/CourseInfo edit and on
+    any teacher account edit."""
+    return (
+        f"e{timetable_cache.version(('student', student_id))}.c{fragment_version(CATALOG)}"
+        f".t{timetable_cache.version('teachers')}"
+    )
+
+
+def _section_snapshot(ci):
+    # Keys mirror the CourseInfo attributes the dashboard template reads, so the
+    # cached dicts render exactly like the model instances they replace.
+    teacher = ci.teacher
+    return {
+        "id": ci.id,
+        "course": {"code": ci.course.code, "name": ci.course.name},
+        "class_name": ci.class_name,
+        "section": ci.section,
+        "teacher": {"get_full_name": teacher.get_full_name(), "username": teacher.username},
+        "days": (ci.days or "").lower(),
+        "get_days_display": ci.get_days_display(),
+        "start_time": ci.start_time,
+        "end_time": ci.end_time,
+        "year": ci.year,
+        "get_semester_display": ci.get_semester_display(),
+        "get_session_type_display": ci.get_session_type_display(),
+    }
+
+
+def _round_down_hour(t):
+    return time(t.hour, 0)
+
+
+def _round_up_hour(t):
+    if t.minute == 0 and t.second == 0:
+        return time(t.hour, 0)
+    return time((datetime.combine(datetime.min, t) + timedelta(hours=1)).hour, 0)
+
+
+def build_timetable(student_id):
+    """Enrolled-section snapshots plus the hourly week grid for one student.
+
+    Only term-stable data goes in here; warning levels change with every scan and
+    are merged in by the caller. Read from the primary: it is cached for a day under
+    a version that was just bumped, so replica lag would stick.
+    """
+    with primary_reads():
+        return _build_timetable(student_id)
+
+
+def _build_timetable(student_id):
+    enrollments = (
+        Enrollment.objects
+        .filter(student_id=student_id)
+        .select_related("course_info", "course_info__course", "course_info__teacher")
+        .order_by("course_info__course__code", "course_info__section")
+    )
+    rows = []
+    week_grid = {k: [] for k, _ in DAY_ORDER_FULL}
+    min_t = max_t = None
+    for e in enrollments:
+        ci = _section_snapshot(e.course_info)
+        rows.append({"id": e.id, "course_info": ci})
+        for dk in BUCKET_TO_DAYS.get(ci["days"], []):
+            week_grid[dk].append(ci)
+        if min_t is None or ci["start_time"] < min_t:
+            min_t = ci["start_time"]
+        if max_t is None or ci["end_time"] > max_t:
+            max_t = ci["end_time"]
+
+    for k in week_grid:
+        week_grid[k].sort(key=lambda c: (c["start_time"], c["course"]["code"]))
+
+    start_slot = _round_down_hour(min_t) if min_t else time(8, 0)
+    end_slot = _round_up_hour(max_t) if max_t else time(18, 0)
+    week_table_rows = []
+    for hour in range(start_slot.hour, end_slot.hour + 1):
+        slot = time(hour, 0)
+        cells = [
+            [ci for ci in week_grid[dk] if ci["start_time"] <= slot < ci["end_time"]]
+            for dk, _ in DAY_ORDER_FULL
+        ]
+        week_table_rows.append({"slot": slot, "cells": cells})
+
+    return {"enrollments": rows, "week_table_rows": week_table_rows}
+
+
+def student_timetable(student_id):
+    """Cached build_timetable() plus its `version`, usable as a fragment cache key."""
+    version = timetable_version(student_id)
+    data = timetable_cache.get_or_compute((student_id, version), lambda: build_timetable(student_id))
+    return {**data, "version": version}
@@ -0,0 +1,188 @@
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import transaction
+from django.db.models import Count
+
+from ..models import Attendance, CourseInfo, Enrollment
+from .teacher_stats import bump_teacher_stats
+from .policy import (
+    LATE_PER_ABSENCE, WARNING_THRESHOLDS, DEFAULT_POLICY, PolicyCalc, policy_for, warning_level,
+    _email_subject, _email_body,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STATUS_COLUMNS = {"PRESENT": 0, "LATE": 1, "ABSENT": 2}
+
+
+@dataclass
+class RecomputeResult:
+    total: int = 0
+    changed: int = 0
+    raised: int = 0
+    lowered: int = 0
+    notified: int = 0
+
+
+def policy_arrays(counts, planned, late_per_absence=LATE_PER_ABSENCE, thresholds=WARNING_THRESHOLDS):
+    """Vectorised calculate_policy. counts: (n, 3) [present, late, absent]; planned: (n,).
+
+    late_per_absence may be a scalar or an (n,) array and thresholds a (3,) or
+    (n, 3) array, so rows governed by different policies share one pass.
+    """
+    planned = np.maximum(planned, 1)
+    late_as_absence = counts[:, 1] // late_per_absence
+    absence_equiv = counts[:, 2] + late_as_absence
+    pct = absence_equiv / planned
+    # number of thresholds already reached == warning level
+    thr = np.asarray(thresholds, dtype=float).reshape(-1, 3)
+    level = (pct[:, None] >= thr).sum(axis=1)
+    return late_as_absence, absence_equiv, planned, pct, level
+
+
+def _policy_lists(counts, planned, late_per_absence, thresholds):
+    """policy_arrays without NumPy: the same five columns as lists, one row at a time."""
+    planned = [max(p, 1) for p in planned]
+    late_as_absence = [c[1] // lpa for c, lpa in zip(counts, late_per_absence)]
+    absence_equiv = [c[2] + la for c, la in zip(counts, late_as_absence)]
+    pct = [ae / p for ae, p in zip(absence_equiv, planned)]
+    level = [warning_level(x, thr) for x, thr in zip(pct, thresholds)]
+    return late_as_absence, absence_equiv, planned, pct, level
+
+
+def status_matrix(index, attendance_qs):
+    """Fill an (n, 3) count matrix (a list of rows without NumPy) from one grouped query over attendance_qs."""
+    counts = np.zeros((len(index), 3), dtype=np.int64) if np is not None else [[0, 0, 0] for _ in index]
+    rows = (
+        attendance_qs.order_by()
+        .values_list("student_id", "course_info_id", "status")
+        .annotate(c=Count("id"))
+    )
+    for student_id, ci_id, status, c in rows:
+        i = index.get((student_id, ci_id))
+        col = STATUS_COLUMNS.get(status)
+        if i is not None and col is not None:
+            counts[i][col] = c
+    return counts
+
+
+def recompute_warnings(enrollments=None, notify=True, dry_run=False, batch_size=1000):
+    """Recompute attendance_warning_level/failed_due_to_attendance for many enrollments.
+
+    Levels are set to the computed value (they may go down after corrections);
+    only changed rows are written, and students whose level went up are emailed
+    once the transaction commits. Vectorised with NumPy when it is installed; the
+    per-row fallback gives the same result.
+    """
+    enr_qs = Enrollment.objects.all() if enrollments is None else enrollments
+    rows = list(
+        enr_qs.order_by().values_list(
+            "id", "student_id", "course_info_id", "attendance_warning_level", "failed_due_to_attendance"
+        )
+    )
+    result = RecomputeResult(total=len(rows))
+    if not rows:
+        return result
+
+    ids = [r[0] for r in rows]
+    index = {(r[1], r[2]): i for i, r in enumerate(rows)}
+
+    section_ids = enr_qs.order_by().values("course_info_id")
+    sections = (
+        CourseInfo.objects.filter(id__in=section_ids)
+        .select_related("course")
+        .only("id", "days", "year", "semester", "teacher_id", "course__college")
+    )
+    policy_by_ci = {ci.id: (policy_for(ci), ci) for ci in sections}
+    planned, late_per_absence, thresholds = [], [], []
+    for r in rows:
+        policy, ci = policy_by_ci.get(r[2], (DEFAULT_POLICY, None))
+        planned.append(policy.planned_for(ci) if ci is not None else 0)
+        late_per_absence.append(policy.late_per_absence)
+        thresholds.append(tuple(policy.thresholds))
+
+    counts = status_matrix(index, Attendance.objects.filter(course_info_id__in=section_ids))
+    if np is not None:
+        late_as_absence, absence_equiv, planned, pct, new_level = policy_arrays(
+            counts, np.array(planned, dtype=np.int64), np.array(late_per_absence, dtype=np.int64),
+            np.array(thresholds, dtype=float),
+        )
+        old_level = np.array([r[3] for r in rows], dtype=np.int64)
+        old_failed = np.array([r[4] for r in rows], dtype=bool)
+        new_failed = new_level >= 3
+        changed = np.flatnonzero((new_level != old_level) | (new_failed != old_failed)).tolist()
+        upward = np.flatnonzero(new_level > old_level).tolist()
+        result.lowered = int(np.count_nonzero(new_level < old_level))
+    else:
+        late_as_absence, absence_equiv, planned, pct, new_level = _policy_lists(
+            counts, planned, late_per_absence, thresholds
+        )
+        new_failed = [level >= 3 for level in new_level]
+        changed = [i for i, r in enumerate(rows) if new_level[i] != r[3] or new_failed[i] != r[4]]
+        upward = [i for i, r in enumerate(rows) if new_level[i] > r[3]]
+        result.lowered = sum(1 for i, r in enumerate(rows) if new_level[i] < r[3])
+    result.changed = len(changed)
+    result.raised = len(upward)
+    if dry_run or not changed:
+        return result
+
+    with transaction.atomic():
+        Enrollment.objects.bulk_update(
+            [
+                Enrollment(
+                    id=ids[i],
+                    attendance_warning_level=int(new_level[i]),
+                    failed_due_to_attendance=bool(new_failed[i]),
+                )
+                for i in changed
+            ],
+            ["attendance_warning_level", "failed_due_to_attendance"],
+            batch_size=batch_size,
+        )
+        teachers = {policy_by_ci[rows[i][2]][1].teacher_id for i in changed if rows[i][2] in policy_by_ci}
+        transaction.on_commit(lambda: bump_teacher_stats(*teachers))
+        if notify and upward:
+            calcs = {
+                ids[i]: PolicyCalc(
+                    present=int(counts[i][0]),
+                    late=int(counts[i][1]),
+                    absent=int(counts[i][2]),
+                    late_as_absence=int(late_as_absence[i]),
+                    absence_equiv=int(absence_equiv[i]),
+                    planned=int(planned[i]),
+                    pct_absence=float(pct[i]),
+                    level=int(new_level[i]),
+                )
+                for i in upward
+            }
+            result.notified = queue_warning_emails(calcs)
+    return result
+
+
+def queue_warning_emails(calcs):
+    """Build one warning email per enrollment id in `calcs`; send them in one SMTP session after commit."""
+    messages = []
+    enrollments = (
+        Enrollment.objects
+        .filter(id__in=list(calcs))
+        .select_related("student", "course_info", "course_info__course")
+    )
+    for enr in enrollments:
+        calc = calcs[enr.id]
+        to_email = (enr.student.email or "").strip()
+        if not to_email or calc.level < 1:
+            continue
+        messages.append((
+            _email_subject(enr.course_info, calc.level),
+            _email_body(enr.student.get_full_name() or enr.student.username, enr.course_info, calc),
+            getattr(settings, "DEFAULT_FROM_EMAIL", None),
+            [to_email],
+        ))
+    if messages:
+        transaction.on_commit(lambda: send_mass_mail(messages, fail_silently=True))
+    return len(messages)
@@ -0,0 +1,136 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from .auth_backends import forget_cached_users
+from .models import RFIDTag, AttendancePolicy, CalendarDay, Course, CourseInfo, Enrollment, Attendance, Profile, Job
+from .services.rfid_index import discard_unassigned
+from .services.policy import engine as policy_engine
+from .services.attendance_query import bump_sections_version
+from .services.timetable import bump_enrollment_version, bump_timetable_teachers
+from .services.cache import CATALOG, TEACHERS, bump_fragments
+from .services.avatars import variants_current
+from .services.jobs import enqueue
+from .services.teacher_stats import bump_teacher_stats
+
+
+def _after_commit(fn, *args):
+    """Run a cache invalidation once the write is visible to other processes.
+
+    Bumping inside the open transaction lets another worker rebuild from the old
+    rows under the new version and keep that stale entry until the next bump.
+    Outside a transaction on_commit runs at once.
+    """
+    transaction.on_commit(partial(fn, *args))
+
+
+@receiver(post_save, sender=RFIDTag)
+def drop_assigned_tag_from_index(sender, instance, **kwargs):
+    if instance.assigned_to_id:
+        _after_commit(discard_unassigned, [instance.tag_uid])
+
+
+@receiver([post_save, post_delete], sender=AttendancePolicy)
+@receiver([post_save, post_delete], sender=CalendarDay)
+def recompile_attendance_policies(sender, **kwargs):
+    _after_commit(policy_engine.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=CourseInfo)
+@receiver([post_save, post_delete], sender=Enrollment)
+def invalidate_section_options(sender, update_fields=None, **kwargs):
+    # Warning-level updates on Enrollment don't change who sees which section.
+    if sender is Enrollment and update_fields and not {"student", "course_info"} & set(update_fields):
+        return
+    _after_commit(bump_sections_version)
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=CourseInfo)
+def invalidate_catalog_fragments(sender, **kwargs):
+    _after_commit(bump_fragments, CATALOG)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def invalidate_student_timetable(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {"student", "course_info"} & set(update_fields):
+        return
+    _after_commit(bump_enrollment_version, instance.student_id)
+
+
+def _section_teacher_id(instance):
+    # Scan and close_sessions paths pass the CourseInfo in, so this rarely queries.
+    if "course_info" in instance._state.fields_cache:
+        return instance.course_info.teacher_id
+    return CourseInfo.objects.filter(pk=instance.course_info_id).values_list("teacher_id", flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+@receiver([post_save, post_delete], sender=Enrollment)
+def invalidate_teacher_stats(sender, instance, **kwargs):
+    _after_commit(bump_teacher_stats, _section_teacher_id(instance))
+
+
+@receiver([post_save, post_delete], sender=CourseInfo)
+def invalidate_section_teacher_stats(sender, instance, **kwargs):
+    _after_commit(bump_teacher_stats, instance.teacher_id)
+
+
+@receiver(post_save, sender=Course)
+def invalidate_course_teacher_stats(sender, instance, **kwargs):
+    _after_commit(bump_teacher_stats, *CourseInfo.objects.filter(course=instance).values_list("teacher_id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def drop_cached_user(sender, instance, update_fields=None, **kwargs):
+    _after_commit(forget_cached_users, instance.pk)
+    # Logins only touch last_login; anything else may rename or re-role a teacher.
+    if not (update_fields and set(update_fields) <= {"last_login"}):
+        _after_commit(bump_fragments, TEACHERS)
+        if getattr(instance, "role", None) == "teacher":
+            _after_commit(bump_timetable_teachers)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def drop_cached_profile_owner(sender, instance, **kwargs):
+    _after_commit(forget_cached_users, instance.user_id)
+
+
+@receiver(post_save, sender=Profile)
+def queue_avatar_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {"avatar_variants"}:
+        return
+    if instance.avatar and not variants_current(instance):
+        _after_commit(_queue_avatar_job, instance.id)
+
+
+def _queue_avatar_job(profile_id):
+    # A queued job reads the profile when it starts; a running one re-checks its
+    # profiles when done and queues a follow-up for any that changed meanwhile.
+    pending = Job.objects.filter(kind="avatar_variants", status__in=("queued", "running")).values_list("params", flat=True)
+    if any(profile_id in params.get("profile_ids", [profile_id]) for params in pending):
+        return
+    enqueue("avatar_variants", {"profile_ids": [profile_id]})
+
+
+@receiver(pre_save, sender=RFIDTag)
+def remember_previous_tag_owner(sender, instance, **kwargs):
+    instance._previous_owner = (
+        RFIDTag.objects.filter(pk=instance.pk).values_list("assigned_to_id", flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=RFIDTag)
+def drop_cached_tag_owners(sender, instance, **kwargs):
+    # assigned_to points at custom_id, and both the new and the previous holder
+    # have this tag (or its absence) baked into their cached user.
+    owners = {instance.assigned_to_id, getattr(instance, "_previous_owner", None)} - {None}
+    if owners:
+        _after_commit(
+            forget_cached_users, *get_user_model().objects.filter(custom_id__in=owners).values_list("pk", flat=True)
+        )
@@ -0,0 +1,53 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Already-compressed formats (images, fonts, archives) don't shrink; skip them.
+COMPRESSIBLE = (".css", ".js", ".mjs", ".map", ".json", ".svg", ".txt", ".html", ".xml", ".ico", ".ttf", ".otf", ".eot")
+MIN_SIZE = 256
+# Keep a variant only if it saves at least this fraction of the original.
+MIN_SAVING = 0.05
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """collectstatic output with content-hashed names plus `.gz` (and `.br` when the
+    `brotli` package is installed) next to every compressible hashed file.
+
+    PrecompressedStaticMiddleware serves the variants; a plain web server can too
+    (nginx `gzip_static on; brotli_static on;`).
+    """
+
+    # A template that names a missing file keeps its unhashed URL instead of a 500.
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if name and name.lower().endswith(COMPRESSIBLE):
+                for variant in self._compress(name):
+                    yield name, variant, True
+
+    def _compress(self, name):
+        with self.open(name) as fh:
+            data = fh.read()
+        if len(data) < MIN_SIZE:
+            return
+        encoders = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append((".br", lambda d: brotli.compress(d, quality=11)))
+        for suffix, encode in encoders:
+            packed = encode(data)
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            if len(packed) <= len(data) * (1 - MIN_SAVING):
+                self._save(target, ContentFile(packed))
+                yield target
@@ -0,0 +1,35 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from ..services.avatars import pick_variant
+
+register = template.Library()
+
+FALLBACK = "/static/images/default-avatar.png"
+
+
+def _url(profile, size, ext):
+    name = pick_variant(profile, size, ext)
+    return default_storage.url(name) if name else None
+
+
+@register.simple_tag
+def avatar_url(profile, size=128, ext="jpg"):
+    """URL of the best-fitting thumbnail, the original while thumbnails are pending, or the fallback."""
+    if not profile:
+        return FALLBACK
+    return _url(profile, size, ext) or (profile.avatar.url if profile.avatar else FALLBACK)
+
+
+@register.inclusion_tag("_avatar.html")
+def avatar(profile, size=128, alt="Avatar"):
+    """<picture> with WebP and JPEG sources at 1x/2x for a `size`-px square slot."""
+    ctx = {"size": size, "alt": alt, "fallback": avatar_url(profile, size)}
+    if profile:
+        webp, webp2x = _url(profile, size, "webp"), _url(profile, size * 2, "webp")
+        jpg2x = _url(profile, size * 2, "jpg")
+        ctx.update({
+            "webp_srcset": f"{webp}, {webp2x} 2x" if webp and webp2x else webp,
+            "jpg_srcset": f"{ctx['fallback']}, {jpg2x} 2x" if jpg2x else None,
+        })
+    return ctx
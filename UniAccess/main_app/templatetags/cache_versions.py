@@ -0,0 +1,15 @@
+from django import template
+
+from ..services.cache import fragment_version
+
+register = template.Library()
+
+
+@register.simple_tag
+def data_version(name):
+    """Current version of a data set, for {% cache %} keys:
+
+        {% data_version "catalog" as catalog_v %}
+        {% cache 3600 section_filters catalog_v college year %}…{% endcache %}
+    """
+    return fragment_version(name)
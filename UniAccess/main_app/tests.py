@@ -1,3 +1,300 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import time
+from datetime import time as clock, timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .db_routers import REPLICA_ALIAS, replica_ok, replica_reads
+from .middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+from .models import Attendance, Course, CourseInfo, Enrollment, Job, Profile, RFIDTag, RfidScan
+from .services.jobs import claim_next, job_file_path, run_job
+from .services.provisioning import StudentRow, provision_students
+from .services.teacher_stats import teacher_stats
+from .services.timetable import student_timetable
+
+# Run with: python manage.py test --settings=UniAccess.test_settings
+# The replica is a separate (unreplicated) database there, so rows saved only on
+# one side show which alias served a read.
+
+User = get_user_model()
+
+
+def _course(code, using=None):
+    course = Course(name=code, code=code, college="it")
+    course.save(using=using)
+    return course
+
+
+def _section(course, teacher, using=None):
+    section = CourseInfo(
+        course=course, teacher=teacher, semester="first", class_name="A", capacity=30,
+        session_type="lecture", days="mw", status="Yes", start_time=clock(8), end_time=clock(9),
+    )
+    section.save(using=using)
+    return section
+
+
+def _codes():
+    return list(Course.objects.order_by("code").values_list("code", flat=True))
+
+
+@replica_ok
+def course_codes(request):
+    return JsonResponse({"codes": _codes()})
+
+
+def plain_course_codes(request):
+    return JsonResponse({"codes": _codes()})
+
+
+def add_course(request):
+    _course("NEW101")
+    return JsonResponse({"codes": _codes()})
+
+
+@replica_ok
+def add_then_list(request):
+    _course("NEW101")
+    return JsonResponse({"codes": _codes()})
+
+
+class ReplicaRoutingTests(TestCase):
+    databases = {"default", REPLICA_ALIAS}
+
+    @classmethod
+    def setUpTestData(cls):
+        _course("PRI101")
+        _course("REP101", using=REPLICA_ALIAS)
+
+    def serve(self, view, method="get", pin=None):
+        request = getattr(RequestFactory(), method)("/")
+        if pin is not None:
+            request.COOKIES[PIN_COOKIE] = str(pin)
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return middleware(request)
+
+    def codes(self, response):
+        return json.loads(response.content)["codes"]
+
+    def test_replica_ok_get_reads_replica(self):
+        self.assertEqual(self.codes(self.serve(course_codes)), ["REP101"])
+
+    def test_unmarked_view_reads_primary(self):
+        self.assertEqual(self.codes(self.serve(plain_course_codes)), ["PRI101"])
+
+    def test_replica_ok_post_reads_primary(self):
+        self.assertEqual(self.codes(self.serve(course_codes, method="post")), ["PRI101"])
+
+    def test_write_sets_pin_cookie(self):
+        response = self.serve(add_course, method="post")
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertLessEqual(abs(int(response.cookies[PIN_COOKIE].value) - time.time()), 2)
+
+    def test_read_only_request_sets_no_pin(self):
+        self.assertNotIn(PIN_COOKIE, self.serve(course_codes).cookies)
+
+    def test_pinned_browser_reads_primary(self):
+        pin = self.serve(add_course, method="post").cookies[PIN_COOKIE].value
+        self.assertEqual(self.codes(self.serve(course_codes, pin=pin)), ["NEW101", "PRI101"])
+
+    @override_settings(REPLICA_STICKY_SECONDS=10)
+    def test_expired_pin_reads_replica(self):
+        self.assertEqual(self.codes(self.serve(course_codes, pin=int(time.time()) - 60)), ["REP101"])
+
+    def test_write_pins_rest_of_request(self):
+        self.assertEqual(self.codes(self.serve(add_then_list)), ["NEW101", "PRI101"])
+
+    def test_replica_reads_block(self):
+        with replica_reads():
+            self.assertEqual(_codes(), ["REP101"])
+        self.assertEqual(_codes(), ["PRI101"])
+
+    def test_teacher_stats_fill_reads_primary(self):
+        teacher = User.objects.create(username="teach", role="teacher", college="it", custom_id="T0001")
+        _section(Course.objects.get(code="PRI101"), teacher)
+        with replica_reads():
+            stats = teacher_stats(teacher.pk)
+        self.assertEqual([ci.course.code for ci in stats.sections], ["PRI101"])
+
+    def test_timetable_fill_reads_primary_and_follows_teacher_rename(self):
+        teacher = User.objects.create(
+            username="teach", first_name="Old", role="teacher", college="it", custom_id="T0001",
+        )
+        student = User.objects.create(username="stu", role="student", college="it", custom_id="S0001")
+        section = _section(Course.objects.get(code="PRI101"), teacher)
+        Enrollment.objects.create(course_info=section, student=student)
+
+        def teacher_names():
+            with replica_reads():
+                rows = student_timetable(student.pk)["enrollments"]
+            return [row["course_info"]["teacher"]["get_full_name"] for row in rows]
+
+        self.assertEqual(teacher_names(), ["Old"])
+        teacher.first_name = "New"
+        with self.captureOnCommitCallbacks(execute=True):
+            teacher.save()
+        self.assertEqual(teacher_names(), ["New"])
+
+
+class ReplicaJobTests(TestCase):
+    databases = {"default", REPLICA_ALIAS}
+
+    def setUp(self):
+        self.jobs_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.jobs_root, ignore_errors=True)
+        override = override_settings(JOBS_ROOT=self.jobs_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        # The admin exists on both sides; the attendance data only on the replica.
+        self.admin = User(username="adm", role="admin", college="admin", custom_id="A0001", is_superuser=True)
+        self.admin.save()
+        self.admin.save(using=REPLICA_ALIAS)
+        teacher = User(username="teach", role="teacher", college="it", custom_id="T0001")
+        student = User(username="stu", role="student", college="it", custom_id="S0001")
+        teacher.save(using=REPLICA_ALIAS)
+        student.save(using=REPLICA_ALIAS)
+        section = _section(_course("REP101", using=REPLICA_ALIAS), teacher, using=REPLICA_ALIAS)
+        now = timezone.now()
+        Attendance(
+            student=student, course_info=section, session_date=timezone.localdate(),
+            first_seen=now, last_seen=now,
+        ).save(using=REPLICA_ALIAS)
+
+    def test_export_job_reads_replica(self):
+        job = Job.objects.create(
+            kind="export_attendance", created_by=self.admin,
+            params={"scope": "admin", "fmt": "csv", "filters": {}},
+        )
+        job = run_job(Job.objects.select_related("created_by").get(id=job.id))
+        self.assertEqual(job.status, "succeeded", Job.objects.get(id=job.id).error)
+        self.assertEqual(job.message, "Exported 1 rows.")
+        with open(job_file_path(job.result_file), encoding="utf-8") as fh:
+            lines = fh.read().splitlines()
+        self.assertEqual(len(lines), 2)  # header + the replica-only record
+        self.assertIn("stu", lines[1])
+        # Progress bookkeeping went to the primary's Job row.
+        self.assertEqual(Job.objects.get(id=job.id).progress_total, 1)
+
+
+class ScanApiTests(TestCase):
+    def setUp(self):
+        caches["scan_guard"].clear()
+
+    def post(self, name, payload, **extra):
+        return self.client.post(reverse(name), json.dumps(payload), content_type="application/json", **extra)
+
+    def batch(self, *scans):
+        response = self.post("rfid_scan_batch", {"device_id": "R1", "scans": list(scans)})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_batch_resend_reports_duplicates(self):
+        ts = (timezone.now() - timedelta(minutes=5)).isoformat()
+        scans = [{"uid": "AA01", "event_id": "e1", "device_ts": ts}, {"uid": "AA02", "event_id": "e2", "device_ts": ts}]
+        self.assertEqual(self.batch(*scans)["counts"], {"unknown_tag": 2})
+        self.assertEqual(self.batch(*scans)["counts"], {"duplicate": 2})
+        self.assertEqual(RfidScan.objects.filter(device_id="R1").count(), 2)
+
+    def test_batch_needs_device_ts_and_keeps_skewed_scans_raw(self):
+        stale = (timezone.now() - timedelta(days=30)).isoformat()
+        body = self.batch({"uid": "AA01", "event_id": "e1"}, {"uid": "AA01", "event_id": "e2", "device_ts": stale})
+        self.assertEqual(body["counts"], {"invalid": 1, "clock_skew": 1})
+        self.assertEqual(list(RfidScan.objects.values_list("event_id", "note")), [("e2", "Clock skew")])
+
+    def test_scan_event_id_retry_is_duplicate(self):
+        # An hour apart on the reader's clock, so the retry is not debounced.
+        for minutes in (60, 120):
+            ts = (timezone.now() - timedelta(minutes=minutes)).isoformat()
+            response = self.post("rfid_scan", {"uid": "AA01", "device_id": "R1", "event_id": "e1", "device_ts": ts})
+        self.assertTrue(json.loads(response.content)["duplicate"])
+        self.assertEqual(RfidScan.objects.count(), 1)
+
+    @override_settings(RFID_THROTTLE={"device": (1, 2), "ip": (0, 0)})
+    def test_device_over_burst_gets_429_without_queries(self):
+        for _ in range(2):
+            self.assertEqual(self.post("rfid_scan_batch", {"device_id": "R1", "scans": []}).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.post("rfid_scan_batch", {"device_id": "R1", "scans": []})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(json.loads(response.content)["scope"], "device")
+        # Other readers have their own bucket.
+        self.assertEqual(self.post("rfid_scan_batch", {"device_id": "R2", "scans": []}).status_code, 200)
+
+    @override_settings(RFID_THROTTLE={"device": (0, 0), "ip": (1, 1)})
+    def test_ip_limit_spans_devices(self):
+        self.post("rfid_scan_batch", {"device_id": "R1", "scans": []})
+        response = self.post("rfid_scan_batch", {"device_id": "R2", "scans": []})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(json.loads(response.content)["scope"], "ip")
+        self.assertEqual(self.post("rfid_scan_batch", {"device_id": "R2", "scans": []}, REMOTE_ADDR="10.0.0.2").status_code, 200)
+
+    def test_repeat_tap_is_replayed_without_queries(self):
+        tap = {"uid": "AA01", "device_id": "R1"}
+        first = self.post("rfid_scan", tap)
+        with self.assertNumQueries(0):
+            again = self.post("rfid_scan", tap)
+        self.assertEqual(again["X-Debounced"], "1")
+        self.assertEqual((again.status_code, again.content), (first.status_code, first.content))
+        self.assertEqual(RfidScan.objects.count(), 1)
+        # Another reader is a separate tap.
+        self.assertNotIn("X-Debounced", self.post("rfid_scan", {**tap, "device_id": "R2"}))
+
+
+class ProvisioningTests(TestCase):
+    def test_provision_students_in_bulk(self):
+        User.objects.create(username="first", role="student", college="it", custom_id="S0001")
+        RFIDTag.objects.create(tag_uid="FREE01")
+        rows = [
+            StudentRow(line=2, username="ali", password="pw-ali-123", college="it", uid="FREE01"),
+            StudentRow(line=3, username="sara", password="pw-sara-123", college="it", phone="0790", uid="NEW01"),
+            StudentRow(line=4, username="omar", password="pw-omar-123", college="it"),
+        ]
+        result = provision_students(rows, workers=1)
+        self.assertEqual((result.created, result.tags_assigned, result.tags_created), (3, 1, 1))
+
+        users = list(User.objects.filter(username__in=["ali", "sara", "omar"]).order_by("id"))
+        self.assertEqual([u.username for u in users], ["ali", "sara", "omar"])
+        for user in users:
+            self.assertEqual(user.custom_id, User.build_custom_id("student", user.pk))
+            self.assertTrue(user.check_password(f"pw-{user.username}-123"))
+        self.assertEqual(Profile.objects.get(user=users[1]).phone, "0790")
+        self.assertEqual(
+            dict(RFIDTag.objects.values_list("tag_uid", "assigned_to__username")),
+            {"FREE01": "ali", "NEW01": "sara"},
+        )
+
+
+@override_settings(JOB_CONCURRENCY={"*": 1, "export_attendance": 2})
+class ClaimNextTests(TestCase):
+    def queue(self, kind, n):
+        return [Job.objects.create(kind=kind).id for _ in range(n)]
+
+    def test_claims_stop_at_each_kinds_limit(self):
+        exports = self.queue("export_attendance", 3)
+        avatars = self.queue("avatar_variants", 2)
+        claimed = []
+        while (job := claim_next("w1")) is not None:
+            claimed.append(job.id)
+        self.assertEqual(claimed, [*exports[:2], avatars[0]])
+        self.assertEqual(Job.objects.filter(status="queued").count(), 2)
+
+    def test_finished_job_frees_a_slot(self):
+        first, second = self.queue("avatar_variants", 2)
+        self.assertEqual(claim_next("w1").id, first)
+        self.assertIsNone(claim_next("w2"))
+        Job.objects.filter(id=first).update(status="succeeded")
+        self.assertEqual(claim_next("w2").id, second)
@@ -6,6 +6,9 @@ urlpatterns = [
     path("user/directory/", views.users_directory, name="users_directory"),
     path("accounts/staff/", views.create_staff , name='create_staff'), 
     path("accounts/student/", views.admin_create_student, name="admin_create_student"),
+    path("accounts/student/import/", views.admin_import_students, name="admin_import_students"),
     path("attendance/student/", views.attendance_list, name="attendance_list"),
+    path("attendance/student/export/<str:fmt>/", views.attendance_export, name="attendance_export"),
     path("registration-control/", views.registration_control, name="registration_control"),
+    path("api/cache/metrics/", views.cache_metrics_api, name="cache_metrics_api"),
 ]
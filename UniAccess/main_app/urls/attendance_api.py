@@ -3,6 +3,11 @@ from main_app import views
 
 urlpatterns = [
     path("api/rfid/scan/", views.rfid_scan, name="rfid_scan"),
+    # Offline buffer upload: many scans with event_id/device_ts, applied idempotently
+    path("api/rfid/scan/batch/", views.rfid_scan_batch, name="rfid_scan_batch"),
     path("api/rfid/assign/", views.tag_to_student, name="tag_to_student"),
+    # Async variants for the ASGI deployment (same request/response contract)
+    path("api/rfid/async/scan/", views.rfid_scan_async, name="rfid_scan_async"),
+    path("api/rfid/async/assign/", views.tag_to_student_async, name="tag_to_student_async"),
     path("api/student/", views.is_student_enrolled , name="is_student_enrolled"),
 ]
@@ -8,4 +8,6 @@ urlpatterns = [
     path("api/rfid/courseinfo/", views.find_current_courseinfo_for_student , name="find_current_courseinfo_for_student"),
     path("api/rfid/latest-unassigned/", views.latest_unassigned_uids_api, name="latest_unassigned_uids"),  
     path("api/attendance/checkout", views.student_checkout_api, name="student_checkout_api"),
+    path("api/attendance/records/", views.attendance_records_api, name="attendance_records_api"),
+    path("api/live/events/", views.live_events, name="live_events"),
 ]
@@ -0,0 +1,11 @@
+from django.urls import path
+from main_app import views
+
+urlpatterns = [
+    path("jobs/", views.job_list, name="job_list"),
+    path("jobs/enqueue/", views.job_enqueue, name="job_enqueue"),
+    path("jobs/<int:pk>/", views.job_detail, name="job_detail"),
+    path("jobs/<int:pk>/status/", views.job_status, name="job_status"),
+    path("jobs/<int:pk>/cancel/", views.job_cancel, name="job_cancel"),
+    path("jobs/<int:pk>/download/", views.job_download, name="job_download"),
+]
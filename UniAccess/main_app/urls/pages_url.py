@@ -9,6 +9,7 @@ urlpatterns = [
         path("dashboard/admin_dashboard/", views.admin_dashboard, name="admin_dashboard"),     
         path("dashboard/student_dashboard/", views.student_dashboard, name="student_dashboard"), 
         path("attendance/student_attendance/", views.student_attendance, name="student_attendance"),   
+        path("attendance/student_attendance/export/<str:fmt>/", views.student_attendance_export, name="student_attendance_export"),
         path("dashboard/teacher/", views.teacher_dashboard, name="teacher_dashboard"),
 ]
 
@@ -1,11 +1,14 @@
-from .pages_views import home , view_Profile , edit_profile , admin_dashboard , student_dashboard , student_attendance , teacher_dashboard
+from .pages_views import home , view_Profile , edit_profile , admin_dashboard , student_dashboard , student_attendance , student_attendance_export , teacher_dashboard
 
 from .course_views import courses_list , CourseCreate , CourseEdit , CourseDelete , CourseInfoCreate , CourseInfoEdit ,CourseInfoDelete , courseInfo_list , courseInfo_detail , register_course , drop_course , is_registration_open
 
-from .attendance_views import latest_unassigned_uids_api, find_current_courseinfo_for_student , maybe_update_warning_and_notify , _weekday_tokens , student_checkout_api
-from .attendance_api import is_student_enrolled, tag_to_student , rfid_scan
+from .attendance_views import latest_unassigned_uids_api, find_current_courseinfo_for_student , maybe_update_warning_and_notify , _weekday_tokens , student_checkout_api , attendance_records_api
+from .attendance_api import is_student_enrolled, tag_to_student , rfid_scan , rfid_scan_batch
+from .attendance_api_async import tag_to_student_async , rfid_scan_async
+from .live_views import live_events
 
-from .admin_views import _student_year_options , users_directory , create_staff , admin_create_student, attendance_list , registration_control
+from .admin_views import _student_year_options , users_directory , create_staff , admin_create_student, admin_import_students, attendance_list , attendance_export , registration_control , cache_metrics_api
 
 
-from .teacher_views import teacher_attendance_list , teacher_take_attendance , TeacherAttendanceEdit , attendance_take_C , teacher_userbase , finish_lecture
+from .teacher_views import teacher_attendance_list , teacher_attendance_export , teacher_take_attendance , teacher_section_matrix , TeacherAttendanceEdit , attendance_take_C , teacher_userbase , finish_lecture
+from .job_views import job_list , job_enqueue , job_detail , job_status , job_cancel , job_download
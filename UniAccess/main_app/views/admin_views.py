@@ -1,15 +1,22 @@
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib import messages
+from django.conf import settings
+from django.http import JsonResponse
 from ..models import Profile, Attendance, CourseInfo, Course, Enrollment
 from django.shortcuts import render, redirect
-from ..forms import CustomUserCreationForm, AdminCreateStudentForm
+from ..forms import CustomUserCreationForm, AdminCreateStudentForm, StudentImportForm
+from ..services.provisioning import read_student_rows, validate_student_rows
+from ..services.jobs import enqueue
+from .job_views import save_job_upload
 from django.urls import reverse
-from datetime import datetime
-from django.core.cache import cache
-from .course_views import is_registration_open
-from django.db.models import Q, Subquery, OuterRef, IntegerField, Value
-from django.db.models.functions import Coalesce
+from .course_views import is_registration_open, registration_cache, REGISTRATION_OVERRIDE
+from django.db.models import Q
+from ..db_routers import replica_ok
+from ..services.attendance_query import ADMIN, MAX_ROWS, AttendanceFilters, attendance_queryset, section_options
+from ..services.export import export_response
+from ..services.cache import cache_metrics, reset_metrics
+from ..services.throttle import throttle_metrics, reset_throttle_metrics
 
 User = get_user_model()
 
@@ -21,14 +28,9 @@ def _student_year_options():
     )
     return [d.year for d in years]
 
-def _parse_date(s):
-    try:
-        return datetime.strptime(s, "%Y-%m-%d").date()
-    except Exception:
-        return None
-
 
 # === Views ===
+@replica_ok
 @staff_member_required
 def users_directory(request):
     q = (request.GET.get("q") or "").strip()
@@ -101,121 +103,63 @@ def admin_create_student(request):
     return render(request, "admin/admin_create_student.html", {"form": form})
 
 @staff_member_required
-def attendance_list(request):
-    q = (request.GET.get("q") or "").strip()
-    status = (request.GET.get("status") or "").strip()
-    college = (request.GET.get("college") or "").strip()
-    teacher_id = (request.GET.get("teacher") or "").strip()
-    section_id = (request.GET.get("course_info") or "").strip()
-    device_id = (request.GET.get("device_id") or "").strip()
-    start = (request.GET.get("start") or "").strip()
-    end = (request.GET.get("end") or "").strip()
-    order = (request.GET.get("order") or "-session_date").strip()
-
-    qs = Attendance.objects.select_related(
-        "student", "course_info", "course_info__course", "course_info__teacher"
-    )
-
-    if q:
-        qs = qs.filter(
-            Q(student__username__icontains=q) |
-            Q(student__first_name__icontains=q) |
-            Q(student__last_name__icontains=q) |
-            Q(student__custom_id__icontains=q) |
-            Q(student__email__icontains=q)
-        )
-    if status:
-        qs = qs.filter(status=status)
-    if college:
-        qs = qs.filter(course_info__course__college=college)
-    if teacher_id:
-        try:
-            qs = qs.filter(course_info__teacher_id=int(teacher_id))
-        except ValueError:
-            pass
-    if section_id:
-        try:
-            qs = qs.filter(course_info_id=int(section_id))
-        except ValueError:
-            pass
-    if device_id:
-        qs = qs.filter(device_id__icontains=device_id)
-
-    start_d = _parse_date(start)
-    end_d = _parse_date(end)
-    if start_d:
-        qs = qs.filter(session_date__gte=start_d)
-    if end_d:
-        qs = qs.filter(session_date__lte=end_d)
-
-    subq = Enrollment.objects.filter(
-        student_id=OuterRef("student_id"),
-        course_info_id=OuterRef("course_info_id"),
-    ).values("attendance_warning_level")[:1]
-
-    qs = qs.annotate(
-        warn_level=Coalesce(Subquery(subq, output_field=IntegerField()), Value(0))
-    )
-
-    allowed_order = {
-        "session_date", "-session_date",
-        "first_seen", "-first_seen",
-        "status", "-status",
-        "student__username", "-student__username",
-        "course_info__course__code", "-course_info__course__code",
-        "course_info__class_name", "-course_info__class_name",
-    }
-    if order not in allowed_order:
-        order = "-session_date"
+def admin_import_students(request):
+    errors = []
+    if request.method == "POST":
+        form = StudentImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            rows, errors = read_student_rows(form.cleaned_data["csv_file"])
+            errors += validate_student_rows(rows)
+            if not errors:
+                # Hashing and inserts run in the run_jobs worker, not on this request thread.
+                upload = save_job_upload(form.cleaned_data["csv_file"])
+                job = enqueue("import_students", {"upload": upload, "rows": len(rows)}, user=request.user)
+                messages.success(request, f"Import of {len(rows)} students queued as job #{job.id}.")
+                return redirect("job_detail", pk=job.id)
+    else:
+        form = StudentImportForm()
+    return render(request, "admin/import_students.html", {"form": form, "errors": errors[:50], "error_count": len(errors)})
 
-    records = qs.order_by(order)[:1000]
+@replica_ok
+@staff_member_required
+def attendance_list(request):
+    filters = AttendanceFilters.from_request(request)
+    records = attendance_queryset(request.user, filters, scope=ADMIN, with_warn_level=True)[:MAX_ROWS]
 
     teacher_opts = (
         User.objects.filter(role="teacher")
         .order_by("first_name", "last_name", "username")
         .values("id", "first_name", "last_name", "username")
     )
-    section_opts = list(
-        CourseInfo.objects
-        .select_related("course", "teacher")
-        .order_by("course__code", "class_name")
-        .values(
-            "id", "class_name", "course__code", "course__name",
-            "teacher__username", "teacher__first_name", "teacher__last_name"
-        )
-    )
 
     context = {
         "records": records,
-        "q": q,
-        "status": status,
-        "college": college,
-        "teacher_id": teacher_id,
-        "section_id": section_id,
-        "device_id": device_id,
-        "start": start,
-        "end": end,
-        "order": order,
+        **filters.as_context(),
         "status_opts": Attendance.STATUS_CHOICES,
         "college_opts": Course.COLLEGE_CHOICES,
         "teacher_opts": teacher_opts,
-        "section_opts": section_opts,
+        "section_opts": section_options(request, ADMIN),
     }
     return render(request, "admin/attendance_list.html", context)
 
+@replica_ok
+@staff_member_required
+def attendance_export(request, fmt):
+    return export_response(request, ADMIN, fmt)
+
 @staff_member_required
 def registration_control(request):
     effective = is_registration_open()
-    override = cache.get("registration:is_open")
+    override = registration_cache.get(REGISTRATION_OVERRIDE)
 
     if request.method == "POST":
         val = request.POST.get("is_open")
         if val == "clear":
-            cache.delete("registration:is_open")
+            registration_cache.delete(REGISTRATION_OVERRIDE)
             messages.success(request, "Override cleared — using settings/date window now.")
         else:
             is_open = (val == "1")
-            cache.set("registration:is_open", is_open, timeout=None)
+            registration_cache.set(REGISTRATION_OVERRIDE, is_open)
             messages.success(request, f"Add/Drop is now forced to {'OPEN' if is_open else 'CLOSED'}.")
         return redirect("registration_control")
 
@@ -223,3 +167,16 @@ def registration_control(request):
         "effective": effective,
         "override": override,
     })
+
+@staff_member_required
+def cache_metrics_api(request):
+    """Hit/miss counters per cache namespace and allowed/throttled scan counts per
+    limit scope, summed across workers; ?reset=1 zeroes them."""
+    if request.GET.get("reset") == "1":
+        reset_metrics()
+        reset_throttle_metrics()
+    return JsonResponse({
+        "backend": settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1],
+        "namespaces": cache_metrics(),
+        "throttle": throttle_metrics(),
+    })
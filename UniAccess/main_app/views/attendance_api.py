@@ -1,9 +1,13 @@
 import json
+from collections import Counter
 from datetime import datetime, timedelta
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from django.http import JsonResponse
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from main_app.views.attendance_views import (
@@ -12,6 +16,10 @@ from main_app.views.attendance_views import (
     maybe_update_warning_and_notify,
 )
 from ..models import RFIDTag, RfidScan
+from ..services.rfid_index import note_unassigned_scan
+from ..services.throttle import throttle_scans
+from ..services.cache import SCAN_GUARD_ALIAS, CacheNamespace, require_scan_guard
+from ..services.live import publish_event, section_channel, device_channel, UNASSIGNED_CHANNEL
 
 try:
     from ..models import Attendance, CourseInfo, Enrollment
@@ -23,22 +31,36 @@ User = get_user_model()
 
 COOLDOWN_SEC = 3
 LATE_THRESHOLD_MIN = 10
+# A device_ts outside [now - MAX_REPLAY_AGE, now + MAX_CLOCK_SKEW] means the reader's
+# clock is off (e.g. reset after a power loss). A live tap is then placed at receipt
+# time; a buffered one is only logged, since "now" may be another session.
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+MAX_REPLAY_AGE = timedelta(days=14)
+BATCH_MAX = 500
+
+# Last reply per (uid, device, status), kept for the cooldown so a double tap is
+# answered from the cache; its hit rate in api/cache/metrics/ is the debounce rate.
+# Lives with the throttle buckets in the "scan_guard" cache, never the database.
+scan_replies = CacheNamespace("scan_replies", ttl=COOLDOWN_SEC + 1, alias=SCAN_GUARD_ALIAS)
 
 # === Helpers ===
+def _publish_after_commit(channels, event, data):
+    transaction.on_commit(lambda: publish_event(channels, event, data))
+
+def _now_local_str(ts):
+    return timezone.localtime(ts).strftime("%Y-%m-%d %H:%M:%S")
+
 def is_student_enrolled(student, course_info) -> bool:
     if not (student and course_info):
         return False
     return Enrollment.objects.filter(student=student, course_info=course_info).exists()
 
-
-@csrf_exempt
-@require_http_methods(["POST"])
-@transaction.atomic
-def tag_to_student(request):
+def parse_assign_request(request):
+    """Returns ((uid, username, user_id, force), None) or (None, error_response)."""
     try:
         data = json.loads(request.body.decode("utf-8"))
     except Exception:
-        return JsonResponse({"ok": False, "error": "Invalid JSON"}, status=400)
+        return None, JsonResponse({"ok": False, "error": "Invalid JSON"}, status=400)
 
     uid = (data.get("uid") or "").strip()
     username = (data.get("username") or "").strip()
@@ -46,178 +68,312 @@ def tag_to_student(request):
     force = bool(data.get("force", False))
 
     if not uid:
-        return JsonResponse({"ok": False, "error": "Missing uid"}, status=400)
+        return None, JsonResponse({"ok": False, "error": "Missing uid"}, status=400)
     if not (username or user_id is not None):
-        return JsonResponse({"ok": False, "error": "Provide username or user_id"}, status=400)
-
-    try:
-        target_user = (
-            User.objects.get(id=user_id) if user_id is not None else User.objects.get(username=username)
-        )
-    except User.DoesNotExist:
-        return JsonResponse({"ok": False, "error": "User not found"}, status=404)
+        return None, JsonResponse({"ok": False, "error": "Provide username or user_id"}, status=400)
+    return (uid, username, user_id, force), None
 
-    existing_for_user = getattr(target_user, "rfid_tag", None)
+def assign_conflict_response(target_user, existing_for_user, tag, uid, force):
     if existing_for_user and existing_for_user.tag_uid != uid and not force:
         return JsonResponse(
             {"ok": False, "error": "User already has a different UID", "current_uid": existing_for_user.tag_uid},
             status=409,
         )
+    if tag and tag.assigned_to and tag.assigned_to != target_user and not force:
+        return JsonResponse(
+            {"ok": False, "error": "UID already assigned to another user", "assigned_to": tag.assigned_to.username},
+            status=409,
+        )
+    return None
 
-    try:
-        tag = RFIDTag.objects.select_related("assigned_to").get(tag_uid=uid)
-        if tag.assigned_to and tag.assigned_to != target_user and not force:
-            return JsonResponse(
-                {"ok": False, "error": "UID already assigned to another user", "assigned_to": tag.assigned_to.username},
-                status=409,
-            )
-    except RFIDTag.DoesNotExist:
-        tag = None
-
-    if tag is None:
-        tag = RFIDTag.objects.create(tag_uid=uid, assigned_to=target_user)
-    else:
-        tag.assigned_to = target_user
-        tag.save(update_fields=["assigned_to"])
-
+def assigned_response(tag, target_user):
     return JsonResponse(
         {"ok": True, "msg": "Tag assigned", "uid": tag.tag_uid, "student": target_user.username, "student_id": target_user.id},
         status=200,
     )
 
+def parse_device_ts(value):
+    """ISO 8601 string or Unix seconds -> aware datetime; None if absent or unreadable."""
+    if value in (None, ""):
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value, tz=timezone.get_current_timezone())
+        parsed = parse_datetime(str(value).strip())
+    except (ValueError, OverflowError, OSError):
+        return None
+    if parsed and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+def plausible_device_ts(device_ts, received):
+    return bool(device_ts) and received - MAX_REPLAY_AGE <= device_ts <= received + MAX_CLOCK_SKEW
+
+def scan_time(device_ts, received):
+    """The time a scan counts at: the reader's clock when it is plausible, else receipt."""
+    if plausible_device_ts(device_ts, received):
+        return min(device_ts, received)
+    return received
+
+def _scan_fields(data):
+    uid = str(data.get("uid") or "").strip()
+    status = str(data.get("status") or "SCAN").strip().upper()
+    if status not in ("IN", "OUT", "SCAN"):
+        status = "SCAN"
+    event_id = str(data.get("event_id") or "").strip()[:64] or None
+    return uid, status, event_id, parse_device_ts(data.get("device_ts"))
 
-@csrf_exempt
-@require_http_methods(["POST"])
-@transaction.atomic
-def rfid_scan(request):
+def parse_scan_request(request):
+    """Returns ((uid, device_id, status, event_id, device_ts), None) or (None, error_response)."""
     try:
         data = json.loads(request.body.decode("utf-8"))
     except Exception:
-        return JsonResponse({"ok": False, "error": "Invalid JSON"}, status=400)
+        return None, JsonResponse({"ok": False, "error": "Invalid JSON"}, status=400)
 
-    uid = (data.get("uid") or "").strip()
+    uid, status, event_id, device_ts = _scan_fields(data)
     device_id = (data.get("device_id") or "").strip()
-    status = (data.get("status") or "SCAN").strip().upper()
-    if status not in ("IN", "OUT", "SCAN"):
-        status = "SCAN"
 
     if not uid:
-        return JsonResponse({"ok": False, "error": "Missing uid"}, status=400)
-
-    ts = timezone.now()
-    source_ip = request.META.get("REMOTE_ADDR")
+        return None, JsonResponse({"ok": False, "error": "Missing uid"}, status=400)
+    if event_id and not device_id:
+        return None, JsonResponse({"ok": False, "error": "event_id requires device_id"}, status=400)
+    return (uid, device_id, status, event_id, device_ts), None
 
-    user = None
+def parse_batch_request(request):
+    """Returns ((device_id, [scan dicts]), None) or (None, error_response)."""
     try:
-        tag = RFIDTag.objects.select_related("assigned_to").get(tag_uid=uid)
-        user = tag.assigned_to
-    except RFIDTag.DoesNotExist:
-        tag = None
-
+        data = json.loads(request.body.decode("utf-8"))
+    except Exception:
+        return None, JsonResponse({"ok": False, "error": "Invalid JSON"}, status=400)
+
+    device_id = str(data.get("device_id") or "").strip()
+    items = data.get("scans")
+    if not device_id:
+        return None, JsonResponse({"ok": False, "error": "Missing device_id"}, status=400)
+    if not isinstance(items, list):
+        return None, JsonResponse({"ok": False, "error": "scans must be a list"}, status=400)
+    if len(items) > BATCH_MAX:
+        return None, JsonResponse({"ok": False, "error": f"At most {BATCH_MAX} scans per batch"}, status=413)
+
+    scans = []
+    for item in items:
+        uid, status, event_id, device_ts = _scan_fields(item if isinstance(item, dict) else {})
+        scans.append({"uid": uid, "status": status, "event_id": event_id, "device_ts": device_ts})
+    return (device_id, scans), None
+
+def _reply_key(request):
+    """(cache key, tap time) for a scan request, or (None, None) if it is malformed."""
+    parsed, error = parse_scan_request(request)
+    if error:
+        return None, None
+    uid, device_id, status, event_id, device_ts = parsed
+    return (uid, device_id or "-", status), scan_time(device_ts, timezone.now()).timestamp()
+
+def _replayed(entry, at):
+    # Compared on tap time, so buffered taps from different sessions are never merged.
+    if not entry or abs(at - entry[0]) > COOLDOWN_SEC:
+        return None
+    response = HttpResponse(entry[2], status=entry[1], content_type="application/json")
+    response["X-Debounced"] = "1"
+    return response
+
+def _reply_entry(at, response, previous):
+    # A buffered older tap must not displace the entry of the live one.
+    if previous and previous[0] > at:
+        return None
+    if response.status_code in (200, 404) and not response.streaming:
+        return (at, response.status_code, response.content)
+    return None
+
+def debounce_taps(view):
+    """Replay the previous reply, without touching the database, when the same card is
+    tapped on the same reader again within COOLDOWN_SEC."""
+    require_scan_guard()
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key, at = _reply_key(request)
+            if key is None:
+                return await view(request, *args, **kwargs)
+            previous = await scan_replies.aget(key)
+            replay = _replayed(previous, at)
+            if replay:
+                return replay
+            response = await view(request, *args, **kwargs)
+            entry = _reply_entry(at, response, previous)
+            if entry:
+                await scan_replies.aset(key, entry)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key, at = _reply_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+        previous = scan_replies.get(key)
+        replay = _replayed(previous, at)
+        if replay:
+            return replay
+        response = view(request, *args, **kwargs)
+        entry = _reply_entry(at, response, previous)
+        if entry:
+            scan_replies.set(key, entry)
+        return response
+    return wrapper
+
+def build_scan_row(uid, user, tag, device_id, status, source_ip, event_id=None, device_ts=None, extra=None, note=None):
     known = bool(user)
+    return RfidScan(
+        uid=uid,
+        user=user if known else None,
+        tag=tag if tag else None,
+        device_id=device_id or None,
+        event_id=event_id,
+        device_ts=device_ts,
+        status=status,
+        source_ip=source_ip or None,
+        success=known,
+        note=note or ("OK" if known else "Unknown/Unassigned"),
+        extra=extra,
+    )
 
-    try:
-        RfidScan.objects.create(
-            uid=uid,
-            user=user if known else None,
-            tag=tag if tag else None,
-            device_id=device_id or None,
-            extra={
-                "ts": ts.isoformat(),
-                "status": status,
-                "source_ip": source_ip,
-                "known": known,
-                "note": ("OK" if known else "Unknown/Unassigned"),
-            },
-        )
-    except Exception as e:
-        return JsonResponse({"ok": False, "error": f"RfidScan write failed: {str(e)}"}, status=500)
+def scan_write_failed_response(e):
+    return JsonResponse({"ok": False, "error": f"RfidScan write failed: {str(e)}"}, status=500)
 
-    if not known:
-        return JsonResponse(
-            {
-                "ok": True,
-                "known_tag": False,
-                "uid": uid,
-                "user": None,
-                "note": "Unknown or unassigned tag",
-                "scanned_at": ts.isoformat(),
-                "lcd_line1": "Unknown tag",
-                "lcd_line2": "Assign in portal",
-                "debug": {"now_local": timezone.localtime(ts).strftime("%Y-%m-%d %H:%M:%S")},
-            },
-            status=404,
-        )
+def duplicate_scan_response(uid, event_id, prior):
+    return JsonResponse(
+        {
+            "ok": True,
+            "duplicate": True,
+            "uid": uid,
+            "event_id": event_id,
+            "scan_id": getattr(prior, "id", None),
+            "note": "Already recorded",
+            "lcd_line1": "Already recorded",
+            "lcd_line2": "",
+        },
+        status=200,
+    )
 
-    if not HAVE_ATT:
-        display_name = (user.get_full_name() or user.username).strip()
-        return JsonResponse(
-            {
-                "ok": True,
-                "known_tag": True,
-                "uid": uid,
-                "user": user.username,
-                "display_name": display_name,
-                "note": "Attendance module not installed; raw scan logged.",
-                "scanned_at": ts.isoformat(),
-                "debug": {"now_local": timezone.localtime(ts).strftime("%Y-%m-%d %H:%M:%S")},
-            },
-            status=200,
-        )
+def unknown_tag_response(uid, ts):
+    return JsonResponse(
+        {
+            "ok": True,
+            "known_tag": False,
+            "uid": uid,
+            "user": None,
+            "note": "Unknown or unassigned tag",
+            "scanned_at": ts.isoformat(),
+            "lcd_line1": "Unknown tag",
+            "lcd_line2": "Assign in portal",
+            "debug": {"now_local": _now_local_str(ts)},
+        },
+        status=404,
+    )
 
-    ci = find_current_courseinfo_for_student(user, ts=ts)
-    display_name = (user.get_full_name() or user.username).strip()
+def no_attendance_module_response(uid, user, display_name, ts):
+    return JsonResponse(
+        {
+            "ok": True,
+            "known_tag": True,
+            "uid": uid,
+            "user": user.username,
+            "display_name": display_name,
+            "note": "Attendance module not installed; raw scan logged.",
+            "scanned_at": ts.isoformat(),
+            "debug": {"now_local": _now_local_str(ts)},
+        },
+        status=200,
+    )
 
-    if not ci:
-        tokens = _weekday_tokens(ts)
-        match_count = CourseInfo.objects.filter(
-            status__in=["Yes", "Available"],
-            days__icontains=tokens[2],
-            start_time__lte=timezone.localtime(ts).time(),
-            end_time__gte=timezone.localtime(ts).time(),
-        ).count()
-        return JsonResponse(
-            {
-                "ok": True,
-                "known_tag": True,
-                "uid": uid,
-                "user": user.username,
-                "display_name": display_name,
-                "note": "No active class now",
-                "scanned_at": ts.isoformat(),
-                "lcd_line1": f"Hi {display_name}",
-                "lcd_line2": "No class now",
-                "debug": {
-                    "now_local": timezone.localtime(ts).strftime("%Y-%m-%d %H:%M:%S"),
-                    "weekday_tokens": list(tokens),
-                    "matches_without_enrollment": match_count,
-                },
+def active_sections_now_qs(ts, tokens):
+    return CourseInfo.objects.filter(
+        status__in=["Yes", "Available"],
+        days__icontains=tokens[2],
+        start_time__lte=timezone.localtime(ts).time(),
+        end_time__gte=timezone.localtime(ts).time(),
+    )
+
+def no_class_response(uid, user, display_name, ts, tokens, match_count):
+    return JsonResponse(
+        {
+            "ok": True,
+            "known_tag": True,
+            "uid": uid,
+            "user": user.username,
+            "display_name": display_name,
+            "note": "No active class now",
+            "scanned_at": ts.isoformat(),
+            "lcd_line1": f"Hi {display_name}",
+            "lcd_line2": "No class now",
+            "debug": {
+                "now_local": _now_local_str(ts),
+                "weekday_tokens": list(tokens),
+                "matches_without_enrollment": match_count,
             },
-            status=200,
-        )
+        },
+        status=200,
+    )
 
-    if not is_student_enrolled(user, ci):
-        return JsonResponse(
-            {
-                "ok": True,
-                "known_tag": True,
-                "uid": uid,
-                "user": user.username,
-                "display_name": display_name,
-                "note": "Not enrolled in this class",
-                "scanned_at": ts.isoformat(),
-                "lcd_line1": f"Hi {display_name}",
-                "lcd_line2": "Not enrolled",
-                "debug": {
-                    "now_local": timezone.localtime(ts).strftime("%Y-%m-%d %H:%M:%S"),
-                    "course_info_id": getattr(ci, "id", None),
-                },
+def not_enrolled_response(uid, user, display_name, ts, ci):
+    return JsonResponse(
+        {
+            "ok": True,
+            "known_tag": True,
+            "uid": uid,
+            "user": user.username,
+            "display_name": display_name,
+            "note": "Not enrolled in this class",
+            "scanned_at": ts.isoformat(),
+            "lcd_line1": f"Hi {display_name}",
+            "lcd_line2": "Not enrolled",
+            "debug": {
+                "now_local": _now_local_str(ts),
+                "course_info_id": getattr(ci, "id", None),
             },
-            status=200,
-        )
+        },
+        status=200,
+    )
+
+def _section_debug(ts, ci):
+    return {
+        "now_local": _now_local_str(ts),
+        "course_info_id": getattr(ci, "id", None),
+        "start_time": str(getattr(ci, "start_time", "")),
+        "end_time": str(getattr(ci, "end_time", "")),
+    }
 
+def attendance_error_response(uid, user, display_name, ts, ci, e):
+    return JsonResponse(
+        {
+            "ok": True,
+            "known_tag": True,
+            "uid": uid,
+            "user": user.username,
+            "display_name": display_name,
+            "note": f"Scan logged; attendance error: {str(e)}",
+            "scanned_at": ts.isoformat(),
+            "debug": _section_debug(ts, ci),
+        },
+        status=200,
+    )
+
+def _is_late(ci, session_date, ts):
+    if not getattr(ci, "start_time", None):
+        return False
+    start_dt = timezone.make_aware(datetime.combine(session_date, ci.start_time))
+    return ts > start_dt + timedelta(minutes=LATE_THRESHOLD_MIN)
+
+def record_attendance(user, ci, ts, device_id):
+    """Create/refresh the session's Attendance row and re-evaluate warnings in one transaction.
+
+    Scans replayed from a reader's offline buffer can arrive out of order: an earlier
+    tap moves first_seen back (and lifts LATE if it was on time), a later one extends
+    last_seen.
+    """
     session_date = timezone.localdate(ts)
-    try:
+    with transaction.atomic():
         att, created = Attendance.objects.get_or_create(
             student=user,
             course_info=ci,
@@ -229,37 +385,34 @@ def rfid_scan(request):
             recent_cutoff = (att.last_seen or att.first_seen or ts - timedelta(hours=1)) + timedelta(seconds=COOLDOWN_SEC)
             if ts >= recent_cutoff:
                 att.last_seen = ts
+            if att.first_seen and ts < att.first_seen:
+                att.first_seen = ts
+                if att.status == "LATE" and not _is_late(ci, session_date, ts):
+                    att.status = "PRESENT"
 
-        if created and getattr(ci, "start_time", None):
-            start_dt = timezone.make_aware(datetime.combine(session_date, ci.start_time))
-            if ts > start_dt + timedelta(minutes=LATE_THRESHOLD_MIN):
-                att.status = "LATE"
+        if created and _is_late(ci, session_date, ts):
+            att.status = "LATE"
 
         att.device_id = device_id or att.device_id
         att.save()
 
         calc, notified = maybe_update_warning_and_notify(user, ci)
-
-    except Exception as e:
-        return JsonResponse(
-            {
-                "ok": True,
-                "known_tag": True,
-                "uid": uid,
-                "user": user.username,
-                "display_name": display_name,
-                "note": f"Scan logged; attendance error: {str(e)}",
-                "scanned_at": ts.isoformat(),
-                "debug": {
-                    "now_local": timezone.localtime(ts).strftime("%Y-%m-%d %H:%M:%S"),
-                    "course_info_id": getattr(ci, "id", None),
-                    "start_time": str(getattr(ci, "start_time", "")),
-                    "end_time": str(getattr(ci, "end_time", "")),
-                },
-            },
-            status=200,
-        )
-
+    return att, created, calc, notified
+
+def attendance_event(user, display_name, ci, att, created):
+    return {
+        "course_info_id": ci.id,
+        "student_id": user.id,
+        "username": user.username,
+        "display_name": display_name,
+        "session_date": str(att.session_date),
+        "status": att.status,
+        "created": created,
+        "first": timezone.localtime(att.first_seen).strftime("%H:%M"),
+        "last": timezone.localtime(att.last_seen).strftime("%H:%M"),
+    }
+
+def attendance_response(uid, user, display_name, ts, ci, att, created, calc, notified):
     return JsonResponse(
         {
             "ok": True,
@@ -268,7 +421,7 @@ def rfid_scan(request):
             "user": user.username,
             "display_name": display_name,
             "course_info": str(ci),
-            "session_date": str(session_date),
+            "session_date": str(att.session_date),
             "attendance_id": att.id,
             "created": created,
             "status": att.status,
@@ -290,12 +443,218 @@ def rfid_scan(request):
                 "level": calc.level,
                 "notified": notified,
             },
-            "debug": {
-                "now_local": timezone.localtime(ts).strftime("%Y-%m-%d %H:%M:%S"),
-                "course_info_id": getattr(ci, "id", None),
-                "start_time": str(getattr(ci, "start_time", "")),
-                "end_time": str(getattr(ci, "end_time", "")),
-            },
+            "debug": _section_debug(ts, ci),
+        },
+        status=200,
+    )
+
+def log_skewed_scan(uid, tag, device_id, status, source_ip, event_id, device_ts):
+    """Keep a buffered scan whose device_ts is implausible without applying it anywhere."""
+    user = tag.assigned_to if tag else None
+    build_scan_row(uid, user, tag, device_id, status, source_ip, event_id, device_ts, note="Clock skew").save()
+    return {"event_id": event_id, "uid": uid, "result": "clock_skew", "device_ts": device_ts.isoformat()}
+
+def replay_scan(uid, tag, device_id, status, source_ip, ts, event_id, device_ts):
+    """Apply one buffered scan at its own time; returns a compact result for the batch reply."""
+    user = tag.assigned_to if tag else None
+    result = {"event_id": event_id, "uid": uid, "scanned_at": ts.isoformat()}
+    build_scan_row(uid, user, tag, device_id, status, source_ip, event_id, device_ts).save()
+
+    if not user:
+        note_unassigned_scan(uid, ts, device_id)
+        return {**result, "result": "unknown_tag"}
+    if not HAVE_ATT:
+        return {**result, "result": "logged"}
+
+    ci = find_current_courseinfo_for_student(user, ts=ts)
+    if not ci:
+        return {**result, "result": "no_class"}
+    if not is_student_enrolled(user, ci):
+        return {**result, "result": "not_enrolled", "course_info_id": ci.id}
+
+    try:
+        att, created, calc, notified = record_attendance(user, ci, ts, device_id)
+    except Exception as e:
+        return {**result, "result": "error", "course_info_id": ci.id, "error": str(e)}
+
+    display_name = (user.get_full_name() or user.username).strip()
+    _publish_after_commit(
+        [section_channel(ci.id), device_channel(device_id)],
+        "attendance",
+        attendance_event(user, display_name, ci, att, created),
+    )
+    return {
+        **result, "result": "recorded", "course_info_id": ci.id,
+        "attendance_id": att.id, "created": created, "status": att.status,
+    }
+
+
+# === Views ===
+@csrf_exempt
+@require_http_methods(["POST"])
+@transaction.atomic
+def tag_to_student(request):
+    parsed, error = parse_assign_request(request)
+    if error:
+        return error
+    uid, username, user_id, force = parsed
+
+    try:
+        target_user = (
+            User.objects.get(id=user_id) if user_id is not None else User.objects.get(username=username)
+        )
+    except User.DoesNotExist:
+        return JsonResponse({"ok": False, "error": "User not found"}, status=404)
+
+    existing_for_user = getattr(target_user, "rfid_tag", None)
+    tag = RFIDTag.objects.select_related("assigned_to").filter(tag_uid=uid).first()
+    conflict = assign_conflict_response(target_user, existing_for_user, tag, uid, force)
+    if conflict:
+        return conflict
+
+    if tag is None:
+        tag = RFIDTag.objects.create(tag_uid=uid, assigned_to=target_user)
+    else:
+        tag.assigned_to = target_user
+        tag.save(update_fields=["assigned_to"])
+
+    return assigned_response(tag, target_user)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@throttle_scans
+@debounce_taps
+@transaction.atomic
+def rfid_scan(request):
+    parsed, error = parse_scan_request(request)
+    if error:
+        return error
+    uid, device_id, status, event_id, device_ts = parsed
+
+    ts = scan_time(device_ts, timezone.now())
+    source_ip = request.META.get("REMOTE_ADDR")
+
+    tag = RFIDTag.objects.select_related("assigned_to").filter(tag_uid=uid).first()
+    user = tag.assigned_to if tag else None
+    known = bool(user)
+
+    try:
+        # Savepoint: a retried event_id trips the unique constraint without
+        # poisoning the request transaction.
+        with transaction.atomic():
+            build_scan_row(uid, user, tag, device_id, status, source_ip, event_id, device_ts).save()
+    except IntegrityError as e:
+        # Only a repeated event_id is an idempotent replay; anything else is a real failure.
+        if not event_id:
+            return scan_write_failed_response(e)
+        prior = RfidScan.objects.filter(device_id=device_id, event_id=event_id).first()
+        return duplicate_scan_response(uid, event_id, prior)
+    except Exception as e:
+        return scan_write_failed_response(e)
+
+    if not known:
+        note_unassigned_scan(uid, ts, device_id)
+        _publish_after_commit(
+            [UNASSIGNED_CHANNEL, device_channel(device_id)],
+            "unassigned",
+            {"uid": uid, "device_id": device_id or None, "scanned_at": ts.isoformat()},
+        )
+        return unknown_tag_response(uid, ts)
+
+    display_name = (user.get_full_name() or user.username).strip()
+    if not HAVE_ATT:
+        return no_attendance_module_response(uid, user, display_name, ts)
+
+    ci = find_current_courseinfo_for_student(user, ts=ts)
+
+    if not ci:
+        tokens = _weekday_tokens(ts)
+        match_count = active_sections_now_qs(ts, tokens).count()
+        return no_class_response(uid, user, display_name, ts, tokens, match_count)
+
+    if not is_student_enrolled(user, ci):
+        return not_enrolled_response(uid, user, display_name, ts, ci)
+
+    try:
+        att, created, calc, notified = record_attendance(user, ci, ts, device_id)
+    except Exception as e:
+        return attendance_error_response(uid, user, display_name, ts, ci, e)
+
+    _publish_after_commit(
+        [section_channel(ci.id), device_channel(device_id)],
+        "attendance",
+        attendance_event(user, display_name, ci, att, created),
+    )
+    return attendance_response(uid, user, display_name, ts, ci, att, created, calc, notified)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@throttle_scans
+def rfid_scan_batch(request):
+    """Replay a reader's offline buffer:
+    {"device_id": ..., "scans": [{"uid", "event_id", "device_ts", "status"}, ...]}.
+
+    Scans are applied oldest first at their device time, each in its own transaction,
+    so a failure part-way keeps what was applied; event_ids already stored are
+    reported as duplicates, so the reader can resend the whole batch until it gets a 200.
+    device_ts is required. One outside the plausible window is stored as a raw scan
+    ("clock_skew") but never marks attendance: receipt time may fall in another session.
+    """
+    parsed, error = parse_batch_request(request)
+    if error:
+        return error
+    device_id, scans = parsed
+
+    received = timezone.now()
+    source_ip = request.META.get("REMOTE_ADDR")
+
+    event_ids = [s["event_id"] for s in scans if s["event_id"]]
+    seen = set(
+        RfidScan.objects.filter(device_id=device_id, event_id__in=event_ids).values_list("event_id", flat=True)
+    )
+    tags = {
+        t.tag_uid: t
+        for t in RFIDTag.objects.select_related("assigned_to").filter(tag_uid__in={s["uid"] for s in scans if s["uid"]})
+    }
+
+    results = []
+    for scan in sorted(scans, key=lambda s: scan_time(s["device_ts"], received)):
+        uid, event_id = scan["uid"], scan["event_id"]
+        if not (uid and event_id and scan["device_ts"]):
+            results.append({
+                "event_id": event_id, "uid": uid, "result": "invalid",
+                "error": "uid, event_id and device_ts are required",
+            })
+            continue
+        if event_id in seen:
+            results.append({"event_id": event_id, "uid": uid, "result": "duplicate"})
+            continue
+        seen.add(event_id)
+        try:
+            with transaction.atomic():
+                if plausible_device_ts(scan["device_ts"], received):
+                    results.append(replay_scan(
+                        uid, tags.get(uid), device_id, scan["status"], source_ip,
+                        scan_time(scan["device_ts"], received), event_id, scan["device_ts"],
+                    ))
+                else:
+                    results.append(log_skewed_scan(
+                        uid, tags.get(uid), device_id, scan["status"], source_ip, event_id, scan["device_ts"],
+                    ))
+        except IntegrityError:
+            results.append({"event_id": event_id, "uid": uid, "result": "duplicate"})
+        except Exception as e:
+            results.append({"event_id": event_id, "uid": uid, "result": "error", "error": str(e)})
+
+    return JsonResponse(
+        {
+            "ok": True,
+            "device_id": device_id,
+            "received": len(scans),
+            "counts": dict(Counter(r["result"] for r in results)),
+            "results": results,
         },
         status=200,
     )
@@ -0,0 +1,119 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from main_app.views.attendance_views import afind_current_courseinfo_for_student, _weekday_tokens
+from main_app.views.attendance_api import (
+    HAVE_ATT,
+    parse_assign_request, assign_conflict_response, assigned_response,
+    debounce_taps, parse_scan_request, scan_time, build_scan_row, scan_write_failed_response, duplicate_scan_response,
+    unknown_tag_response, no_attendance_module_response, active_sections_now_qs,
+    no_class_response, not_enrolled_response, attendance_error_response,
+    record_attendance, attendance_event, attendance_response,
+)
+from ..models import RFIDTag, RfidScan, Enrollment
+from ..services.rfid_index import anote_unassigned_scan
+from ..services.throttle import throttle_scans
+from ..services.live import publish_event, section_channel, device_channel, UNASSIGNED_CHANNEL
+
+User = get_user_model()
+
+# get_or_create + warning update + mail must share one transaction, which the
+# async ORM cannot open; this is the only hop back to a worker thread.
+_record_attendance = sync_to_async(record_attendance)
+
+# === Views ===
+@csrf_exempt
+@require_http_methods(["POST"])
+async def tag_to_student_async(request):
+    parsed, error = parse_assign_request(request)
+    if error:
+        return error
+    uid, username, user_id, force = parsed
+
+    users = User.objects.filter(id=user_id) if user_id is not None else User.objects.filter(username=username)
+    target_user = await users.afirst()
+    if target_user is None:
+        return JsonResponse({"ok": False, "error": "User not found"}, status=404)
+
+    existing_for_user = await RFIDTag.objects.filter(assigned_to=target_user).afirst()
+    tag = await RFIDTag.objects.select_related("assigned_to").filter(tag_uid=uid).afirst()
+    conflict = assign_conflict_response(target_user, existing_for_user, tag, uid, force)
+    if conflict:
+        return conflict
+
+    if tag is None:
+        tag = await RFIDTag.objects.acreate(tag_uid=uid, assigned_to=target_user)
+    else:
+        tag.assigned_to = target_user
+        await tag.asave(update_fields=["assigned_to"])
+
+    return assigned_response(tag, target_user)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@throttle_scans
+@debounce_taps
+async def rfid_scan_async(request):
+    """Same contract as rfid_scan, served without holding a thread across DB round-trips."""
+    parsed, error = parse_scan_request(request)
+    if error:
+        return error
+    uid, device_id, status, event_id, device_ts = parsed
+
+    ts = scan_time(device_ts, timezone.now())
+    source_ip = request.META.get("REMOTE_ADDR")
+
+    tag = await RFIDTag.objects.select_related("assigned_to").filter(tag_uid=uid).afirst()
+    user = tag.assigned_to if tag else None
+    known = bool(user)
+
+    try:
+        await build_scan_row(uid, user, tag, device_id, status, source_ip, event_id, device_ts).asave()
+    except IntegrityError as e:
+        if not event_id:
+            return scan_write_failed_response(e)
+        prior = await RfidScan.objects.filter(device_id=device_id, event_id=event_id).afirst()
+        return duplicate_scan_response(uid, event_id, prior)
+    except Exception as e:
+        return scan_write_failed_response(e)
+
+    if not known:
+        await anote_unassigned_scan(uid, ts, device_id)
+        publish_event(
+            [UNASSIGNED_CHANNEL, device_channel(device_id)],
+            "unassigned",
+            {"uid": uid, "device_id": device_id or None, "scanned_at": ts.isoformat()},
+        )
+        return unknown_tag_response(uid, ts)
+
+    display_name = (user.get_full_name() or user.username).strip()
+    if not HAVE_ATT:
+        return no_attendance_module_response(uid, user, display_name, ts)
+
+    ci = await afind_current_courseinfo_for_student(user, ts=ts)
+
+    if not ci:
+        tokens = _weekday_tokens(ts)
+        match_count = await active_sections_now_qs(ts, tokens).acount()
+        return no_class_response(uid, user, display_name, ts, tokens, match_count)
+
+    if not await Enrollment.objects.filter(student=user, course_info=ci).aexists():
+        return not_enrolled_response(uid, user, display_name, ts, ci)
+
+    try:
+        att, created, calc, notified = await _record_attendance(user, ci, ts, device_id)
+    except Exception as e:
+        return attendance_error_response(uid, user, display_name, ts, ci, e)
+
+    publish_event(
+        [section_channel(ci.id), device_channel(device_id)],
+        "attendance",
+        attendance_event(user, display_name, ci, att, created),
+    )
+    return attendance_response(uid, user, display_name, ts, ci, att, created, calc, notified)
@@ -1,7 +1,5 @@
 import json
 from datetime import datetime
-
-from dataclasses import dataclass
 from typing import Tuple
 
 from django.conf import settings
@@ -10,20 +8,23 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.mail import send_mail
 from django.db import transaction
-from django.db.models import Count
 from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.views.decorators.http import require_GET, require_POST
 
 from ..forms import recent_unassigned_uids
+from ..conditional import versioned
+from ..services.rfid_index import unassigned_versions
+from ..db_routers import replica_ok
+from ..services.attendance_query import (
+    MAX_ROWS, AttendanceFilters, attendance_queryset, record_dict, scope_for, section_options,
+)
 from main_app.models import Attendance, Enrollment, CourseInfo
+from ..services.policy import PolicyCalc, calculate_policy, _email_subject, _email_body
 
 User = get_user_model()
 
-SEMESTER_WEEKS = 16
-LATE_PER_ABSENCE = 4
-WARNING_THRESHOLDS = (0.25, 0.50, 0.75)
 HAVE_ATT = True
 
 # === Helpers ===
@@ -49,104 +50,28 @@ def _day_code_for(ts):
     else:
         return "fs"
 
-def find_current_courseinfo_for_student(student, ts=None):
-    if not HAVE_ATT or not student:
-        return None
-    ts = ts or timezone.now()
+def _current_courseinfo_qs(student, ts):
     local_dt = timezone.localtime(ts)
     t = local_dt.time()
     day_code = _day_code_for(ts)
-    qs = CourseInfo.objects.all()
+    qs = CourseInfo.objects.select_related("course")
     try:
         qs = qs.filter(status__in=["Yes", "Available"])
     except Exception:
         pass
     qs = qs.filter(days=day_code, start_time__lte=t, end_time__gte=t)
     qs = qs.filter(enrollments__student=student).distinct()
-    return qs.order_by("start_time").first()
-
-def _weekly_meetings(days_code: str) -> int:
-    d = (days_code or "").lower()
-    if d == "uth":
-        return 3
-    if d in ("mw", "fs"):
-        return 2
-    return 2
-
-def planned_sessions(ci: CourseInfo) -> int:
-    return _weekly_meetings(ci.days) * SEMESTER_WEEKS
-
-@dataclass
-class PolicyCalc:
-    present: int
-    late: int
-    absent: int
-    late_as_absence: int
-    absence_equiv: int
-    planned: int
-    pct_absence: float
-    level: int
-
-def calculate_policy(student_id: int, ci: CourseInfo) -> PolicyCalc:
-    qs = (
-        Attendance.objects
-        .filter(student_id=student_id, course_info=ci)
-        .values("status")
-        .annotate(c=Count("id"))
-    )
-    counts = {row["status"]: row["c"] for row in qs}
-    present = counts.get("PRESENT", 0)
-    late = counts.get("LATE", 0)
-    absent = counts.get("ABSENT", 0)
-    late_as_absence = late // LATE_PER_ABSENCE
-    absence_equiv = absent + late_as_absence
-    planned = planned_sessions(ci) or 1
-    pct_absence = absence_equiv / planned
-    if pct_absence >= WARNING_THRESHOLDS[2]:
-        level = 3
-    elif pct_absence >= WARNING_THRESHOLDS[1]:
-        level = 2
-    elif pct_absence >= WARNING_THRESHOLDS[0]:
-        level = 1
-    else:
-        level = 0
-    return PolicyCalc(
-        present=present,
-        late=late,
-        absent=absent,
-        late_as_absence=late_as_absence,
-        absence_equiv=absence_equiv,
-        planned=planned,
-        pct_absence=pct_absence,
-        level=level,
-    )
+    return qs.order_by("start_time")
 
-def _email_subject(ci: CourseInfo, level: int) -> str:
-    tag = {1: "Warning 1/3", 2: "Warning 2/3", 3: "Final Warning (3/3)"}[level]
-    return f"[Attendance] {ci.course.code} – {tag}"
+def find_current_courseinfo_for_student(student, ts=None):
+    if not HAVE_ATT or not student:
+        return None
+    return _current_courseinfo_qs(student, ts or timezone.now()).first()
 
-def _email_body(student_name: str, ci: CourseInfo, calc: PolicyCalc) -> str:
-    pct = round(calc.pct_absence * 100, 1)
-    lines = [
-        f"Dear {student_name},",
-        "",
-        f"This is an attendance notice for {ci.course.code} – {ci.course.name} (Section {getattr(ci, 'section', '—')}).",
-        f"Semester: {ci.year} / {ci.get_semester_display()}",
-        "",
-        f"• Present: {calc.present}",
-        f"• Late: {calc.late} (every {LATE_PER_ABSENCE} late = 1 absence ⇒ +{calc.late_as_absence})",
-        f"• Absent-equivalent total: {calc.absence_equiv} out of ~{calc.planned} planned sessions ({pct}%)",
-        "",
-        "Policy:",
-        f"• Warnings at 25%, 50%, 75%. 4 late = 1 absence.",
-        "• At 3 warnings (≥75%), you fail the course due to attendance.",
-        "",
-        "Please adjust your attendance accordingly.",
-        "",
-        "Regards,",
-        "Registrar",
-    ]
-    return "\n".join(lines)
+async def afind_current_courseinfo_for_student(student, ts=None):
+    if not HAVE_ATT or not student:
+        return None
+    return await _current_courseinfo_qs(student, ts or timezone.now()).afirst()
 
 def maybe_update_warning_and_notify(student, ci: CourseInfo) -> Tuple[PolicyCalc, bool]:
     calc = calculate_policy(student.id, ci)
@@ -178,9 +103,45 @@ def maybe_update_warning_and_notify(student, ci: CourseInfo) -> Tuple[PolicyCalc
 # === Views ===
 @staff_member_required
 @require_GET
+@versioned((unassigned_versions, ()))
 def latest_unassigned_uids_api(request):
     return JsonResponse({"uids": [u for (u, _) in recent_unassigned_uids()]})
 
+@replica_ok
+@login_required
+@require_GET
+def attendance_records_api(request):
+    """JSON twin of the admin/teacher/student attendance lists, scoped by the caller's role.
+
+    Accepts the same filters as the HTML pages plus limit/offset; pass
+    sections=0 to skip the (cached) section options once the client has them.
+    """
+    user = request.user
+    filters = AttendanceFilters.from_request(request)
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or 100), MAX_ROWS))
+        offset = max(0, int(request.GET.get("offset") or 0))
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "limit/offset must be integers"}, status=400)
+
+    scope = scope_for(user)
+    rows = list(attendance_queryset(user, filters, scope=scope, with_warn_level=True)[offset:offset + limit + 1])
+    data = {
+        "ok": True,
+        "scope": scope,
+        "filters": filters.as_context(),
+        "records": [record_dict(a) for a in rows[:limit]],
+        "has_more": len(rows) > limit,
+        "offset": offset,
+        "limit": limit,
+    }
+    if request.GET.get("sections", "1") != "0":
+        data["sections"] = [
+            {"id": s["id"], "label": s["label"], "teacher": s["teacher"]}
+            for s in section_options(request, scope)
+        ]
+    return JsonResponse(data)
+
 @login_required
 @require_POST
 @transaction.atomic
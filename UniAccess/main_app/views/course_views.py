@@ -10,13 +10,19 @@ from ..models import Course, CourseInfo, Enrollment
 from ..forms import CourseForm, CourseInfoForm
 from django.contrib.auth import get_user_model
 from django.conf import settings
-from django.core.cache import cache
 from datetime import datetime
+from ..services.cache import CATALOG, CacheNamespace, fragment_versions
+from ..services.attendance_query import section_cache
+from ..conditional import versioned
 
 User = get_user_model()
 
 MAX_COURSES_PER_STUDENT = 6
 
+# Admin's Add/Drop override (True/False); absent means "follow REGISTRATION_CONTROL".
+registration_cache = CacheNamespace("registration", ttl=None, persistent=True)
+REGISTRATION_OVERRIDE = "is_open"
+
 # === Helpers ===
 def _parse_dt(s):
     if not s:
@@ -34,7 +40,7 @@ def is_registration_open():
     default_open = bool(cfg.get("DEFAULT_OPEN", True))
     open_from = _parse_dt(cfg.get("OPEN_FROM"))
     open_until = _parse_dt(cfg.get("OPEN_UNTIL"))
-    override = cache.get("registration:is_open")
+    override = registration_cache.get(REGISTRATION_OVERRIDE)
     if override is not None:
         return bool(override)
     now = timezone.now()
@@ -47,6 +53,7 @@ def is_registration_open():
 
 # === Views ===
 @login_required
+@versioned((fragment_versions, CATALOG), per_user=True, templates=("courses/courses_list.html",))
 def courses_list(request):
     q = (request.GET.get("q") or "").strip()
     college = (request.GET.get("college") or "").strip()
@@ -92,6 +99,12 @@ class CourseDelete(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy("courses_list")
 
 @login_required
+# available_only filters on enrolled_count, so roster changes (which bump the
+# sections version) must also move the ETag.
+@versioned(
+    (fragment_versions, CATALOG), (section_cache, ()),
+    per_user=True, templates=("courses/course_Info/courseInfo_list.html",),
+)
 def courseInfo_list(request):
     q = (request.GET.get("q") or "").strip()
     college = (request.GET.get("college") or "").strip()
@@ -159,14 +172,13 @@ def courseInfo_list(request):
         order = "course__code"
     sections = qs.order_by(order)
 
-    teacher_opts = list(
+    # Left unevaluated: the filter fragment is cached, so these only run on a cache miss.
+    teacher_opts = (
         User.objects.filter(role="teacher")
         .order_by("first_name", "last_name", "username")
         .values("id", "first_name", "last_name", "username")
     )
-    year_opts = list(
-        CourseInfo.objects.order_by("-year").values_list("year", flat=True).distinct()
-    )
+    year_opts = CourseInfo.objects.order_by("-year").values_list("year", flat=True).distinct()
 
     context = {
         "sections": sections,
@@ -374,14 +386,12 @@ def register_course(request):
         )
         return redirect("register_course")
 
-    teacher_opts = list(
+    teacher_opts = (
         User.objects.filter(role="teacher")
         .order_by("first_name", "last_name", "username")
         .values("id", "first_name", "last_name", "username")
     )
-    year_opts = list(
-        CourseInfo.objects.order_by("-year").values_list("year", flat=True).distinct()
-    )
+    year_opts = CourseInfo.objects.order_by("-year").values_list("year", flat=True).distinct()
 
     context = {
         "available_courses": available_courses,
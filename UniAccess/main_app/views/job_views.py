@@ -0,0 +1,124 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, JsonResponse, QueryDict
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
+
+from ..models import Course, CourseInfo, Job
+from ..services.attendance_query import ADMIN, AttendanceFilters
+from ..services.export import EXPORT_FORMATS
+from ..services.jobs import enqueue, job_file_path, request_cancel
+
+# Kinds staff may start from the jobs page (imports go through the import form).
+ENQUEUE_KINDS = {"recompute_warnings", "section_reports", "export_attendance", "avatar_variants"}
+
+# === Helpers ===
+def _visible_jobs(user):
+    qs = Job.objects.select_related("created_by")
+    return qs if user.is_superuser else qs.filter(created_by=user)
+
+def _job_or_404(request, pk):
+    return get_object_or_404(_visible_jobs(request.user), pk=pk)
+
+def _job_payload(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "finished": job.is_finished,
+        "percent": job.percent,
+        "done": job.progress_done,
+        "total": job.progress_total,
+        "message": job.message,
+        "error": job.error.strip().splitlines()[-1] if job.error else "",
+        "download_url": reverse("job_download", args=[job.id]) if job.result_file else None,
+    }
+
+def _term_params(post):
+    params = {}
+    for key in ("college", "semester"):
+        if post.get(key):
+            params[key] = post[key]
+    if (post.get("year") or "").isdigit():
+        params["year"] = int(post["year"])
+    return params
+
+def save_job_upload(uploaded):
+    """Store an upload under JOBS_ROOT/uploads/ for a worker; returns the JOBS_ROOT-relative path."""
+    rel = os.path.join("uploads", f"{uuid.uuid4().hex}{os.path.splitext(uploaded.name)[1]}")
+    path = os.path.join(settings.JOBS_ROOT, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    uploaded.seek(0)
+    with open(path, "wb") as fh:
+        for chunk in uploaded.chunks():
+            fh.write(chunk)
+    return rel
+
+# === Views ===
+@staff_member_required
+def job_list(request):
+    context = {
+        "jobs": _visible_jobs(request.user)[:50],
+        "college_opts": Course.COLLEGE_CHOICES,
+        "semester_opts": CourseInfo.SEMESTER_CHOICES,
+    }
+    return render(request, "admin/jobs.html", context)
+
+@staff_member_required
+@require_POST
+def job_enqueue(request):
+    kind = request.POST.get("kind")
+    if kind not in ENQUEUE_KINDS:
+        messages.error(request, "Unknown job type.")
+        return redirect("job_list")
+
+    if kind == "export_attendance":
+        fmt = request.POST.get("fmt", "csv")
+        if fmt not in EXPORT_FORMATS:
+            raise Http404("Unknown export format.")
+        filters = AttendanceFilters.from_query(QueryDict(request.POST.get("query", "")))
+        params = {"scope": ADMIN, "fmt": fmt, "filters": filters.as_context()}
+    elif kind == "avatar_variants":
+        params = {}
+    else:
+        params = _term_params(request.POST)
+        if kind == "recompute_warnings":
+            params["notify"] = request.POST.get("notify") == "on"
+
+    job = enqueue(kind, params, user=request.user)
+    messages.success(request, f"Job #{job.id} queued.")
+    return redirect("job_detail", pk=job.id)
+
+@staff_member_required
+def job_detail(request, pk):
+    job = _job_or_404(request, pk)
+    return render(request, "admin/job_detail.html", {"job": job, "payload": _job_payload(job)})
+
+@staff_member_required
+@require_GET
+def job_status(request, pk):
+    return JsonResponse(_job_payload(_job_or_404(request, pk)))
+
+@staff_member_required
+@require_POST
+def job_cancel(request, pk):
+    job = _job_or_404(request, pk)
+    if not job.is_finished:
+        request_cancel(job)
+        messages.info(request, f"Cancellation requested for job #{job.id}.")
+    return redirect("job_detail", pk=job.id)
+
+@staff_member_required
+def job_download(request, pk):
+    job = _job_or_404(request, pk)
+    if not job.result_file:
+        raise Http404("This job has no result file.")
+    path = job_file_path(job.result_file)
+    if not path or not os.path.exists(path):
+        raise Http404("Result file is missing.")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=os.path.basename(path))
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+
+from ..models import CourseInfo
+from ..services.live import get_hub, section_channel, device_channel, UNASSIGNED_CHANNEL
+
+KEEPALIVE_SEC = 15
+
+# === Helpers ===
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _event_stream(channels):
+    sub = get_hub().subscribe(channels)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                msg = await asyncio.wait_for(sub.get(), timeout=KEEPALIVE_SEC)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _sse(msg["event"], msg["data"])
+    finally:
+        sub.close()
+
+async def _allowed_channels(request, user):
+    """Staff may follow anything; teachers only their own sections."""
+    is_staff = user.is_staff or user.is_superuser
+    section_id = (request.GET.get("section") or "").strip()
+    device_id = (request.GET.get("device") or "").strip()
+    unassigned = request.GET.get("unassigned") == "1"
+
+    channels = []
+    if section_id:
+        try:
+            section_id = int(section_id)
+        except ValueError:
+            return None, HttpResponseBadRequest("Invalid section.")
+        if not is_staff:
+            owns = await CourseInfo.objects.filter(id=section_id, teacher=user).aexists()
+            if not owns:
+                return None, HttpResponseForbidden("You do not teach this section.")
+        channels.append(section_channel(section_id))
+    if device_id or unassigned:
+        if not is_staff:
+            return None, HttpResponseForbidden("Staff only.")
+        if device_id:
+            channels.append(device_channel(device_id))
+        if unassigned:
+            channels.append(UNASSIGNED_CHANNEL)
+    if not channels:
+        return None, HttpResponseBadRequest("Pick a section, device or unassigned feed.")
+    return channels, None
+
+
+# === Views ===
+@login_required
+async def live_events(request):
+    """Server-sent events feed of scans/attendance. Needs the ASGI server (UniAccess.asgi).
+
+    With LIVE_EVENTS_ENABLED off (the WSGI default) it answers 204, which tells an
+    EventSource not to reconnect, instead of holding a worker for the page's lifetime.
+    """
+    if not settings.LIVE_EVENTS_ENABLED:
+        return HttpResponse(status=204)
+    user = await request.auser()
+    channels, error = await _allowed_channels(request, user)
+    if error:
+        return error
+    response = StreamingHttpResponse(_event_stream(channels), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -1,17 +1,22 @@
 import json
-from datetime import timedelta, datetime as _dt, time as _time
+from datetime import timedelta
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Subquery, OuterRef, IntegerField, Value, Count
-from django.db.models.functions import ExtractHour, Coalesce
+from django.db.models import Count
+from django.db.models.functions import ExtractHour
 from django.http import HttpResponseForbidden
 from django.shortcuts import render, redirect
 from django.utils import timezone
 
 from ..forms import ProfileForm
+from ..db_routers import replica_ok
+from ..services.attendance_query import STUDENT, MAX_ROWS, AttendanceFilters, attendance_queryset, section_options
+from ..services.export import export_response
+from ..services.teacher_stats import teacher_stats, recent_section_attendance, recent_section_scans
+from ..services.timetable import DAY_ORDER_FULL, student_timetable
 from ..models import (
     Profile, Enrollment, Attendance, RfidScan,
     CourseInfo, Course, RFIDTag
@@ -50,12 +55,6 @@ def _day_bucket_for_today(now=None):
 def _is_teacher(user):
     return getattr(user, "role", None) == "teacher" or user.is_staff or user.is_superuser
 
-def _parse_date(s):
-    try:
-        return _dt.strptime(s, "%Y-%m-%d").date()
-    except Exception:
-        return None
-
 
 # === Views ===
 def home(request):
@@ -77,6 +76,7 @@ def edit_profile(request):
         form = ProfileForm(instance=profile)
     return render(request, "profile_edit.html", {"form": form})
 
+@replica_ok
 @staff_member_required
 def admin_dashboard(request):
     now = timezone.localtime()
@@ -94,7 +94,7 @@ def admin_dashboard(request):
         "tags_unassigned": RFIDTag.objects.filter(assigned_to__isnull=True).count(),
         "scans_today": RfidScan.objects.filter(created_at__gte=start_today, created_at__lt=end_today).count(),
         "unknown_scans_today": RfidScan.objects.filter(
-            created_at__gte=start_today, created_at__lt=end_today, user__isnull=True
+            created_at__gte=start_today, created_at__lt=end_today, success=False
         ).count(),
     }
 
@@ -125,7 +125,7 @@ def admin_dashboard(request):
     scans_hour_counts = [scans_map.get(h, 0) for h in scans_hour_labels]
 
     recent_unknown_scans = (
-        RfidScan.objects.filter(created_at__gte=start_today, created_at__lt=end_today, user__isnull=True)
+        RfidScan.objects.filter(created_at__gte=start_today, created_at__lt=end_today, success=False)
         .order_by("-created_at")
         .values("uid", "device_id", "created_at")[:10]
     )
@@ -148,6 +148,7 @@ def admin_dashboard(request):
     }
     return render(request, "dashboard/admin_dashboard.html", context)
 
+@replica_ok
 @login_required
 def student_dashboard(request):
     user = request.user
@@ -158,114 +159,67 @@ def student_dashboard(request):
     reg_open = getattr(settings, "REGISTRATION_OPEN", True)
     tag_uid = getattr(getattr(user, "rfid_tag", None), "tag_uid", None)
 
-    enrollments = (
-        Enrollment.objects
-        .filter(student=user)
-        .select_related("course_info", "course_info__course", "course_info__teacher")
-        .order_by("course_info__course__code", "course_info__section")
-    )
-
+    timetable = student_timetable(user.pk)
+    live = {
+        eid: (lvl, failed)
+        for eid, lvl, failed in Enrollment.objects.filter(student=user)
+        .values_list("id", "attendance_warning_level", "failed_due_to_attendance")
+    }
+    enrollments = []
     warn_counts = [0, 0, 0, 0]
-    for e in enrollments:
-        lvl = int(e.attendance_warning_level or 0)
-        if lvl <= 0:
-            warn_counts[0] += 1
-        elif lvl == 1:
-            warn_counts[1] += 1
-        elif lvl == 2:
-            warn_counts[2] += 1
-        else:
-            warn_counts[3] += 1
-
+    for row in timetable["enrollments"]:
+        if row["id"] not in live:
+            continue
+        lvl, failed = live[row["id"]]
+        enrollments.append({**row, "attendance_warning_level": lvl, "failed_due_to_attendance": failed})
+        warn_counts[min(max(int(lvl or 0), 0), 3)] += 1
+
+    # One read of the last 30 days feeds both the pie counts and the "recent" table;
+    # only students with fewer than 10 marks in that window need a second query.
     today = timezone.localdate()
     since = today - timedelta(days=30)
-    last30 = (
+    window = list(
         Attendance.objects
         .filter(student=user, session_date__gte=since)
-        .values("status")
-        .annotate(c=Count("id"))
+        .select_related("course_info", "course_info__course")
+        .order_by("-session_date", "-first_seen")
     )
-    c_map = {r["status"]: r["c"] for r in last30}
+    c_map = {}
+    for a in window:
+        c_map[a.status] = c_map.get(a.status, 0) + 1
     present = c_map.get("PRESENT", 0)
     late = c_map.get("LATE", 0)
     absent = c_map.get("ABSENT", 0)
+    recent_attendance = window[:10]
+    if len(recent_attendance) < 10:
+        recent_attendance = list(
+            Attendance.objects
+            .filter(student=user)
+            .select_related("course_info", "course_info__course")
+            .order_by("-session_date", "-first_seen")[:10]
+        )
 
     bucket = _day_bucket_for_today()
-    todays_classes = [e.course_info for e in enrollments if (e.course_info.days or "").lower() == bucket]
-    todays_classes.sort(key=lambda ci: (ci.start_time, ci.course.code))
+    todays_classes = [e["course_info"] for e in enrollments if e["course_info"]["days"] == bucket]
+    todays_classes.sort(key=lambda ci: (ci["start_time"], ci["course"]["code"]))
 
     now = timezone.localtime()
     next_class = None
     for ci in todays_classes:
-        if ci.start_time >= now.time():
+        if ci["start_time"] >= now.time():
             next_class = ci
             break
 
-    recent_attendance = (
-        Attendance.objects
-        .filter(student=user)
-        .select_related("course_info", "course_info__course")
-        .order_by("-session_date", "-first_seen")[:10]
-    )
     recent_scans = (
         RfidScan.objects
         .filter(user=user)
+        .only("created_at", "uid", "note")
         .order_by("-created_at")[:10]
     )
 
     att_pie = {"labels": ["Present", "Late", "Absent"], "data": [present, late, absent]}
     warn_bars = {"labels": ["Level 0", "Level 1", "Level 2", "Level 3"], "data": warn_counts}
 
-    DAY_ORDER_FULL = [
-        ("sun", "Sunday"), ("mon", "Monday"), ("tue", "Tuesday"),
-        ("wed", "Wednesday"), ("thu", "Thursday"), ("fri", "Friday"), ("sat", "Saturday"),
-    ]
-    BUCKET_TO_DAYS = {"uth": ["sun", "tue", "thu"], "mw": ["mon", "wed"], "fs": ["fri", "sat"]}
-
-    week_grid = {k: [] for k, _ in DAY_ORDER_FULL}
-    min_t, max_t = None, None
-
-    for e in enrollments:
-        ci = e.course_info
-        days_key = (ci.days or "").lower()
-        for dk in BUCKET_TO_DAYS.get(days_key, []):
-            week_grid[dk].append(ci)
-        if min_t is None or ci.start_time < min_t:
-            min_t = ci.start_time
-        if max_t is None or ci.end_time > max_t:
-            max_t = ci.end_time
-
-    for k in week_grid:
-        week_grid[k].sort(key=lambda c: (c.start_time, c.course.code))
-
-    def _round_down_hour(t: _time) -> _time:
-        return _time(t.hour, 0)
-
-    def _round_up_hour(t: _time) -> _time:
-        if t.minute == 0 and t.second == 0:
-            return _time(t.hour, 0)
-        base = _dt.combine(today, t) + timedelta(hours=1)
-        return _time(base.hour, 0)
-
-    start_slot = _round_down_hour(min_t) if min_t else _time(8, 0)
-    end_slot = _round_up_hour(max_t) if max_t else _time(18, 0)
-
-    week_slots = []
-    cur = _dt.combine(today, start_slot)
-    end_dt = _dt.combine(today, end_slot)
-    while cur <= end_dt:
-        week_slots.append(cur.time())
-        cur += timedelta(hours=1)
-
-    day_keys = [k for k, _ in DAY_ORDER_FULL]
-    week_table_rows = []
-    for slot in week_slots:
-        cells = []
-        for dk in day_keys:
-            cell_items = [ci for ci in week_grid[dk] if ci.start_time <= slot < ci.end_time]
-            cells.append(cell_items)
-        week_table_rows.append({"slot": slot, "cells": cells})
-
     context = {
         "reg_open": reg_open,
         "tag_uid": tag_uid,
@@ -281,10 +235,12 @@ def student_dashboard(request):
         "att_pie": att_pie,
         "warn_bars": warn_bars,
         "day_order_full": DAY_ORDER_FULL,
-        "week_table_rows": week_table_rows,
+        "week_table_rows": timetable["week_table_rows"],
+        "timetable_version": timetable["version"],
     }
     return render(request, "dashboard/student_dashboard.html", context)
 
+@replica_ok
 @login_required
 def student_attendance(request):
     user = request.user
@@ -292,61 +248,8 @@ def student_attendance(request):
         messages.warning(request, "This page is for student accounts.")
         return redirect("home")
 
-    q = (request.GET.get("q") or "").strip()
-    status = (request.GET.get("status") or "").strip()
-    section_id = (request.GET.get("course_info") or "").strip()
-    start = (request.GET.get("start") or "").strip()
-    end = (request.GET.get("end") or "").strip()
-    order = (request.GET.get("order") or "-session_date").strip()
-
-    qs = Attendance.objects.select_related(
-        "course_info", "course_info__course", "course_info__teacher"
-    ).filter(student=user)
-
-    if q:
-        qs = qs.filter(
-            Q(course_info__course__code__icontains=q) |
-            Q(course_info__course__name__icontains=q) |
-            Q(course_info__class_name__icontains=q) |
-            Q(course_info__teacher__username__icontains=q) |
-            Q(course_info__teacher__first_name__icontains=q) |
-            Q(course_info__teacher__last_name__icontains=q)
-        )
-
-    if status:
-        qs = qs.filter(status=status)
-
-    if section_id:
-        try:
-            qs = qs.filter(course_info_id=int(section_id))
-        except ValueError:
-            pass
-
-    start_d = _parse_date(start)
-    end_d = _parse_date(end)
-    if start_d:
-        qs = qs.filter(session_date__gte=start_d)
-    if end_d:
-        qs = qs.filter(session_date__lte=end_d)
-
-    subq = Enrollment.objects.filter(
-        student_id=user.id,
-        course_info_id=OuterRef("course_info_id"),
-    ).values("attendance_warning_level")[:1]
-
-    qs = qs.annotate(warn_level=Coalesce(Subquery(subq, output_field=IntegerField()), Value(0)))
-
-    allowed_order = {
-        "session_date", "-session_date",
-        "first_seen", "-first_seen",
-        "status", "-status",
-        "course_info__course__code", "-course_info__course__code",
-        "course_info__class_name", "-course_info__class_name",
-    }
-    if order not in allowed_order:
-        order = "-session_date"
-
-    records = qs.order_by(order)[:1000]
+    filters = AttendanceFilters.from_request(request)
+    records = attendance_queryset(user, filters, scope=STUDENT, with_warn_level=True)[:MAX_ROWS]
 
     status_counts = (
         Attendance.objects
@@ -355,63 +258,36 @@ def student_attendance(request):
         .annotate(c=Count("id"))
     )
     counts_map = {r["status"]: r["c"] for r in status_counts}
-    present = counts_map.get("PRESENT", 0)
-    late = counts_map.get("LATE", 0)
-    absent = counts_map.get("ABSENT", 0)
-
-    my_sections = (
-        Enrollment.objects
-        .filter(student=user)
-        .select_related("course_info", "course_info__course", "course_info__teacher")
-        .order_by("course_info__course__code", "course_info__section")
-    )
-    section_opts = [
-        {
-            "id": e.course_info.id,
-            "label": f"{e.course_info.course.code} – {e.course_info.class_name} (Sec {getattr(e.course_info, 'section', '—')})",
-            "teacher": (e.course_info.teacher.get_full_name() or e.course_info.teacher.username),
-        }
-        for e in my_sections
-    ]
 
     context = {
         "records": records,
-        "q": q,
-        "status": status,
-        "section_id": section_id,
-        "start": start,
-        "end": end,
-        "order": order,
+        **filters.as_context(),
         "status_opts": Attendance.STATUS_CHOICES,
-        "section_opts": section_opts,
-        "present": present,
-        "late": late,
-        "absent": absent,
+        "section_opts": section_options(request, STUDENT),
+        "present": counts_map.get("PRESENT", 0),
+        "late": counts_map.get("LATE", 0),
+        "absent": counts_map.get("ABSENT", 0),
     }
     return render(request, "registration/student_attendance.html", context)
 
+@replica_ok
+@login_required
+def student_attendance_export(request, fmt):
+    if getattr(request.user, "role", None) != "student":
+        return HttpResponseForbidden("Students only.")
+    return export_response(request, STUDENT, fmt)
+
+@replica_ok
 @login_required
 def teacher_dashboard(request):
     user = request.user
     if not _is_teacher(user):
         return HttpResponseForbidden("Teachers only.")
 
-    sections = (
-        CourseInfo.objects
-        .filter(teacher=user)
-        .select_related("course", "teacher")
-        .annotate(enrolled_count=Count("enrollments", distinct=True))
-        .order_by("course__code", "section", "class_name")
-    )
-
-    total_sections = sections.count()
-    total_students = (
-        Enrollment.objects
-        .filter(course_info__teacher=user)
-        .values("student_id").distinct().count()
-    )
-
     today = timezone.localdate()
+    stats = teacher_stats(user.pk, today)
+    sections = stats.sections
+
     bucket = _day_bucket_for_today(today)
     todays_sections = [ci for ci in sections if (ci.days or "").lower() == bucket]
     todays_sections.sort(key=lambda ci: (ci.start_time, ci.course.code))
@@ -423,52 +299,6 @@ def teacher_dashboard(request):
             next_class = ci
             break
 
-    att_today_qs = Attendance.objects.filter(course_info__teacher=user, session_date=today)
-    today_present = att_today_qs.filter(status="PRESENT").count()
-    today_late = att_today_qs.filter(status="LATE").count()
-    today_absent = att_today_qs.filter(status="ABSENT").count()
-
-    since = today - timedelta(days=30)
-    last30 = (
-        Attendance.objects
-        .filter(course_info__teacher=user, session_date__gte=since)
-        .values("status").annotate(c=Count("id"))
-    )
-    c_map = {r["status"]: r["c"] for r in last30}
-    present30 = c_map.get("PRESENT", 0)
-    late30 = c_map.get("LATE", 0)
-    absent30 = c_map.get("ABSENT", 0)
-
-    warn_counts = [0, 0, 0, 0]
-    for lvl, count in (
-        Enrollment.objects
-        .filter(course_info__teacher=user)
-        .values_list("attendance_warning_level")
-        .annotate(c=Count("id"))
-    ):
-        lvl = int(lvl or 0)
-        if lvl <= 0:
-            warn_counts[0] += count
-        elif lvl == 1:
-            warn_counts[1] += count
-        elif lvl == 2:
-            warn_counts[2] += count
-        else:
-            warn_counts[3] += count
-
-    recent_attendance = (
-        Attendance.objects
-        .filter(course_info__teacher=user)
-        .select_related("course_info", "course_info__course", "student")
-        .order_by("-session_date", "-first_seen")[:12]
-    )
-    recent_scans = (
-        RfidScan.objects
-        .filter(user__enrollments__course_info__teacher=user)
-        .order_by("-created_at")
-        .distinct()[:12]
-    )
-
     week_groups = {"uth": [], "mw": [], "fs": []}
     for ci in sections:
         key = (ci.days or "").lower()
@@ -477,21 +307,21 @@ def teacher_dashboard(request):
     for k in week_groups:
         week_groups[k].sort(key=lambda ci: ci.start_time)
 
-    att_pie = {"labels": ["Present", "Late", "Absent"], "data": [present30, late30, absent30]}
-    warn_bars = {"labels": ["Level 0", "Level 1", "Level 2", "Level 3"], "data": warn_counts}
+    att_pie = {"labels": ["Present", "Late", "Absent"], "data": [stats.present30, stats.late30, stats.absent30]}
+    warn_bars = {"labels": ["Level 0", "Level 1", "Level 2", "Level 3"], "data": stats.warn_counts}
 
     context = {
         "today": today,
         "sections": sections,
-        "total_sections": total_sections,
-        "total_students": total_students,
+        "total_sections": len(sections),
+        "total_students": stats.total_students,
         "todays_sections": todays_sections,
         "next_class": next_class,
-        "today_present": today_present,
-        "today_late": today_late,
-        "today_absent": today_absent,
-        "recent_attendance": recent_attendance,
-        "recent_scans": recent_scans,
+        "today_present": stats.today_present,
+        "today_late": stats.today_late,
+        "today_absent": stats.today_absent,
+        "recent_attendance": recent_section_attendance(stats.section_ids),
+        "recent_scans": recent_section_scans(stats.section_ids),
         "week_groups": week_groups,
         "att_pie": att_pie,
         "warn_bars": warn_bars,
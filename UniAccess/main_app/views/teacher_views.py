@@ -6,7 +6,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
 from django.db.models import Q
-from django.http import HttpResponseForbidden, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
@@ -14,6 +14,14 @@ from django.views.decorators.http import require_POST
 from django.views.generic.edit import UpdateView
 
 from main_app.models import Attendance, CourseInfo, Enrollment
+from ..db_routers import replica_ok
+from ..services.warnings import recompute_warnings
+from ..services.teacher_stats import bump_teacher_stats
+from ..services.attendance_query import (
+    ADMIN, TEACHER, MAX_ROWS, AttendanceFilters, attendance_queryset, section_options,
+)
+from ..services.export import export_response
+from ..services.reports import TOTAL_HEADERS, build_section_matrix, matrix_csv, report_filename
 
 User = get_user_model()
 
@@ -27,187 +35,59 @@ def _parse_date(s):
     except Exception:
         return None
 
+def _session_date(request):
+    date_str = (request.GET.get("date") or "").strip()
+    if not date_str:
+        return timezone.localdate()
+    session_date = _parse_date(date_str)
+    if session_date is None:
+        messages.warning(request, "Invalid date; using today.")
+        return timezone.localdate()
+    return session_date
+
 # === Views ===
+@replica_ok
 @login_required
 def attendance_take_C(request):
     user = request.user
     if not _is_teacher(user):
         return HttpResponseForbidden("Teachers only.")
 
-    date_str = (request.GET.get("date") or "").strip()
-    if date_str:
-        session_date = _parse_date(date_str) or timezone.localdate()
-        if session_date == timezone.localdate() and _parse_date(date_str) is None:
-            messages.warning(request, "Invalid date; using today.")
-    else:
-        session_date = timezone.localdate()
-
-    q = (request.GET.get("q") or "").strip()
-    status = (request.GET.get("status") or "").strip()
-    section_id = (request.GET.get("course_info") or "").strip()
-    start = (request.GET.get("start") or "").strip()
-    end = (request.GET.get("end") or "").strip()
-    order = (request.GET.get("order") or "-session_date").strip()
-
-    qs = Attendance.objects.select_related("student", "course_info", "course_info__course", "course_info__teacher")
-    if not (user.is_staff or user.is_superuser):
-        qs = qs.filter(course_info__teacher=user)
-
-    if q:
-        qs = qs.filter(
-            Q(student__username__icontains=q) |
-            Q(student__first_name__icontains=q) |
-            Q(student__last_name__icontains=q) |
-            Q(student__custom_id__icontains=q) |
-            Q(student__email__icontains=q) |
-            Q(course_info__course__code__icontains=q) |
-            Q(course_info__course__name__icontains=q)
-        )
-    if status:
-        qs = qs.filter(status=status)
-    if section_id:
-        try:
-            qs = qs.filter(course_info_id=int(section_id))
-        except ValueError:
-            pass
-
-    start_d = _parse_date(start)
-    end_d = _parse_date(end)
-    if start_d:
-        qs = qs.filter(session_date__gte=start_d)
-    if end_d:
-        qs = qs.filter(session_date__lte=end_d)
-
-    allowed_order = {
-        "session_date", "-session_date",
-        "first_seen", "-first_seen",
-        "status", "-status",
-        "student__username", "-student__username",
-        "course_info__course__code", "-course_info__course__code",
-        "course_info__class_name", "-course_info__class_name",
-    }
-    if order not in allowed_order:
-        order = "-session_date"
-    records = qs.order_by(order)[:1000]
-
-    section_qs = CourseInfo.objects.select_related("course", "teacher")
-    if not (user.is_staff or user.is_superuser):
-        section_qs = section_qs.filter(teacher=user)
-
-    section_opts = list(
-        section_qs.order_by("course__code", "class_name").values(
-            "id", "class_name",
-            "course__code", "course__name",
-            "teacher__username", "teacher__first_name", "teacher__last_name"
-        )
-    )
-    teacher_sections = section_qs.order_by("course__code", "section", "class_name")
-
     context = {
-        "session_date": session_date,
-        "teacher_sections": teacher_sections,
-        "records": records,
-        "q": q,
-        "status": status,
-        "section_id": section_id,
-        "start": start,
-        "end": end,
-        "order": order,
-        "status_opts": Attendance.STATUS_CHOICES,
-        "section_opts": section_opts,
+        "session_date": _session_date(request),
+        "teacher_sections": section_options(request),
+        **AttendanceFilters.from_request(request).as_context(),
     }
     return render(request, "teacher/attendance_take_C.html", context)
 
+@replica_ok
 @login_required
 def teacher_attendance_list(request):
     user = request.user
     if not _is_teacher(user):
         return HttpResponseForbidden("Teachers only.")
 
-    date_str = (request.GET.get("date") or "").strip()
-    if date_str:
-        session_date = _parse_date(date_str) or timezone.localdate()
-        if session_date == timezone.localdate() and _parse_date(date_str) is None:
-            messages.warning(request, "Invalid date; using today.")
-    else:
-        session_date = timezone.localdate()
-
-    q = (request.GET.get("q") or "").strip()
-    status = (request.GET.get("status") or "").strip()
-    section_id = (request.GET.get("course_info") or "").strip()
-    start = (request.GET.get("start") or "").strip()
-    end = (request.GET.get("end") or "").strip()
-    order = (request.GET.get("order") or "-session_date").strip()
-
-    qs = Attendance.objects.select_related("student", "course_info", "course_info__course", "course_info__teacher")
-    if not (user.is_staff or user.is_superuser):
-        qs = qs.filter(course_info__teacher=user)
-
-    if q:
-        qs = qs.filter(
-            Q(student__username__icontains=q) |
-            Q(student__first_name__icontains=q) |
-            Q(student__last_name__icontains=q) |
-            Q(student__custom_id__icontains=q) |
-            Q(student__email__icontains=q) |
-            Q(course_info__course__code__icontains=q) |
-            Q(course_info__course__name__icontains=q)
-        )
-    if status:
-        qs = qs.filter(status=status)
-    if section_id:
-        try:
-            qs = qs.filter(course_info_id=int(section_id))
-        except ValueError:
-            pass
-
-    start_d = _parse_date(start)
-    end_d = _parse_date(end)
-    if start_d:
-        qs = qs.filter(session_date__gte=start_d)
-    if end_d:
-        qs = qs.filter(session_date__lte=end_d)
-
-    allowed_order = {
-        "session_date", "-session_date",
-        "first_seen", "-first_seen",
-        "status", "-status",
-        "student__username", "-student__username",
-        "course_info__course__code", "-course_info__course__code",
-        "course_info__class_name", "-course_info__class_name",
-    }
-    if order not in allowed_order:
-        order = "-session_date"
-    records = qs.order_by(order)[:1000]
-
-    section_qs = CourseInfo.objects.select_related("course", "teacher")
-    if not (user.is_staff or user.is_superuser):
-        section_qs = section_qs.filter(teacher=user)
-
-    section_opts = list(
-        section_qs.order_by("course__code", "class_name").values(
-            "id", "class_name",
-            "course__code", "course__name",
-            "teacher__username", "teacher__first_name", "teacher__last_name"
-        )
-    )
-    teacher_sections = section_qs.order_by("course__code", "section", "class_name")
+    filters = AttendanceFilters.from_request(request)
+    scope = ADMIN if (user.is_staff or user.is_superuser) else TEACHER
+    records = attendance_queryset(user, filters, scope=scope)[:MAX_ROWS]
 
     context = {
-        "session_date": session_date,
-        "teacher_sections": teacher_sections,
+        "session_date": _session_date(request),
         "records": records,
-        "q": q,
-        "status": status,
-        "section_id": section_id,
-        "start": start,
-        "end": end,
-        "order": order,
+        **filters.as_context(),
         "status_opts": Attendance.STATUS_CHOICES,
-        "section_opts": section_opts,
+        "section_opts": section_options(request, scope),
     }
     return render(request, "teacher/attendance_list.html", context)
 
+@replica_ok
+@login_required
+def teacher_attendance_export(request, fmt):
+    user = request.user
+    if not _is_teacher(user):
+        return HttpResponseForbidden("Teachers only.")
+    return export_response(request, ADMIN if (user.is_staff or user.is_superuser) else TEACHER, fmt)
+
 @login_required
 def teacher_take_attendance(request, course_info_id: int):
     user = request.user
@@ -233,7 +113,9 @@ def teacher_take_attendance(request, course_info_id: int):
     existing = {a.student_id: a for a in Attendance.objects.filter(course_info=ci, session_date=session_date)}
 
     if request.method == "POST":
-        changed = 0
+        to_create, to_update = [], []
+        start_dt = timezone.make_aware(datetime.combine(session_date, ci.start_time))
+        end_dt = timezone.make_aware(datetime.combine(session_date, ci.end_time))
         for e in enrollments:
             field = f"status_{e.student_id}"
             val = (request.POST.get(field) or "").upper()
@@ -241,22 +123,40 @@ def teacher_take_attendance(request, course_info_id: int):
                 continue
             att = existing.get(e.student_id)
             if att is None:
-                start_dt = timezone.make_aware(datetime.combine(session_date, ci.start_time))
-                end_dt = timezone.make_aware(datetime.combine(session_date, ci.end_time))
-                att = Attendance(
+                to_create.append(Attendance(
                     student=e.student,
                     course_info=ci,
                     session_date=session_date,
                     first_seen=start_dt,
                     last_seen=end_dt,
                     status=val,
-                )
-            else:
+                    device_id="TEACHER-MARK",
+                ))
+            elif att.status != val or not att.device_id:
                 att.status = val
-            att.device_id = att.device_id or "TEACHER-MARK"
-            att.save()
-            existing[e.student_id] = att
-            changed += 1
+                att.device_id = att.device_id or "TEACHER-MARK"
+                to_update.append(att)
+
+        changed = len(to_create) + len(to_update)
+        if changed:
+            with transaction.atomic():
+                # A scan may have inserted the same (student, section, date) row since
+                # `existing` was read; the teacher's mark wins.
+                Attendance.objects.bulk_create(
+                    to_create,
+                    update_conflicts=True,
+                    unique_fields=["student", "course_info", "session_date"],
+                    update_fields=["status"],
+                )
+                Attendance.objects.bulk_update(to_update, ["status", "device_id"])
+                recompute_warnings(
+                    Enrollment.objects.filter(
+                        course_info=ci,
+                        student_id__in=[a.student_id for a in to_create + to_update],
+                    )
+                )
+                # bulk_create/bulk_update skip the signals that normally do this.
+                transaction.on_commit(lambda: bump_teacher_stats(ci.teacher_id))
 
         messages.success(request, f"Attendance saved for {session_date} (updated {changed} rows).")
         return HttpResponseRedirect(
@@ -272,6 +172,22 @@ def teacher_take_attendance(request, course_info_id: int):
     }
     return render(request, "teacher/take_attendance.html", context)
 
+@replica_ok
+@login_required
+def teacher_section_matrix(request, course_info_id: int):
+    user = request.user
+    ci = get_object_or_404(CourseInfo.objects.select_related("course", "teacher"), id=course_info_id)
+    if not (user.is_staff or user.is_superuser) and ci.teacher_id != user.id:
+        return HttpResponseForbidden("You do not teach this section.")
+
+    m = build_section_matrix(ci)
+    if request.GET.get("format") == "csv":
+        response = HttpResponse(matrix_csv(m), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{report_filename(ci, "csv")}"'
+        return response
+    context = {"m": m, "rows": list(m.rows()), "total_headers": TOTAL_HEADERS}
+    return render(request, "teacher/section_matrix.html", context)
+
 class TeacherAttendanceEdit(LoginRequiredMixin, UpdateView):
     model = Attendance
     fields = ["status", "first_seen", "last_seen", "device_id"]